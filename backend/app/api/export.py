@@ -6,13 +6,13 @@ import re
 from typing import Dict, Any, List
 from pydantic import BaseModel, field_validator
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
+from sqlalchemy.orm import Session, selectinload
 
-from app.core.auth import get_current_user
+from app.core.auth import User, get_current_user
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.executors import DATABASE, SHEETS, ExecutorSaturated, run_blocking
+from app.core.tracing import tracer
+from app.db.session import run_in_session
 from app.db.models import Project, Component, Translation
 from app.models.project_schemas import ExportToSheetsRequest, ExportToSheetsResponse
 from app.services.project_service import ProjectService
@@ -101,6 +101,10 @@ def get_sheets_service():
         )
     
     try:
+        # Imported here: the Sheets client is only needed for exports
+        from googleapiclient.discovery import build
+        from google.oauth2 import service_account
+
         credentials = service_account.Credentials.from_service_account_file(
             settings.google_sheets_credentials_path,
             scopes=['https://www.googleapis.com/auth/spreadsheets']
@@ -115,12 +119,22 @@ def get_sheets_service():
         )
 
 
+def _load_export_data(db: Session, project_id: int):
+    """Project and its components with translations loaded up front, so building rows does not query (blocking)"""
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        return None, []
+    components = db.query(Component).options(selectinload(Component.translations)).filter(
+        Component.project_id == project_id
+    ).order_by(Component.component_type, Component.component_index).all()
+    return project, components
+
+
 @router.post("/projects/{project_id}/export", response_model=ExportToSheetsResponse)
 async def export_to_sheets(
     project_id: int,
     request: ExportToSheetsRequest,
-    user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(get_current_user)
 ):
     """
     Export project content to Google Sheets
@@ -129,19 +143,14 @@ async def export_to_sheets(
     | ELEMENTS | EN | URLS | IT | FR | ... |
     """
     
-    # Get project with all data
-    project = ProjectService.get_project(db, project_id, user_id)
+    # Get project with all components and translations
+    project, components = await run_blocking(DATABASE, run_in_session, _load_export_data, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
     
-    # Get all components with translations
-    components = db.query(Component).filter(
-        Component.project_id == project_id
-    ).order_by(Component.component_type, Component.component_index).all()
-    
     if not components:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -153,7 +162,7 @@ async def export_to_sheets(
         spreadsheet_id = extract_spreadsheet_id(request.sheet_url)
         
         # Get Sheets service
-        service = get_sheets_service()
+        service = await run_blocking(SHEETS, get_sheets_service)
         
         # Build data to write
         # Header row
@@ -220,11 +229,14 @@ async def export_to_sheets(
                         }
                     }]
                 }
-                service.spreadsheets().batchUpdate(
-                    spreadsheetId=spreadsheet_id,
-                    body=add_sheet_request
-                ).execute()
+                with tracer.span("sheets.add_sheet"):
+                    await run_blocking(SHEETS, service.spreadsheets().batchUpdate(
+                        spreadsheetId=spreadsheet_id,
+                        body=add_sheet_request
+                    ).execute)
                 range_name = f"'{sheet_title}'!A1"
+            except ExecutorSaturated:
+                raise
             except Exception as e:
                 logger.warning(f"Failed to create new sheet: {str(e)}")
                 # Fallback to first sheet
@@ -238,12 +250,13 @@ async def export_to_sheets(
             'values': rows
         }
         
-        service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range=range_name,
-            valueInputOption='USER_ENTERED',
-            body=body
-        ).execute()
+        with tracer.span("sheets.update_values", rows=len(rows)):
+            await run_blocking(SHEETS, service.spreadsheets().values().update(
+                spreadsheetId=spreadsheet_id,
+                range=range_name,
+                valueInputOption='USER_ENTERED',
+                body=body
+            ).execute)
         
         logger.info(f"Exported project {project_id} to Google Sheets")
         
@@ -258,6 +271,8 @@ async def export_to_sheets(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error exporting to sheets: {str(e)}")
         raise HTTPException(
@@ -317,7 +332,7 @@ def generate_handlebar(component_key: str, translations: Dict[str, str], english
 @router.post("/handlebars/generate", response_model=HandlebarExportResponse)
 async def generate_handlebar_template(
     request: HandlebarExportRequest,
-    user_id: str = Depends(get_current_user)
+    user: User = Depends(get_current_user)
 ):
     """
     Generate a handlebar template string for a component with its translations
@@ -4,27 +4,39 @@ Core feature: Generate text variations with tone-of-voice consistency
 Pattern from InventioHub but NO LangChain - Direct Vertex AI SDK
 """
 from fastapi import APIRouter, HTTPException, Request, Depends
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 import logging
 import json
 import asyncio
+from sqlalchemy.orm import Session
 
 from app.models.schemas import (
     GenerateVariationsRequest,
     GenerateVariationsResponse,
+    RegenerateComponentRequest,
+    RegenerateComponentResponse,
     ContentType,
     ToneType,
     ComponentType,
     StructureComponent
 )
-from app.core.vertex_ai import VertexAIClient, get_client
+from app.core.vertex_ai import VertexAIClient, GenerationStats, get_client
+from app.core.model_router import model_router
+from app.core.cancellation import cancel_on_disconnect
+from app.core.rate_limit import rate_limited, rate_limit_key
+from app.services.idempotency import idempotent
 from app.core.config import settings
 from app.utils.notifications import notify_generation_completed
 from app.prompts.few_shot_loader import get_few_shot_db
+from app.services.generation_validation import ValidationPipeline
+from app.services.generation_strategy import choose_call_count, generate_fan_out
+from app.services.token_budget import budget_for_structure, estimate_output_tokens
+from app.core.telemetry import component_lengths
+from app.db.session import get_db
+from app.services.project_service import ProjectService
+from app.services.speculative_translation import get_speculative_translator
+from app.services.generation_history import GenerationHistoryService, prompt_fingerprint
 
 logger = logging.getLogger(__name__)
-limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
 # --- Few-Shot Examples (Hardcoded for Simplicity) ---
@@ -92,6 +104,20 @@ def load_few_shot_examples(content_type: ContentType, tone: ToneType, component:
     return f"Here are some examples of the desired output format and style:\n{formatted_examples}\n"
 
 
+def structure_keys(structure: list[StructureComponent]) -> list[str]:
+    """
+    JSON keys expected in every variation for a structure
+    e.g. [subject x1, cta x2] -> ["subject", "cta_1", "cta_2"]
+    """
+    keys = []
+    for item in structure:
+        if item.count > 1:
+            keys.extend(f"{item.component.value}_{i}" for i in range(1, item.count + 1))
+        else:
+            keys.append(item.component.value)
+    return keys
+
+
 def build_generation_prompt(
     text: str,
     count: int,
@@ -118,7 +144,6 @@ def build_generation_prompt(
     """
     
     structure_details = []
-    json_example_structure = []
     
     # Track which component types are in the structure for Few-Shot examples
     component_types_in_structure = set()
@@ -127,13 +152,9 @@ def build_generation_prompt(
         plural = "s" if item.count > 1 else ""
         structure_details.append(f"{item.count} {item.component.value.replace('_', ' ')}{plural}")
         component_types_in_structure.add(item.component.value)
-        
-        if item.count > 1:
-            for i in range(1, item.count + 1):
-                json_example_structure.append(f'    "{item.component.value}_{i}": "..."')
-        else:
-            json_example_structure.append(f'    "{item.component.value}": "..."')
-            
+    
+    json_example_structure = [f'    "{key}": "..."' for key in structure_keys(structure)]
+
     structure_list_str = ", ".join(structure_details)
     json_example_str = ",\n".join(json_example_structure)
     
@@ -186,12 +207,186 @@ EXAMPLE OF THE EXACT JSON OUTPUT STRUCTURE REQUIRED:
 """
     return prompt
 
+def build_component_prompt(
+    text: str,
+    component: ComponentType,
+    count: int,
+    tone: str,
+    content_type: str,
+    neighbors: dict[str, str] | None = None,
+    current_text: str | None = None,
+    example_count: int = 4
+) -> str:
+    """
+    Builds a minimal prompt to regenerate one component slot
+    
+    Only the brief, the neighboring component texts and a few examples of the
+    target component type are included - no structure machinery.
+    """
+    component_name = component.value.replace("_", " ")
+    
+    neighbors_block = ""
+    if neighbors:
+        lines = "\n".join(f"- {key}: {value}" for key, value in neighbors.items() if value)
+        neighbors_block = f"\nSURROUNDING COMPONENTS (keep consistent, do not repeat):\n{lines}\n"
+    
+    current_block = f'\nCURRENT {component_name.upper()} (write something different): "{current_text}"\n' if current_text else ""
+    
+    examples_block = ""
+    if example_count:
+        examples_block = get_few_shot_db().format_examples_for_prompt(
+            component_type=component.value,
+            count=example_count
+        )
+    
+    casing = " in UPPERCASE" if component == ComponentType.CTA else ""
+    
+    return f"""You are a senior copywriter for {content_type} content.
+Write {count} alternative {component_name}s{casing} in a {tone} tone for this brief:
+"{text}"
+{neighbors_block}{current_block}{examples_block}
+Each alternative must be distinct. Output ONLY valid JSON:
+{{"alternatives": ["...", "..."]}}
+"""
+
+
+def record_generation_run(
+    req: GenerateVariationsRequest,
+    variations: list[dict],
+    model_name: str,
+    calls: int,
+    stats: GenerationStats,
+    db: Session
+) -> None:
+    """Store the run in the project's generation history (never fails the request)"""
+    try:
+        GenerationHistoryService.record_run(
+            db,
+            project_id=req.project_id,
+            user_id=None,
+            fingerprint=prompt_fingerprint(
+                text=req.text,
+                tone=req.tone.value,
+                content_type=req.content_type.value,
+                structure=[comp.model_dump(mode="json") for comp in req.structure],
+                context=req.context,
+                image_url=req.image_url,
+                use_few_shot=req.use_few_shot,
+            ),
+            model=model_name,
+            parameters={
+                "count": req.count,
+                "temperature": req.temperature,
+                "strategy": "fan_out" if calls > 1 else "single",
+                "attempts": stats.attempts,
+            },
+            variations=variations
+        )
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to record generation run for project {req.project_id}: {e}")
+
+
+def schedule_speculative_translation(
+    req: GenerateVariationsRequest,
+    variations: list[dict],
+    db: Session
+) -> int:
+    """Pre-translate variations into the request's or project's languages in the background"""
+    languages = req.target_languages
+    if not languages and req.project_id is not None:
+        project = ProjectService.get_project(db, req.project_id)
+        languages = project.target_languages if project else None
+    if not languages:
+        logger.info("Speculative translation requested but no target languages are known")
+        return 0
+    return get_speculative_translator().schedule(variations, languages, project_id=req.project_id)
+
+
+async def component_slot_key(request: Request, req: RegenerateComponentRequest, **kwargs) -> str | None:
+    """Requests for the same slot from the same user supersede each other"""
+    if not req.slot_key:
+        return None
+    # Authenticated user when known: users behind one NAT address must not cancel each other
+    caller = await rate_limit_key(request, kwargs)
+    return f"component:{caller}:{req.slot_key}"
+
+
+@router.post("/generate/component", response_model=RegenerateComponentResponse, status_code=200)
+@rate_limited(cost=lambda req, **_: req.count)
+@cancel_on_disconnect(supersede_key=component_slot_key)
+async def regenerate_component(
+    request: Request,
+    req: RegenerateComponentRequest,
+    client: VertexAIClient = Depends(get_client)
+) -> RegenerateComponentResponse:
+    """
+    Regenerate a single component slot (e.g. one CTA or the subject)
+    Returns N alternatives from a minimal prompt, on Flash by default
+    """
+    logger.info(f"Regenerating {req.count} alternatives for {req.component.value} | Flash: {req.use_flash}")
+    
+    prompt = build_component_prompt(
+        text=req.text,
+        component=req.component,
+        count=req.count,
+        tone=req.tone.value,
+        content_type=req.content_type.value,
+        neighbors=req.neighbors,
+        current_text=req.current_text,
+        example_count=req.example_count
+    )
+    
+    # Small output budget sized for N alternatives of this one component
+    max_tokens = estimate_output_tokens({req.component.value: 1}, req.count)
+    
+    try:
+        response_text = await client.refine_text(
+            prompt=prompt,
+            schema={"alternatives": ["string"]},
+            max_retries=1,
+            temperature=req.temperature if req.temperature is not None else 0.9,
+            max_tokens=max_tokens,
+            use_flash=req.use_flash,
+            task="component"
+        )
+        alternatives = [
+            str(alt).strip() for alt in json.loads(response_text).get("alternatives", [])
+            if str(alt).strip()
+        ]
+        if req.component == ComponentType.CTA:
+            alternatives = [alt.upper() for alt in alternatives]
+        component_lengths.record_variations({req.component.value: alt} for alt in alternatives)
+        
+        # Drop exact duplicates (and the current text) while keeping order
+        seen = {req.current_text.strip().lower()} if req.current_text else set()
+        unique = []
+        for alt in alternatives:
+            if alt.lower() not in seen:
+                seen.add(alt.lower())
+                unique.append(alt)
+        
+        return RegenerateComponentResponse(
+            component=req.component.value,
+            alternatives=unique[:req.count]
+        )
+    
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
+    except Exception as e:
+        logger.error(f"Error in regenerate_component: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/generate", response_model=GenerateVariationsResponse, status_code=200)
-@limiter.limit(f"{settings.rate_limit_per_second}/second")
+@idempotent(GenerateVariationsResponse)
+@rate_limited(cost=lambda req, **_: req.count * sum(item.count for item in req.structure))
+@cancel_on_disconnect()
 async def generate_variations(
     request: Request,
     req: GenerateVariationsRequest,
-    client: VertexAIClient = Depends(get_client)
+    client: VertexAIClient = Depends(get_client),
+    db: Session = Depends(get_db)
 ) -> GenerateVariationsResponse:
     """
     Generate variations of a text based on a prompt.
@@ -204,39 +399,83 @@ async def generate_variations(
     # Use Few-Shot examples only if requested (for regeneration)
     use_few_shot = req.use_few_shot if req.use_few_shot is not None else False
     
-    prompt = build_generation_prompt(
-        text=req.text,
-        count=req.count,
-        tone=req.tone.value,
-        content_type=req.content_type.value,
-        structure=req.structure,
-        context=req.context,
-        use_few_shot=use_few_shot,
-    )
+    def prompt_for(count: int) -> str:
+        return build_generation_prompt(
+            text=req.text,
+            count=count,
+            tone=req.tone.value,
+            content_type=req.content_type.value,
+            structure=req.structure,
+            context=req.context,
+            use_few_shot=use_few_shot,
+        )
 
     # Use provided temperature or default to 0.7
     temperature = req.temperature if req.temperature is not None else 0.7
     
-    # Use Flash model if requested (faster/cheaper for CTAs)
-    use_flash = req.use_flash if req.use_flash is not None else False
+    validation = ValidationPipeline.for_structure(
+        required_keys=structure_keys(req.structure),
+        brief=req.text,
+        tone=req.tone.value
+    )
     
-    raw_variations = await client.generate_with_fixing(
-        prompt,
-        req.count,
-        temperature=temperature,
-        max_tokens=2048,
-        image_url=req.image_url,
-        use_flash=use_flash,
+    # Pro vs Flash from the routing table (honoring an explicit use_flash), with health-based fallback
+    components_per_variation = sum(comp.count for comp in req.structure)
+    model_name = model_router.select(
+        "generate",
+        components=components_per_variation,
+        use_flash=req.use_flash,
+        component_types=[comp.component.value for comp in req.structure],
     )
+    
+    # Single call vs parallel fan-out (adaptive unless the client forces one)
+    calls = choose_call_count(
+        strategy=req.strategy,
+        count=req.count,
+        components_per_variation=components_per_variation,
+        model_name=model_name
+    )
+    
+    stats = GenerationStats()
+    if calls > 1:
+        variations_list = await generate_fan_out(
+            client,
+            prompt_builder=prompt_for,
+            count=req.count,
+            calls=calls,
+            temperature=temperature,
+            token_budget=lambda n: budget_for_structure(req.structure, n),
+            image_url=req.image_url,
+            model=model_name,
+            validation=validation,
+            stats=stats,
+        )
+    else:
+        raw_variations = await client.generate_with_fixing(
+            prompt_for(req.count),
+            req.count,
+            temperature=temperature,
+            max_tokens=budget_for_structure(req.structure, req.count),
+            image_url=req.image_url,
+            model=model_name,
+            validation=validation,
+            prompt_builder=prompt_for,
+            stats=stats,
+        )
+        # Extract the variations array from the response
+        variations_list = json.loads(raw_variations).get("variations", [])
 
     try:
-        # Parse the JSON response
-        response_data = json.loads(raw_variations)
+        logger.info(
+            f"Successfully generated {len(variations_list)} variations | Stats: {stats.as_dict()}"
+        )
         
-        # Extract the variations array from the response
-        variations_list = response_data.get("variations", [])
+        if req.project_id is not None:
+            record_generation_run(req, variations_list, model_name, calls, stats, db)
         
-        logger.info(f"Successfully generated {len(variations_list)} variations")
+        speculative_count = 0
+        if req.speculative_translation:
+            speculative_count = schedule_speculative_translation(req, variations_list, db)
         
         # Send Slack notification (non-blocking)
         component_count = sum(comp.count for comp in req.structure)
@@ -251,9 +490,15 @@ async def generate_variations(
         return GenerateVariationsResponse(
             variations=variations_list,
             original_text=req.text,
-            tone=req.tone.value
+            tone=req.tone.value,
+            attempts=stats.attempts,
+            strategy="fan_out" if calls > 1 else "single",
+            partial=len(variations_list) < req.count,
+            speculative_translations=speculative_count
         )
         
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except Exception as e:
         logger.error(f"Error in generate_variations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
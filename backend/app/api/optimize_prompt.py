@@ -4,18 +4,16 @@ Helps users who don't know prompt engineering to get better results.
 """
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 import logging
 import json
 
 from app.core.config import settings
-from app.core.vertex_ai import vertex_client
+from app.core.vertex_ai import get_client
+from app.core.rate_limit import rate_limited
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 
 
 class OptimizePromptRequest(BaseModel):
@@ -33,7 +31,7 @@ class OptimizePromptResponse(BaseModel):
 
 
 @router.post("/optimize-prompt", response_model=OptimizePromptResponse)
-@limiter.limit(f"{settings.rate_limit_per_second}/second")
+@rate_limited(cost=2)
 async def optimize_prompt(
     request: Request,
     req: OptimizePromptRequest,
@@ -96,20 +94,15 @@ Return ONLY the JSON, no other text."""
 
         # Call Vertex AI to optimize the prompt
         # Use direct generation without the "fixing" logic since we have custom JSON structure
-        from vertexai.generative_models import GenerativeModel, GenerationConfig
-        
-        model = GenerativeModel(
-            model_name="gemini-2.0-flash-001",
-            generation_config=GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=1500,
-                response_mime_type="application/json"
-            )
+        # Routed to Flash by default; 2.5 reasoning tokens count against max_tokens
+        response_text = await get_client().generate_content(
+            prompt=optimization_prompt,
+            temperature=0.7,
+            max_tokens=2560,
+            response_mime_type="application/json",
+            task="optimize_prompt"
         )
         
-        response = await model.generate_content_async(optimization_prompt)
-        response_text = response.text
-        
         # Parse response
         response_data = json.loads(response_text)
         optimized = response_data.get("optimized_prompt", req.text)
@@ -134,6 +127,8 @@ Return ONLY the JSON, no other text."""
             improvements=improvements
         )
 
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse optimization response: {e}")
         raise HTTPException(
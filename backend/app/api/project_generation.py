@@ -3,11 +3,13 @@ Project-based Generation and Translation Endpoints
 Combines AI generation with database persistence
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_user
-from app.core.vertex_ai import VertexAIClient, get_client
+from app.core.auth import get_current_user, User
+from app.core.vertex_ai import VertexAIClient, GenerationStats, get_client
+from app.core.cancellation import cancel_on_disconnect
+from app.core.rate_limit import rate_limited
 from app.db.session import get_db
 from app.db.models import Project, Component, Translation, Image
 from app.models.project_schemas import (
@@ -15,20 +17,36 @@ from app.models.project_schemas import (
     GenerateProjectContentResponse,
     TranslateProjectRequest,
     TranslateProjectResponse,
-    ComponentResponse
+    ComponentResponse,
+    GenerationRunPage,
+    GenerationRunResponse
 )
 from app.services.project_service import ProjectService
+from app.services.section_generation import generate_sections
+from app.services.generation_history import GenerationHistoryService, prompt_fingerprint
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Rate limit charges: the project is not loaded yet, so costs are typical sizes
+PROJECT_GENERATE_COST = 10  # One variation of a usual header plus a few sections
+PROJECT_TRANSLATE_COST_PER_LANGUAGE = 10
+
+
+def project_translate_cost(request: TranslateProjectRequest, **_) -> float:
+    languages = len(request.languages) if request.languages else 4  # Project default languages
+    return PROJECT_TRANSLATE_COST_PER_LANGUAGE * languages
+
 
 @router.post("/projects/{project_id}/generate", response_model=GenerateProjectContentResponse)
+@rate_limited(cost=PROJECT_GENERATE_COST)  # Sections are generated once each, whatever request.count says
+@cancel_on_disconnect(supersede_key=lambda project_id, user, **_: f"project-generate:{project_id}:{user.id}")
 async def generate_project_content(
     project_id: int,
     request: GenerateProjectContentRequest,
-    user_id: str = Depends(get_current_user),
+    http_request: Request,
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_client: VertexAIClient = Depends(get_client)
 ):
@@ -36,29 +54,22 @@ async def generate_project_content(
     Generate AI content for all components in a project
     
     - Uses project's brief, structure, and tone
-    - Generates content for each component type (subject, body, cta, etc.)
+    - Generates the header (subject, pre-header) and each section concurrently
+    - Routes short-copy sections to Flash and sections with body copy to Pro
     - Optionally uses uploaded images as context
-    - Saves all generated content to database
+    - Saves all generated content to database in section order
+    - A newer generate request for the same project cancels this one
     """
     
     # Get project with all relationships
-    project = ProjectService.get_project(db, project_id, user_id)
+    project = ProjectService.get_project(db, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
     
-    # Build the generation prompt
-    prompt = f"{project.brief_text or 'Create email content'}"
-    
-    # Prepare structure for generation
-    structure = []
-    for item in project.structure:
-        structure.append({
-            "component": item["component"],
-            "count": item["count"]
-        })
+    brief = project.brief_text or "Create email content"
     
     # Determine image URL (use first uploaded image if available, or from request)
     image_url = None
@@ -68,74 +79,33 @@ async def generate_project_content(
         image_url = request.image_urls[0]
     
     try:
-        # Call the AI generation endpoint
-        from app.api.generate import build_generation_prompt
-        
-        ai_prompt = build_generation_prompt(
-            text=prompt,
-            count=request.count,
+        stats = GenerationStats()
+        components_data = await generate_sections(
+            ai_client,
+            brief=brief,
             tone=project.tone or "professional",
-            content_type="newsletter",
-            structure=structure,
-            context=None
+            structure=project.structure or [],
+            image_url=image_url,
+            stats=stats
         )
         
-        # Generate content
-        response_text = await ai_client.generate_with_fixing(
-            prompt=ai_prompt,
-            expected_variations=request.count,
-            temperature=0.7,
-            max_tokens=2048,
-            image_url=image_url
+        components = ProjectService.upsert_generated_components(
+            db, project_id, user.id, user.name, components_data
         )
+        record_project_run(db, project, user.id, image_url, components_data, stats)
         
-        import json
-        variations = json.loads(response_text).get("variations", [])
-        
-        if not variations:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No content generated"
-            )
-        
-        # Take the first variation (for MVP, always generate 1)
-        generated_content = variations[0]
-        
-        # Save each component to database
-        components = []
-        for key, value in generated_content.items():
-            # Parse component type and index (e.g., "body_1" -> type="body", index=1)
-            if "_" in key:
-                parts = key.rsplit("_", 1)
-                component_type = parts[0]
-                component_index = int(parts[1])
-            else:
-                component_type = key
-                component_index = None
-            
-            # Create component in database
-            component = Component(
-                project_id=project_id,
-                component_type=component_type,
-                component_index=component_index,
-                generated_content=value
-            )
-            db.add(component)
-            components.append(component)
-        
-        db.commit()
-        
-        # Refresh to get IDs
-        for comp in components:
-            db.refresh(comp)
-        
-        logger.info(f"Generated and saved {len(components)} components for project {project_id}")
+        logger.info(
+            f"Generated and saved {len(components)} components for project {project_id} | "
+            f"Stats: {stats.as_dict()}"
+        )
         
         return GenerateProjectContentResponse(
             project_id=project_id,
             components=[ComponentResponse.from_orm(c) for c in components]
         )
         
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except Exception as e:
         logger.error(f"Error generating project content: {str(e)}")
         raise HTTPException(
@@ -144,11 +114,88 @@ async def generate_project_content(
         )
 
 
+def record_project_run(
+    db: Session,
+    project: Project,
+    user_id: str,
+    image_url: str | None,
+    components_data: list[dict],
+    stats: GenerationStats
+) -> None:
+    """Store the generated email as a single-variation run in the project's history"""
+    variation = {
+        f"{c['section_key']}.{c['component_type']}_{c['component_index']}": c["generated_content"]
+        for c in components_data
+    }
+    try:
+        GenerationHistoryService.record_run(
+            db,
+            project_id=project.id,
+            user_id=user_id,
+            fingerprint=prompt_fingerprint(
+                brief=project.brief_text, tone=project.tone, structure=project.structure, image_url=image_url
+            ),
+            model="sections",
+            parameters={"source": "project", "attempts": stats.attempts},
+            variations=[variation]
+        )
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to record generation run for project {project.id}: {e}")
+
+
+@router.get("/projects/{project_id}/generation-runs", response_model=GenerationRunPage)
+async def list_generation_runs(
+    project_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    fingerprint: str | None = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through past generation runs of a project, newest first
+
+    Lets the editor reopen previously generated variations without calling
+    the model again. Filter by prompt fingerprint to find runs of the same brief.
+    """
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+
+    limit = max(1, min(limit, 100))
+    runs, total = GenerationHistoryService.list_runs(db, project_id, skip, limit, fingerprint)
+    return GenerationRunPage(
+        total=total,
+        skip=skip,
+        limit=limit,
+        runs=[
+            GenerationRunResponse(
+                id=run.id,
+                project_id=run.project_id,
+                user_id=run.user_id,
+                prompt_fingerprint=run.prompt_fingerprint,
+                model=run.model,
+                parameters=run.parameters or {},
+                created_at=run.created_at,
+                variations=GenerationHistoryService.assemble_variations(run)
+            )
+            for run in runs
+        ]
+    )
+
+
 @router.post("/projects/{project_id}/translate", response_model=TranslateProjectResponse)
+@rate_limited(cost=project_translate_cost)
+@cancel_on_disconnect(supersede_key=lambda project_id, user, **_: f"project-translate:{project_id}:{user.id}")
 async def translate_project_content(
     project_id: int,
     request: TranslateProjectRequest,
-    user_id: str = Depends(get_current_user),
+    http_request: Request,
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_client: VertexAIClient = Depends(get_client)
 ):
@@ -157,11 +204,12 @@ async def translate_project_content(
     
     - Uses project's target languages if not specified in request
     - Translates each component's generated content
-    - Saves all translations to database
+    - Saves all translations to database as they complete, so a cancelled
+      request (client gone or superseded) keeps the work already done
     """
     
     # Get project
-    project = ProjectService.get_project(db, project_id, user_id)
+    project = ProjectService.get_project(db, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -201,14 +249,16 @@ async def translate_project_content(
                     text=component.generated_content,
                     target_language=lang_code.upper(),
                     source_language="EN",
-                    ai_client=ai_client
+                    ai_client=ai_client,
+                    segmented=component.component_type == "body"
                 )
                 
                 # Save translation
                 ProjectService.add_translation(
                     db=db,
                     component_id=component.id,
-                    user_id=user_id,
+                    user_id=user.id,
+                    user_name=user.name,
                     language_code=lang_code,
                     translated_content=translated_text
                 )
@@ -226,6 +276,8 @@ async def translate_project_content(
             components=[ComponentResponse.from_orm(c) for c in updated_components]
         )
         
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except Exception as e:
         logger.error(f"Error translating project content: {str(e)}")
         raise HTTPException(
@@ -18,12 +18,21 @@ from app.models.project_schemas import (
     SaveGeneratedContentRequest
 )
 from app.services.project_service import ProjectService
+from app.services.idempotency import idempotent
+from app.services.user_directory import get_user_directory
 from app.utils.notifications import notify_project_created, notify_project_updated
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Audit fields whose names are refreshed from the user directory on read
+PROJECT_USER_FIELDS = [
+    ("created_by_user_id", "created_by_user_name"),
+    ("updated_by_user_id", "updated_by_user_name"),
+]
+ACTIVITY_USER_FIELDS = [("user_id", "user_name")]
+
 
 @router.post("/projects", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
@@ -72,7 +81,8 @@ async def list_projects(
     """
     try:
         projects = ProjectService.list_projects(db, skip, limit)
-        return projects
+        responses = [ProjectResponse.model_validate(project) for project in projects]
+        return await get_user_directory().apply_names(responses, PROJECT_USER_FIELDS)
     except Exception as e:
         logger.error(f"Error listing projects: {str(e)}")
         raise HTTPException(
@@ -203,10 +213,12 @@ async def get_project_activity(
         )
     
     logs = ProjectService.get_activity_log(db, project_id, limit)
-    return logs
+    responses = [ActivityLogResponse.model_validate(log) for log in logs]
+    return await get_user_directory().apply_names(responses, ACTIVITY_USER_FIELDS)
 
 
 @router.post("/projects/{project_id}/components", response_model=ProjectResponse)
+@idempotent(ProjectResponse)
 async def save_generated_content(
     project_id: int,
     request_data: SaveGeneratedContentRequest,
@@ -216,7 +228,8 @@ async def save_generated_content(
 ):
     """
     Save generated components and translations for a project
-    This replaces all existing components
+    This replaces all existing components; send an Idempotency-Key header so
+    a retried save replays the first response instead of replacing again
     """
     try:
         # Convert Pydantic models to dicts for service layer
@@ -3,17 +3,17 @@ Refine Endpoint
 One-click text improvements: shorten, fix grammar, improve clarity, etc.
 """
 from fastapi import APIRouter, HTTPException, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 import logging
 import json
 
 from app.models.schemas import RefineRequest, RefineResponse
-from app.core.vertex_ai import vertex_client
+from app.core.vertex_ai import get_client
+from app.core.cancellation import cancel_on_disconnect
+from app.core.rate_limit import rate_limited
 from app.core.config import settings
+from app.services.token_budget import budget_for_text
 
 logger = logging.getLogger(__name__)
-limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
 
@@ -49,7 +49,8 @@ Return ONLY the JSON object, no explanations, no markdown."""
 
 
 @router.post("/refine", response_model=RefineResponse)
-@limiter.limit(f"{settings.rate_limit_per_second}/second")
+@rate_limited(cost=1)
+@cancel_on_disconnect()
 async def refine_text(
     request: Request,
     req: RefineRequest
@@ -73,10 +74,11 @@ async def refine_text(
             content_type=req.content_type.value
         )
         
-        response_text = await vertex_client.generate_with_fixing(
+        response_text = await get_client().refine_text(
             prompt=prompt,
             schema={"refined_text": "string"},
-            temperature=0.5  # Balanced
+            temperature=0.5,  # Balanced
+            max_tokens=budget_for_text(req.text)
         )
         
         response_data = json.loads(response_text)
@@ -87,6 +89,8 @@ async def refine_text(
             operation=req.operation
         )
     
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except Exception as e:
         logger.error(f"Error in refine_text: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3,55 +3,175 @@ Translate Endpoint
 Contextual translation maintaining tone and formality
 """
 from fastapi import APIRouter, HTTPException, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 import logging
 import json
 import asyncio
+from contextlib import nullcontext
 from pydantic import BaseModel
 from typing import List, Dict
 
 from app.models.schemas import TranslateRequest, TranslateResponse
-from app.core.vertex_ai import vertex_client
+from app.core.vertex_ai import get_client
+from app.core.cancellation import cancel_on_disconnect
+from app.core.rate_limit import rate_limited
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+from app.services.idempotency import idempotent
 from app.core.config import settings
 from app.utils.notifications import notify_translation_completed
+from app.utils.placeholders import mask_protected_spans
+from app.utils.segmentation import split_segments, translatable_indexes, join_segments
+from app.services.translation_memory import get_translation_memory
+from app.services.speculative_translation import get_speculative_translator
 
 logger = logging.getLogger(__name__)
-limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
 
+class PlaceholderMismatchError(ValueError):
+    """Raised when a translation drops, duplicates or invents placeholder tokens"""
+
+
+async def translate_with_protection(
+    text: str,
+    target_language: str,
+    source_language: str | None = "auto",
+    maintain_tone: bool = True,
+    content_type: str = "newsletter",
+    ai_client=None,
+    max_retries: int = 3
+) -> tuple[str, str | None]:
+    """
+    Translate text with protected spans masked out
+
+    - Handlebars, URLs, prices, SKUs and brand names are replaced by stable tokens
+    - Text that is purely non-linguistic is returned as-is without calling the model
+    - Only this cell is re-requested when JSON parsing or placeholder verification fails
+
+    Returns:
+        Tuple of (translated_text, detected_source_language)
+    """
+    if ai_client is None:
+        ai_client = get_client()
+
+    speculative = get_speculative_translator()
+    cached = await speculative.claim(text, target_language, maintain_tone, content_type)
+    if cached is None:
+        cached = get_translation_memory().get(text, target_language, maintain_tone, content_type)
+    if cached is not None:
+        return cached, source_language
+
+    memory = get_translation_memory()
+    masked = mask_protected_spans(text)
+    if masked.is_non_linguistic:
+        logger.debug(f"Skipping LLM for non-linguistic text: {text[:50]}")
+        return text, source_language
+
+    for attempt in range(max_retries):
+        try:
+            prompt = build_translation_prompt(
+                text=masked.text,
+                target_language=target_language.lower(),
+                source_language=source_language.lower() if source_language else None,
+                maintain_tone=maintain_tone,
+                content_type=content_type,
+                protected_tokens=masked.tokens
+            )
+
+            # Routed to gemini-2.5-flash for faster translations with higher rate limits
+            with nullcontext() if speculative.is_speculative() else speculative.foreground():
+                response_text = await ai_client.generate_content(
+                    prompt=prompt,
+                    temperature=0.3,  # Lower for more accurate translation
+                    response_mime_type="application/json",
+                    task="translate"
+                )
+
+            response_data = json.loads(response_text)
+            translated = response_data.get("translated_text", masked.text)
+            if not masked.verify(translated):
+                raise PlaceholderMismatchError(
+                    f"Placeholders not preserved (expected {masked.tokens})"
+                )
+
+            translated = masked.unmask(translated)
+            memory.put(text, target_language, translated, maintain_tone, content_type)
+            return translated, response_data.get("detected_source_language", source_language)
+
+        except (json.JSONDecodeError, PlaceholderMismatchError) as e:
+            logger.warning(f"Attempt {attempt + 1}/{max_retries} failed for {target_language}: {str(e)}")
+            if attempt == max_retries - 1:
+                raise
+            await deadline.sleep(0.5)  # Brief delay before retry, unless out of time
+
+
+async def translate_segmented(
+    text: str,
+    target_language: str,
+    source_language: str | None = "auto",
+    maintain_tone: bool = True,
+    content_type: str = "newsletter",
+    ai_client=None,
+    max_retries: int = 3
+) -> tuple[str, str | None]:
+    """
+    Translate long body copy sentence by sentence
+
+    Paragraphs and sentences are translated in parallel, each looked up in the
+    translation memory first, and reassembled in source order. Short texts go
+    straight to translate_with_protection.
+
+    Returns:
+        Tuple of (translated_text, detected_source_language)
+    """
+    if len(text) < settings.translation_segment_min_chars:
+        return await translate_with_protection(
+            text, target_language, source_language, maintain_tone, content_type, ai_client, max_retries
+        )
+
+    cached = await get_speculative_translator().claim(text, target_language, maintain_tone, content_type)
+    if cached is None:
+        cached = get_translation_memory().get(text, target_language, maintain_tone, content_type)
+    if cached is not None:
+        return cached, source_language
+
+    memory = get_translation_memory()
+    parts = split_segments(text)
+    indexes = translatable_indexes(parts)
+    logger.info(f"Translating {len(text)} chars as {len(indexes)} segments to {target_language}")
+
+    results = await asyncio.gather(*[
+        translate_with_protection(
+            parts[i], target_language, source_language, maintain_tone, content_type, ai_client, max_retries
+        )
+        for i in indexes
+    ])
+
+    translated = join_segments(parts, {i: result[0] for i, result in zip(indexes, results)})
+    memory.put(text, target_language, translated, maintain_tone, content_type)
+    detected_language = results[0][1] if results else source_language
+    return translated, detected_language
+
+
 async def translate_text_content(
     text: str,
     target_language: str,
     source_language: str = "EN",
-    ai_client=None
+    ai_client=None,
+    segmented: bool = False
 ) -> str:
     """
     Helper function to translate text content
     Used by both standalone endpoint and project translation
     """
-    if ai_client is None:
-        ai_client = vertex_client
-    
-    prompt = build_translation_prompt(
+    translate = translate_segmented if segmented else translate_with_protection
+    translated_text, _ = await translate(
         text=text,
-        target_language=target_language.lower(),
-        source_language=source_language.lower(),
-        maintain_tone=True,
-        content_type="newsletter"
+        target_language=target_language,
+        source_language=source_language,
+        ai_client=ai_client
     )
-    
-    # Use gemini-2.5-flash for faster translations with higher rate limits
-    response_text = await ai_client.generate_content(
-        prompt=prompt,
-        temperature=0.3,
-        response_mime_type="application/json",
-        use_flash=True  # Use Flash model for translations
-    )
-    
-    response_data = json.loads(response_text)
-    return response_data.get("translated_text", text)
+    return translated_text
 
 
 LANGUAGE_NAMES = {
@@ -69,7 +189,8 @@ def build_translation_prompt(
     target_language: str,
     source_language: str | None,
     maintain_tone: bool,
-    content_type: str
+    content_type: str,
+    protected_tokens: list[str] | None = None
 ) -> str:
     """Build prompt for translation"""
     
@@ -84,6 +205,11 @@ IMPORTANT: Maintain the original tone, style, and formality level.
 - If the original is formal, keep it formal
 - Preserve any brand voice characteristics"""
     
+    placeholder_instruction = ""
+    if protected_tokens:
+        placeholder_instruction = f"""
+- Keep placeholder tokens ({', '.join(protected_tokens)}) exactly as written: never translate, split, drop or repeat them"""
+    
     prompt = f"""You are a professional translator specialized in {content_type} content.
 
 Task: Translate the following text to {target_lang_name} {source_instruction}.
@@ -93,7 +219,7 @@ Guidelines:
 - Preserve the core message and intent
 - Adapt idioms and expressions appropriately for the target culture
 - Maintain proper grammar and natural flow
-- Keep the same level of formality
+- Keep the same level of formality{placeholder_instruction}
 
 Text to translate:
 "{text}"
@@ -109,8 +235,16 @@ Return ONLY the JSON object, no markdown, no explanations."""
     return prompt
 
 
+def translate_cost(req: TranslateRequest, **_) -> float:
+    """One unit per translatable segment (body copy is translated per sentence)"""
+    if len(req.text) < settings.translation_segment_min_chars:
+        return 1
+    return max(1, len(translatable_indexes(split_segments(req.text))))
+
+
 @router.post("/translate", response_model=TranslateResponse)
-@limiter.limit(f"{settings.rate_limit_per_second}/second")
+@rate_limited(cost=translate_cost)
+@cancel_on_disconnect()
 async def translate_text(
     request: Request,
     req: TranslateRequest
@@ -121,7 +255,7 @@ async def translate_text(
     try:
         logger.info(f"Translating to {req.target_language} | Type: {req.content_type}")
         
-        prompt = build_translation_prompt(
+        translated_text, detected_language = await translate_segmented(
             text=req.text,
             target_language=req.target_language,
             source_language=req.source_language,
@@ -129,23 +263,15 @@ async def translate_text(
             content_type=req.content_type.value
         )
         
-        # Use gemini-2.5-flash for faster translations with higher rate limits
-        response_text = await vertex_client.generate_content(
-            prompt=prompt,
-            temperature=0.3,  # Lower for more accurate translation
-            response_mime_type="application/json",
-            use_flash=True  # Use Flash model for translations
-        )
-        
-        response_data = json.loads(response_text)
-        
         return TranslateResponse(
-            translated_text=response_data["translated_text"],
+            translated_text=translated_text,
             original_text=req.text,
-            source_language=response_data.get("detected_source_language", req.source_language or "auto"),
+            source_language=detected_language or req.source_language or "auto",
             target_language=req.target_language
         )
     
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except Exception as e:
         logger.error(f"Error in translate_text: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -164,50 +290,45 @@ class BatchTranslateRequest(BaseModel):
 
 class BatchTranslateResponse(BaseModel):
     translations: Dict[str, Dict[str, str]]  # {component_key: {lang: translated_text}}
+    partial: bool = False  # Request deadline reached: cells not translated in time are left out
 
 
 async def translate_single_with_retry(
     text: str,
     target_language: str,
-    max_retries: int = 3
+    max_retries: int = 3,
+    segmented: bool = False
 ) -> str:
     """
-    Translate a single text with retry logic for malformed JSON
+    Translate a single text with retry logic for malformed JSON and broken placeholders
+    Body copy (segmented=True) is split into sentences translated in parallel
     """
-    for attempt in range(max_retries):
-        try:
-            prompt = build_translation_prompt(
-                text=text,
-                target_language=target_language.lower(),
-                source_language="auto",
-                maintain_tone=True,
-                content_type="newsletter"
-            )
-            
-            response_text = await vertex_client.generate_content(
-                prompt=prompt,
-                temperature=0.3,
-                response_mime_type="application/json",
-                use_flash=True  # Use Flash model for translations
-            )
-            
-            response_data = json.loads(response_text)
-            return response_data.get("translated_text", text)
-        
-        except json.JSONDecodeError as e:
-            logger.warning(f"Attempt {attempt + 1}/{max_retries} failed for {target_language}: {str(e)}")
-            if attempt == max_retries - 1:
-                logger.error(f"Failed to translate to {target_language} after {max_retries} attempts")
-                return f"[Translation failed: {text[:50]}...]"
-            await asyncio.sleep(0.5)  # Brief delay before retry
-        
-        except Exception as e:
-            logger.error(f"Error translating to {target_language}: {str(e)}")
-            return f"[Translation error: {text[:50]}...]"
+    translate = translate_segmented if segmented else translate_with_protection
+    try:
+        translated_text, _ = await translate(
+            text=text,
+            target_language=target_language,
+            source_language="auto",
+            max_retries=max_retries
+        )
+        return translated_text
+    
+    except DeadlineExceeded:
+        raise  # Reported by batch_translate as a partial result, not as translated text
+    
+    except (json.JSONDecodeError, PlaceholderMismatchError):
+        logger.error(f"Failed to translate to {target_language} after {max_retries} attempts")
+        return f"[Translation failed: {text[:50]}...]"
+    
+    except Exception as e:
+        logger.error(f"Error translating to {target_language}: {str(e)}")
+        return f"[Translation error: {text[:50]}...]"
 
 
 @router.post("/translate/batch", response_model=BatchTranslateResponse)
-@limiter.limit(f"{settings.rate_limit_per_second}/second")
+@idempotent(BatchTranslateResponse)
+@rate_limited(cost=lambda req, **_: len(req.texts) * len(req.target_languages))
+@cancel_on_disconnect()
 async def batch_translate(
     request: Request,
     req: BatchTranslateRequest
@@ -232,7 +353,11 @@ async def batch_translate(
             translations[text_item.key] = {}
             
             for lang in req.target_languages:
-                task = translate_single_with_retry(text_item.content, lang)
+                task = translate_single_with_retry(
+                    text_item.content,
+                    lang,
+                    segmented=text_item.key.startswith("body")
+                )
                 tasks.append(task)
                 task_metadata.append((text_item.key, lang))
         
@@ -240,14 +365,25 @@ async def batch_translate(
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Map results back to structure
+        timed_out = [result for result in results if isinstance(result, DeadlineExceeded)]
+        if timed_out and len(timed_out) == len(results):
+            raise timed_out[0]
         for (key, lang), result in zip(task_metadata, results):
-            if isinstance(result, Exception):
+            if isinstance(result, DeadlineExceeded):
+                continue
+            if isinstance(result, BaseException):
                 logger.error(f"Exception translating {key} to {lang}: {str(result)}")
                 translations[key][lang] = f"[Error: {str(result)[:50]}]"
             else:
                 translations[key][lang] = result
         
-        logger.info(f"Batch translation completed successfully")
+        if timed_out:
+            logger.warning(
+                f"Request deadline reached, returning partial batch translation "
+                f"({len(results) - len(timed_out)}/{len(results)} cells)"
+            )
+        else:
+            logger.info(f"Batch translation completed successfully")
         
         # Send Slack notification (non-blocking)
         asyncio.create_task(
@@ -259,8 +395,10 @@ async def batch_translate(
             )
         )
         
-        return BatchTranslateResponse(translations=translations)
+        return BatchTranslateResponse(translations=translations, partial=bool(timed_out))
     
+    except HTTPException:
+        raise  # Includes DeadlineExceeded (504)
     except Exception as e:
         logger.error(f"Error in batch_translate: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
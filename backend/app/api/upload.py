@@ -6,11 +6,12 @@ import uuid
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from google.cloud import storage
 
-from app.core.auth import get_current_user
+from app.core.auth import User, get_current_user
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.executors import DATABASE, GCS, ExecutorSaturated, run_blocking, run_blocking_write
+from app.core.tracing import tracer
+from app.db.session import run_in_session
 from app.db.models import Image, Project
 from app.models.project_schemas import ImageResponse
 
@@ -29,13 +30,57 @@ ALLOWED_MIME_TYPES = {
 # Max file size: 10MB
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# GCS client (lazy: created on the first upload and reused afterwards)
+_storage_client = None
+
+
+def get_storage_client():
+    """Get or create the Google Cloud Storage client"""
+    global _storage_client
+    if _storage_client is None:
+        from google.cloud import storage
+        _storage_client = storage.Client(project=settings.gcp_project_id)
+    return _storage_client
+
+
+def _upload_blob(gcs_path: str, content: bytes, content_type: str) -> str:
+    """Upload to the images bucket and return the public URL (blocking)"""
+    blob = get_storage_client().bucket(settings.gcs_bucket_images).blob(gcs_path)
+    blob.upload_from_string(content, content_type=content_type)
+    # The bucket is now publicly readable via IAM, so blob.make_public() is no longer needed and causes an error.
+    return blob.public_url
+
+
+def _delete_blob(blob_name: str) -> None:
+    """Delete from the images bucket (blocking)"""
+    get_storage_client().bucket(settings.gcs_bucket_images).blob(blob_name).delete()
+
+
+def _save(db: Session, instance) -> None:
+    """Insert and reload a row (blocking)"""
+    db.add(instance)
+    db.commit()
+    db.refresh(instance)
+
+
+def _delete_image(db: Session, image_id: int) -> None:
+    """Delete an image row (blocking)"""
+    db.query(Image).filter(Image.id == image_id).delete()
+    db.commit()
+
+
+def _get_user_image(db: Session, image_id: int, user_id: str) -> Optional[Image]:
+    return db.query(Image).filter(
+        Image.id == image_id,
+        Image.user_id == user_id
+    ).first()
+
 
 @router.post("/upload-image", response_model=ImageResponse, status_code=status.HTTP_201_CREATED)
 async def upload_image(
     file: UploadFile = File(...),
     project_id: int = Form(...),
-    user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(get_current_user)
 ):
     """
     Upload an image file to Google Cloud Storage
@@ -47,7 +92,7 @@ async def upload_image(
     """
     
     # Verify project exists (all authenticated users can upload to any project)
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await run_blocking(DATABASE, run_in_session, Session.get, Project, project_id)
     
     if not project:
         raise HTTPException(
@@ -86,24 +131,13 @@ async def upload_image(
     
     try:
         # Upload to Google Cloud Storage
-        storage_client = storage.Client(project=settings.gcp_project_id)
-        bucket = storage_client.bucket(settings.gcs_bucket_images)
-        blob = bucket.blob(gcs_path)
-        
-        # Upload with content type
-        blob.upload_from_string(
-            file_content,
-            content_type=file.content_type
-        )
-        
-        # The bucket is now publicly readable via IAM, so this is no longer needed and causes an error.
-        # blob.make_public()
-
-        # Get public URL
-        public_url = blob.public_url
+        with tracer.span("gcs.upload", bucket=settings.gcs_bucket_images, bytes=len(file_content)):
+            public_url = await run_blocking(GCS, _upload_blob, gcs_path, file_content, file.content_type)
         
         logger.info(f"Uploaded image to GCS: {gcs_path}")
         
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error uploading to GCS: {str(e)}")
         raise HTTPException(
@@ -115,26 +149,32 @@ async def upload_image(
     try:
         image = Image(
             project_id=project_id,
-            user_id=user_id,
+            user_id=user.id,
             filename=file.filename,
             gcs_path=f"gs://{settings.gcs_bucket_images}/{gcs_path}",
             gcs_public_url=public_url
         )
         
-        db.add(image)
-        db.commit()
-        db.refresh(image)
+        # No timeout: the blob below is only cleaned up once the insert has certainly failed
+        await run_blocking_write(DATABASE, run_in_session, _save, image)
         
         logger.info(f"Saved image metadata: ID {image.id}")
         
         return image
         
+    except ExecutorSaturated:
+        # Rejected before running: nothing was written, answer 503 so the client backs off
+        try:
+            await run_blocking(GCS, _delete_blob, gcs_path)
+        except Exception:
+            pass
+        raise
     except Exception as e:
         logger.error(f"Error saving image metadata: {str(e)}")
         # Try to clean up the uploaded file
         try:
-            blob.delete()
-        except:
+            await run_blocking(GCS, _delete_blob, gcs_path)
+        except Exception:
             pass
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -145,16 +185,12 @@ async def upload_image(
 @router.get("/images/{image_id}", response_model=ImageResponse)
 async def get_image(
     image_id: int,
-    user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(get_current_user)
 ):
     """
     Get image metadata by ID
     """
-    image = db.query(Image).filter(
-        Image.id == image_id,
-        Image.user_id == user_id
-    ).first()
+    image = await run_blocking(DATABASE, run_in_session, _get_user_image, image_id, user.id)
     
     if not image:
         raise HTTPException(
@@ -168,16 +204,12 @@ async def get_image(
 @router.delete("/images/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_image(
     image_id: int,
-    user_id: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(get_current_user)
 ):
     """
     Delete an image (from DB and GCS)
     """
-    image = db.query(Image).filter(
-        Image.id == image_id,
-        Image.user_id == user_id
-    ).first()
+    image = await run_blocking(DATABASE, run_in_session, _get_user_image, image_id, user.id)
     
     if not image:
         raise HTTPException(
@@ -187,20 +219,17 @@ async def delete_image(
     
     # Delete from GCS
     try:
-        storage_client = storage.Client(project=settings.gcp_project_id)
-        bucket = storage_client.bucket(settings.gcs_bucket_images)
         # Extract blob name from gcs_path
         blob_name = image.gcs_path.replace(f"gs://{settings.gcs_bucket_images}/", "")
-        blob = bucket.blob(blob_name)
-        blob.delete()
+        with tracer.span("gcs.delete", bucket=settings.gcs_bucket_images):
+            await run_blocking(GCS, _delete_blob, blob_name)
         logger.info(f"Deleted image from GCS: {blob_name}")
     except Exception as e:
         logger.warning(f"Failed to delete image from GCS: {str(e)}")
         # Continue with DB deletion even if GCS deletion fails
     
     # Delete from database
-    db.delete(image)
-    db.commit()
+    await run_blocking_write(DATABASE, run_in_session, _delete_image, image_id)
     
     logger.info(f"Deleted image: ID {image_id}")
     return None
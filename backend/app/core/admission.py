@@ -0,0 +1,208 @@
+"""
+Admission control and load shedding
+Watches in-flight model calls, DB pool usage and event-loop lag. When a
+threshold is crossed, batch work (batch and project translation, project
+generation) is queued briefly and then rejected with 503 + Retry-After; past
+the critical level /generate and prompt optimization are shed as well.
+Interactive endpoints (refine, single translations, component regeneration,
+project CRUD) are always admitted.
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import event_loop_lag
+
+logger = logging.getLogger(__name__)
+
+LOW = "low"
+NORMAL = "normal"
+INTERACTIVE = "interactive"
+
+# First matching (method, path pattern) wins; everything else is interactive
+PRIORITIES = [
+    ("POST", re.compile(r"^/api/v1/translate/batch"), LOW),
+    ("POST", re.compile(r"^/api/v1/projects/\d+/(translate|generate)$"), LOW),
+    ("POST", re.compile(r"^/api/v1/generate$"), NORMAL),
+    ("POST", re.compile(r"^/api/v1/optimize-prompt"), NORMAL),
+]
+
+LAG_PROBE_INTERVAL_SECONDS = 0.1
+QUEUE_POLL_SECONDS = 0.1
+
+
+def priority_for(method: str, path: str) -> str:
+    for rule_method, pattern, priority in PRIORITIES:
+        if method == rule_method and pattern.match(path):
+            return priority
+    return INTERACTIVE
+
+
+class AdmissionController:
+    """Load signals and the shedding decision for each request"""
+
+    def __init__(
+        self,
+        max_model_calls: int,
+        max_db_pool_usage: float,
+        max_loop_lag_seconds: float,
+        critical_factor: float,
+        queue_seconds: float,
+        max_queued: int,
+        retry_after_seconds: int,
+    ):
+        self.max_model_calls = max_model_calls
+        self.max_db_pool_usage = max_db_pool_usage
+        self.max_loop_lag_seconds = max_loop_lag_seconds
+        self.critical_factor = critical_factor
+        self.queue_seconds = queue_seconds
+        self.max_queued = max_queued
+        self.retry_after_seconds = retry_after_seconds
+        self.model_calls = 0
+        self.loop_lag_seconds = 0.0
+        self.queued = 0
+        self.counts: Dict[Tuple[str, str], int] = {}  # (priority, outcome) -> requests
+        self.shed_reasons: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track_model_call(self):
+        """Count a model call as in flight for the whole process"""
+        with self._lock:
+            self.model_calls += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.model_calls -= 1
+
+    @staticmethod
+    def db_pool_usage() -> float:
+        """Checked-out share of the pool's connections (including overflow)"""
+        from app.db.session import engine
+
+        pool = engine.pool
+        capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+        return pool.checkedout() / capacity if capacity else 0.0
+
+    def load(self) -> Dict[str, float]:
+        """Each signal as a fraction of its threshold (1.0 = at threshold)"""
+        return {
+            "model_calls": self.model_calls / self.max_model_calls,
+            "db_pool": self.db_pool_usage() / self.max_db_pool_usage,
+            "loop_lag": self.loop_lag_seconds / self.max_loop_lag_seconds,
+        }
+
+    def overload(self, priority: str) -> Optional[str]:
+        """Signal that requires shedding this priority right now, None to admit"""
+        if priority == INTERACTIVE:
+            return None
+        limit = 1.0 if priority == LOW else self.critical_factor
+        for signal, value in self.load().items():
+            if value >= limit:
+                return signal
+        return None
+
+    def _count(self, priority: str, outcome: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            self.counts[(priority, outcome)] = self.counts.get((priority, outcome), 0) + 1
+            if reason:
+                self.shed_reasons[reason] = self.shed_reasons.get(reason, 0) + 1
+
+    async def admit(self, priority: str) -> Optional[str]:
+        """
+        Decide on a request, queueing low-priority work while overloaded
+
+        Returns:
+            None to admit, otherwise the signal the request was shed for
+        """
+        reason = self.overload(priority)
+        if reason is None:
+            self._count(priority, "admitted")
+            return None
+
+        if priority == LOW and self.queued < self.max_queued:
+            self.queued += 1
+            waited = 0.0
+            try:
+                while waited < self.queue_seconds:
+                    await asyncio.sleep(QUEUE_POLL_SECONDS)
+                    waited += QUEUE_POLL_SECONDS
+                    reason = self.overload(priority)
+                    if reason is None:
+                        self._count(priority, "queued")
+                        return None
+            finally:
+                self.queued -= 1
+
+        self._count(priority, "shed", reason)
+        logger.warning(f"Shedding {priority} request: {reason} over threshold ({self.load()})")
+        return reason
+
+    async def run_lag_monitor(self) -> None:
+        """Background task measuring how late the event loop wakes a sleeper"""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_INTERVAL_SECONDS)
+            self.loop_lag_seconds = max(0.0, time.perf_counter() - started - LAG_PROBE_INTERVAL_SECONDS)
+            event_loop_lag.observe(self.loop_lag_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = {f"{priority}_{outcome}": count for (priority, outcome), count in sorted(self.counts.items())}
+            shed_reasons = dict(self.shed_reasons)
+        return {
+            "model_calls_in_flight": self.model_calls,
+            "db_pool_usage": round(self.db_pool_usage(), 3),
+            "loop_lag_seconds": round(self.loop_lag_seconds, 4),
+            "queued": self.queued,
+            "requests": counts,
+            "shed_reasons": shed_reasons,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying admission control before routing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await admission_controller.admit(priority_for(scope["method"], scope["path"]))
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": f"Server overloaded ({reason}), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(admission_controller.retry_after_seconds).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global controller
+admission_controller = AdmissionController(
+    max_model_calls=settings.admission_max_model_calls,
+    max_db_pool_usage=settings.admission_max_db_pool_usage,
+    max_loop_lag_seconds=settings.admission_max_loop_lag_seconds,
+    critical_factor=settings.admission_critical_factor,
+    queue_seconds=settings.admission_queue_seconds,
+    max_queued=settings.admission_max_queued,
+    retry_after_seconds=settings.admission_retry_after_seconds,
+)
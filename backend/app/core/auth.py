@@ -5,11 +5,11 @@ import logging
 from typing import NamedTuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from clerk_backend_api import Clerk
 from app.core.config import settings
-from fastapi import Request # Import Request
-from clerk_backend_api.jwks_helpers import AuthenticateRequestOptions # Import AuthenticateRequestOptions
-import httpx # Import httpx for httpx.Request
+from app.core.executors import CLERK, run_blocking
+from app.core.token_verifier import TokenVerificationError, get_token_verifier
+from app.core.tracing import tracer
+from app.services.user_directory import get_user_directory
 
 logger = logging.getLogger(__name__)
 
@@ -23,54 +23,56 @@ class User(NamedTuple):
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
-# Initialize Clerk client
-clerk_client = None
-if settings.clerk_secret_key:
-    try:
-        clerk_client = Clerk(bearer_auth=settings.clerk_secret_key)
-        logger.debug(f"Clerk client initialized: {clerk_client}")
-        logger.debug(f"Type of clerk_client: {type(clerk_client)}")
-    except Exception as e:
-        logger.error(f"Failed to initialize Clerk client: {e}", exc_info=True)
-        clerk_client = None # Ensure it's None if init fails
-else:
-    logger.warning("CLERK_SECRET_KEY not provided. Running without Clerk authentication.")
-    logger.info(f"Clerk client is active. Settings environment: {settings.environment}")
+# Clerk client (lazy: the SDK is imported and the client created on the first authenticated request)
+_clerk_client = None
+_clerk_initialized = False
 
 
-def _get_httpx_request(request: Request) -> httpx.Request:
-    """Converts a FastAPI Request to an httpx.Request."""
-    # Extract headers, excluding host, as httpx will add it.
-    headers = {k: v for k, v in request.headers.items() if k.lower() != 'host'}
+def get_clerk_client():
+    """Get or create the Clerk client, None when Clerk is not configured"""
+    global _clerk_client, _clerk_initialized
+    if _clerk_initialized:
+        return _clerk_client
+    _clerk_initialized = True
+    if settings.clerk_secret_key:
+        try:
+            from clerk_backend_api import Clerk
+            _clerk_client = Clerk(bearer_auth=settings.clerk_secret_key)
+            logger.debug(f"Clerk client initialized: {_clerk_client}")
+        except Exception as e:
+            logger.error(f"Failed to initialize Clerk client: {e}", exc_info=True)
+            _clerk_client = None # Ensure it's None if init fails
+    else:
+        logger.warning("CLERK_SECRET_KEY not provided. Running without Clerk authentication.")
+        logger.info(f"Settings environment: {settings.environment}")
+    return _clerk_client
 
-    # Get the full URL
-    url = str(request.url)
 
-    # Reconstruct the httpx.Request
-    return httpx.Request(
-        method=request.method,
-        url=url,
-        headers=headers,
-    )
+async def get_clerk_client_async():
+    """get_clerk_client off the event loop (the first call imports the SDK)"""
+    if _clerk_initialized:
+        return _clerk_client
+    return await run_blocking(CLERK, get_clerk_client)
 
 
 async def get_current_user(
-    request: Request,  # Inject FastAPI's Request object
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """
     Dependency to get current authenticated user from JWT token
-    
+
+    The token is verified locally against Clerk's cached JWKS (see
+    app/core/token_verifier.py); no network call is made per request.
+
     Returns:
         User: User object with id and name
         
     Raises:
         HTTPException: If token is invalid or user not authenticated
     """
-    if not clerk_client:
+    if not settings.clerk_secret_key:
         if settings.environment == "development":
-            logger.info(f"Running in development mode with settings.environment: {settings.environment}")
-            logger.warning("Clerk not configured, using development mode")
+            logger.debug("Clerk not configured, using development mode")
             return User(id="dev-user-123", name="Dev User")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -78,40 +80,15 @@ async def get_current_user(
         )
     
     try:
-        httpx_request = _get_httpx_request(request)
-        
-        # Authenticate the request with Clerk
-        # Note: The 'options' parameter is currently an empty dict. 
-        # For now, let's omit it for initial testing.
-        request_state = clerk_client.authenticate_request(httpx_request, AuthenticateRequestOptions())
-        
-        if not request_state.is_signed_in:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # ONLY attempt to access user details if authentication was successful
-        # With clerk-backend-api v1.5.0, user_id is directly on the RequestState object
-        # if the user is signed in. There is no .user or .claims nested object.
-        # The user ID is the 'sub' (subject) claim in the JWT payload.
-        user_id = request_state.payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User ID (sub) not found in token payload",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # The name is not directly available in the session token by default.
-        # We will use the user_id as a placeholder for the name.
-        # A more advanced implementation might fetch user details from Clerk's User API
-        # using the user_id, but for now, this will suffice.
-        user_name = f"User {user_id}"
-        
-        return User(id=user_id, name=user_name)
-        
+        with tracer.span("auth.verify_token"):
+            claims = await get_token_verifier().verify(credentials.credentials)
+    except TokenVerificationError as e:
+        logger.info(f"Rejected token: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     except Exception as e:
         logger.error(f"Authentication error: {str(e)}", exc_info=True) # Log full traceback
         raise HTTPException(
@@ -120,6 +97,19 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # The user ID is the 'sub' (subject) claim in the JWT payload.
+    user_id = claims["sub"]
+
+    # The name is not in the session token: use the directory's cached name, and
+    # resolve it in the background on a miss rather than delaying the request
+    directory = get_user_directory()
+    user_name = directory.peek(user_id)
+    if user_name is None:
+        directory.prefetch(user_id)
+        user_name = f"User {user_id}"
+
+    return User(id=user_id, name=user_name)
+
 
 async def get_optional_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security)
@@ -0,0 +1,172 @@
+"""
+Event-loop blocking detector
+A heartbeat task on the loop and a watchdog thread beside it: when the
+heartbeat is late by more than the threshold, the watchdog captures the loop
+thread's stack and attributes the stall to the innermost app call site
+(e.g. a sync SDK or DB call made from an async handler). Sites are aggregated
+with counts and durations for /health, /metrics and the logs. Stacks are only
+captured while the loop is stalled, so the monitor is cheap enough for
+production.
+"""
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+LIBRARY_ROOTS = tuple(
+    path + os.sep for path in {sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"]}
+)
+STACK_DEPTH = 12  # Innermost frames kept per site
+OTHER_SITE = "other"
+
+
+def _location(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(APP_ROOT):
+        filename = "app/" + filename[len(APP_ROOT):]
+    return f"{filename}:{frame.lineno} {frame.name}"
+
+
+def call_site(stack: List[traceback.FrameSummary]) -> Tuple[str, str]:
+    """
+    (site, blocked in) for a stack ordered outermost first
+
+    The site is the innermost frame of our own code (the app package, else
+    anything outside the standard library and installed packages); blocked
+    in is the innermost frame overall, usually inside the blocking library.
+    """
+    own = [f for f in stack if f.filename.startswith(APP_ROOT) and f.filename != __file__]
+    if not own:
+        own = [f for f in stack if not f.filename.startswith(LIBRARY_ROOTS)]
+    site = own[-1] if own else stack[-1]
+    return _location(site), _location(stack[-1])
+
+
+class BlockingDetector:
+    """Finds the code holding the event loop beyond a threshold"""
+
+    def __init__(self, threshold_seconds: float, max_sites: int = 50, log_interval_seconds: float = 60.0):
+        self.threshold_seconds = threshold_seconds
+        self.interval = threshold_seconds / 4
+        self.max_sites = max_sites
+        self.log_interval_seconds = log_interval_seconds
+        self.stalls = 0
+        self._sites: Dict[str, dict] = {}
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    async def run(self, asyncio_debug: bool = False) -> None:
+        """Heartbeat task; runs the watchdog thread for as long as it is alive"""
+        loop = asyncio.get_running_loop()
+        if asyncio_debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold_seconds
+
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                self._beat = time.monotonic()
+                await asyncio.sleep(self.interval)
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        stalled_beat = None
+        current: Optional[dict] = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold_seconds:
+                continue
+            if beat == stalled_beat:
+                if current is not None:
+                    self._extend(current, stalled)
+                continue
+            stalled_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            current = self.record(traceback.extract_stack(frame), stalled) if frame is not None else None
+
+    def record(self, stack: List[traceback.FrameSummary], stalled: float) -> dict:
+        """Attribute one stall to the call site of its stack"""
+        site, blocked_in = call_site(stack)
+        now = time.time()
+        with self._lock:
+            self.stalls += 1
+            if site not in self._sites and len(self._sites) >= self.max_sites:
+                site = OTHER_SITE
+            entry = self._sites.setdefault(site, {
+                "site": site,
+                "count": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "blocked_in": blocked_in,
+                "stack": [],
+                "last_seen": now,
+                "logged_at": 0.0,
+                "_current_seconds": 0.0,
+            })
+            entry["count"] += 1
+            entry["total_seconds"] += stalled
+            entry["max_seconds"] = max(entry["max_seconds"], stalled)
+            entry["blocked_in"] = blocked_in
+            entry["stack"] = [_location(f) for f in stack[-STACK_DEPTH:]]
+            entry["last_seen"] = now
+            entry["_current_seconds"] = stalled
+            should_log = now - entry["logged_at"] >= self.log_interval_seconds
+            if should_log:
+                entry["logged_at"] = now
+
+        if should_log:
+            logger.warning(
+                f"Event loop blocked for over {self.threshold_seconds}s at {site} (in {blocked_in})\n  "
+                + "\n  ".join(entry["stack"])
+            )
+        return entry
+
+    def _extend(self, entry: dict, stalled: float) -> None:
+        """The same stall is still going on: grow its recorded duration"""
+        with self._lock:
+            entry["total_seconds"] += stalled - entry["_current_seconds"]
+            entry["max_seconds"] = max(entry["max_seconds"], stalled)
+            entry["_current_seconds"] = stalled
+
+    def sites(self) -> List[dict]:
+        """Call sites, the most total blocking first"""
+        with self._lock:
+            entries = [
+                {key: value for key, value in entry.items() if not key.startswith("_") and key != "logged_at"}
+                for entry in self._sites.values()
+            ]
+        for entry in entries:
+            entry["total_seconds"] = round(entry["total_seconds"], 3)
+            entry["max_seconds"] = round(entry["max_seconds"], 3)
+        return sorted(entries, key=lambda entry: entry["total_seconds"], reverse=True)
+
+    def snapshot(self, top: int = 10) -> dict:
+        return {
+            "threshold_seconds": self.threshold_seconds,
+            "stalls": self.stalls,
+            "sites": [
+                {key: entry[key] for key in ("site", "blocked_in", "count", "total_seconds", "max_seconds")}
+                for entry in self.sites()[:top]
+            ],
+        }
+
+
+# Global detector
+blocking_detector = BlockingDetector(settings.blocking_threshold_seconds)
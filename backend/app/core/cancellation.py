@@ -0,0 +1,184 @@
+"""
+Request cancellation
+Cancels in-flight LLM work when the client disconnects or a newer request
+supersedes it (e.g. regenerating the same component again), and counts the
+model calls and output tokens that were not spent as a result
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_SECONDS = 0.5
+CLIENT_CLOSED_REQUEST = 499  # nginx convention, never seen by the (gone) client
+
+
+class WorkTracker:
+    """Model calls currently in flight on behalf of one request"""
+
+    def __init__(self):
+        self.calls = 0
+        self.output_tokens = 0
+
+    def begin(self, max_tokens: int) -> None:
+        self.calls += 1
+        self.output_tokens += max_tokens
+
+    def end(self, max_tokens: int) -> None:
+        self.calls -= 1
+        self.output_tokens -= max_tokens
+
+
+class CancellationStats:
+    """Cancelled requests and the model work they avoided"""
+
+    def __init__(self):
+        self.disconnected = 0
+        self.superseded = 0
+        self.model_calls_cancelled = 0
+        self.output_tokens_saved = 0  # Upper bound: max_output_tokens of cancelled calls
+        self._lock = threading.Lock()
+
+    def record(self, reason: str, work: WorkTracker) -> None:
+        with self._lock:
+            setattr(self, reason, getattr(self, reason) + 1)
+            self.model_calls_cancelled += work.calls
+            self.output_tokens_saved += work.output_tokens
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "disconnected": self.disconnected,
+                "superseded": self.superseded,
+                "model_calls_cancelled": self.model_calls_cancelled,
+                "output_tokens_saved": self.output_tokens_saved,
+            }
+
+
+class _Handle:
+    def __init__(self, task: asyncio.Task, work: WorkTracker):
+        self.task = task
+        self.work = work
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str) -> None:
+        if self.task.done() or self.reason:
+            return
+        self.reason = reason
+        cancellation_stats.record(reason, self.work)
+        self.task.cancel()
+
+
+_current_work: ContextVar[Optional[WorkTracker]] = ContextVar("current_work", default=None)
+_survive_disconnect: ContextVar[bool] = ContextVar("survive_disconnect", default=False)
+_inflight_by_key: Dict[str, _Handle] = {}
+
+
+def survive_disconnect() -> None:
+    """
+    Let request work started from the current context run to completion when
+    the client disconnects (its result is kept for a retry, e.g. under an
+    Idempotency-Key); supersession still cancels it
+    """
+    _survive_disconnect.set(True)
+
+
+@contextmanager
+def track_model_call(max_tokens: int = 0):
+    """Mark a model call as in flight for the current request (if any)"""
+    work = _current_work.get()
+    if work is None:
+        yield
+        return
+    work.begin(max_tokens)
+    try:
+        yield
+    finally:
+        work.end(max_tokens)
+
+
+async def _with_work(work: WorkTracker, awaitable: Awaitable[Any]) -> Any:
+    _current_work.set(work)
+    return await awaitable
+
+
+async def run_cancellable(
+    request: Optional[Request],
+    awaitable: Awaitable[Any],
+    supersede_key: Optional[str] = None,
+) -> Any:
+    """
+    Run request work as a task that is cancelled if the client disconnects
+    or another request with the same supersede_key starts
+
+    Raises:
+        HTTPException: 499 when the client disconnected, 409 when superseded
+    """
+    work = WorkTracker()
+    handle = _Handle(asyncio.ensure_future(_with_work(work, awaitable)), work)
+
+    if supersede_key:
+        previous = _inflight_by_key.get(supersede_key)
+        if previous is not None:
+            logger.info(f"Cancelling superseded request for {supersede_key}")
+            previous.cancel("superseded")
+        _inflight_by_key[supersede_key] = handle
+
+    try:
+        while not handle.task.done():
+            await asyncio.wait({handle.task}, timeout=DISCONNECT_POLL_SECONDS)
+            if (
+                not handle.task.done()
+                and request is not None
+                and not _survive_disconnect.get()
+                and await request.is_disconnected()
+            ):
+                logger.info(
+                    f"Client disconnected from {request.url.path}, "
+                    f"cancelling {work.calls} in-flight model call(s)"
+                )
+                handle.cancel("disconnected")
+        return handle.task.result()
+    except asyncio.CancelledError:
+        if handle.reason == "superseded":
+            raise HTTPException(status_code=409, detail="Superseded by a newer request")
+        if handle.reason == "disconnected":
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+        handle.task.cancel()
+        raise
+    finally:
+        if supersede_key and _inflight_by_key.get(supersede_key) is handle:
+            del _inflight_by_key[supersede_key]
+
+
+def cancel_on_disconnect(supersede_key: Callable[..., Optional[str]] | None = None):
+    """
+    Endpoint decorator running the handler through run_cancellable
+
+    The handler must take a starlette Request parameter. supersede_key receives
+    the handler's keyword arguments and returns a key (or None), directly or
+    as an awaitable. Keys should name the caller (user) as well as the
+    resource, so one user never cancels another's request.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = next((v for v in kwargs.values() if isinstance(v, Request)), None)
+            key = supersede_key(**kwargs) if supersede_key else None
+            if inspect.isawaitable(key):
+                key = await key
+            return await run_cancellable(request, func(*args, **kwargs), key)
+        return wrapper
+    return decorator
+
+
+# Global counters of cancelled work
+cancellation_stats = CancellationStats()
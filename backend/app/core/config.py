@@ -16,6 +16,19 @@ class Settings(BaseSettings):
     # Vertex AI
     vertex_ai_model: str = "gemini-2.5-pro"
     vertex_ai_model_flash: str = "gemini-2.5-flash"
+
+    # Model routing
+    model_routing_table: str = ""  # JSON list of routes overriding the defaults in app/core/model_router.py
+    router_min_samples: int = 10  # Observations needed before p95 / error rate drive a fallback
+    router_error_rate_threshold: float = 0.2  # Pro error rate above which requests fall back to Flash
+    router_sample_max_age_seconds: float = 300.0  # Older latency / outcome samples are forgotten, so a fallback recovers
+    circuit_breaker_failure_threshold: int = 5  # Consecutive failures that open a model's circuit
+    circuit_breaker_cooldown_seconds: float = 30.0  # Time before a half-open probe is allowed
+    hedging_enabled: bool = False  # Fire a backup request when a call runs past the hedge percentile
+    hedge_percentile: float = 95.0  # Percentile of recent latency after which a call is hedged
+    hedge_min_samples: int = 20  # Latency samples needed before hedging a model
+    hedge_budget_ratio: float = 0.05  # Max hedged share of recent model calls
+    hedge_use_flash: bool = True  # Send backups to Flash instead of the same model
     
     # Cloud Storage
     gcs_bucket_prompts: str = "mosaico-prompts"
@@ -27,6 +40,15 @@ class Settings(BaseSettings):
     
     # Authentication
     clerk_secret_key: str | None = None
+    clerk_api_url: str = "https://api.clerk.com"
+    clerk_authorized_parties: str = ""  # Comma-separated origins allowed in the azp claim (empty: any)
+    clerk_jwks_refresh_seconds: float = 3600.0  # Background JWKS refresh interval
+    auth_token_cache_size: int = 10000  # Verified tokens memoized until their exp
+    auth_clock_skew_seconds: float = 5.0
+    user_directory_ttl_seconds: float = 3600.0  # Cached display names for audit fields
+    user_directory_miss_ttl_seconds: float = 300.0  # Unknown users and failed lookups
+    user_directory_max_entries: int = 10000
+    user_directory_batch_size: int = 100  # User ids per Clerk users API call
     
     # Google Sheets API
     google_sheets_credentials_path: str | None = None
@@ -36,10 +58,78 @@ class Settings(BaseSettings):
     api_version: str = "1.0.0"
     environment: str = "development"
     
-    # Rate Limiting
-    rate_limit_per_second: int = 30  # Higher for local dev, will use batch endpoint in production
-    rate_limit_burst: int = 50
+    # Rate Limiting (cost units: roughly one per component or cell the model produces)
+    rate_limit_backend: str = "database"  # "database" (shared) or "memory" (single instance)
+    rate_limit_per_second: float = 2.0  # Units refilled per second, per user
+    rate_limit_burst: float = 150.0  # Bucket capacity; larger requests are charged a full bucket
+
+    # Admission control (batch work is shed first, interactive endpoints never)
+    admission_enabled: bool = True
+    admission_max_model_calls: int = 40  # Model calls in flight per instance
+    admission_max_db_pool_usage: float = 0.9  # Checked-out share of the DB pool
+    admission_max_loop_lag_seconds: float = 0.25  # Event-loop scheduling delay
+    admission_critical_factor: float = 1.5  # Multiple of the thresholds above which /generate is shed too
+    admission_queue_seconds: float = 5.0  # How long batch requests wait for load to drop before a 503
+    admission_max_queued: int = 50
+    admission_retry_after_seconds: int = 5
+
+    # Event-loop blocking detector (stack of whatever holds the loop past the threshold)
+    blocking_detector_enabled: bool = True
+    blocking_threshold_seconds: float = 0.1
+    blocking_asyncio_debug: bool = False  # Also asyncio debug mode with slow-callback warnings (development)
+
+    # Bounded thread pools for blocking SDK and DB calls (one per dependency)
+    executor_gcs_workers: int = 4
+    executor_sheets_workers: int = 2
+    executor_clerk_workers: int = 2
+    executor_database_workers: int = 10  # No more than the DB pool size + overflow
+    executor_max_queue: int = 100  # Calls waiting per executor before requests get a 503
+    executor_timeout_seconds: float = 30.0  # Per call, also capped by the request deadline
+
+    # Tracing (spans per request around auth, SQL, model attempts and GCS / Sheets / Slack calls)
+    tracing_exporter: str = "memory"  # "memory" (recent spans, /debug/traces in development), "file" or "none"
+    tracing_file_path: str = "traces.jsonl"  # One JSON span per line when exporting to a file
+    tracing_memory_spans: int = 5000  # Finished spans kept by the in-memory exporter
     
+    # Deadlines
+    deadline_default_seconds: float = 60.0  # Budget for endpoints without a specific default
+    deadline_max_seconds: float = 300.0  # Cap on budgets requested via X-Request-Timeout-Ms
+    deadline_min_attempt_seconds: float = 3.0  # Floor for the expected duration of one model call
+
+    # Warm-up
+    warmup_enabled: bool = True  # Warm dependencies at startup; /ready reports 503 until done
+    warmup_db_connections: int = 5  # Pooled connections opened ahead of traffic (<= pool size)
+    warmup_timeout_seconds: float = 20.0  # Per-dependency limit, a slow step does not hold readiness
+
+    # Generation
+    subject_char_budget: int = 60
+    pre_header_char_budget: int = 100
+    banned_phrases: str = ""  # Comma-separated phrases never allowed in generated copy
+    max_repair_rounds: int = 2
+    shortfall_use_flash: bool = True  # Top up missing variations with Flash
+    fan_out_max_calls: int = 3  # Max parallel calls a multi-variation request is split into
+    fan_out_min_components: int = 12  # variations x components above which "auto" fans out
+    fan_out_latency_threshold_seconds: float = 25.0  # Observed p95 above which "auto" fans out
+    fan_out_temperature_spread: float = 0.1  # Temperature step between parallel calls
+    token_budget_safety_factor: float = 1.5  # Headroom over the estimated output size
+    token_budget_reasoning_tokens: int = 1024  # Gemini 2.5 thinking counts against max_output_tokens
+    token_budget_reasoning_tokens_pro: int = 8192  # Pro always thinks, and far more than Flash: replaces the allowance above
+    token_budget_min: int = 512
+    token_budget_max: int = 8192
+
+    # Idempotency
+    idempotency_backend: str = "database"  # "database" (shared) or "memory" (single instance)
+    idempotency_ttl_seconds: int = 86400
+    idempotency_purge_interval_seconds: float = 3600.0  # How often expired keys are deleted
+
+    # Translation
+    translation_protected_terms: str = ""  # Comma-separated brand names never sent for translation
+    translation_segment_min_chars: int = 400  # Body copy longer than this is translated per sentence
+    translation_memory_max_entries: int = 20000
+    translation_memory_ttl_seconds: int = 86400
+    speculative_translation_max_concurrency: int = 2  # Background translations running at once
+    speculative_translation_ttl_seconds: float = 300.0  # Unclaimed speculative work is cancelled after this
+
     # CORS
     allowed_origins: str = "*"
     
@@ -55,7 +145,8 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
-        case_sensitive=False
+        case_sensitive=False,
+        protected_namespaces=(),  # model_routing_table is a setting, not a pydantic "model_" attribute
     )
     
     @property
@@ -0,0 +1,185 @@
+"""
+End-to-end request deadlines
+A per-request deadline (from the X-Request-Timeout-Ms header or a per-endpoint
+default) carried in a contextvar and respected by retry loops, backoff sleeps,
+image downloads and database statements
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.latency import latency_tracker
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+# Per-endpoint defaults (first matching path pattern wins), seconds. None: no deadline
+# unless the client sends one; project batch endpoints make dozens of sequential
+# model calls and keep their partial work, so a fixed budget would only cut them short
+ENDPOINT_DEADLINES = [
+    (re.compile(r"^/api/v1/projects/\d+/(translate|generate)$"), None),
+    (re.compile(r"^/api/v1/generate/component"), 20.0),
+    (re.compile(r"^/api/v1/generate"), 60.0),
+    (re.compile(r"^/api/v1/translate/batch"), 90.0),
+    (re.compile(r"^/api/v1/translate"), 30.0),
+    (re.compile(r"^/api/v1/refine"), 30.0),
+    (re.compile(r"^/api/v1/optimize-prompt"), 30.0),
+]
+
+WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    """The request's time budget cannot cover the next step"""
+
+    def __init__(self, detail: str = "Request deadline exceeded"):
+        super().__init__(status_code=504, detail=detail)
+
+
+class InvalidDeadline(ValueError):
+    """The client asked for a budget that has already run out"""
+
+
+def default_for_path(path: str) -> Optional[float]:
+    for pattern, seconds in ENDPOINT_DEADLINES:
+        if pattern.match(path):
+            return seconds
+    return settings.deadline_default_seconds
+
+
+def deadline_from_header(value: Optional[str], path: str) -> Optional[float]:
+    """
+    Budget in seconds from the header (capped) or the endpoint default
+
+    Raises:
+        InvalidDeadline: If the header asks for a budget of zero or less
+    """
+    if value:
+        try:
+            milliseconds = int(value)
+        except ValueError:
+            logger.warning(f"Ignoring invalid {DEADLINE_HEADER} header: {value!r}")
+        else:
+            if milliseconds <= 0:
+                raise InvalidDeadline(f"{DEADLINE_HEADER} must be a positive number of milliseconds")
+            return min(milliseconds / 1000, settings.deadline_max_seconds)
+    return default_for_path(path)
+
+
+def set_deadline(seconds: Optional[float]):
+    """Start a deadline (None: none) for the current context; returns a token for reset_deadline"""
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def reset_deadline(token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request, None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check(what: str = "operation") -> None:
+    """Raise DeadlineExceeded if the deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before {what}")
+
+
+def timeout_for(default: float) -> float:
+    """default, shortened to the time left (raises if none is left)"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded()
+    return min(default, left)
+
+
+def expected_call_seconds(model_name: str) -> float:
+    """Typical duration of one model call: observed p50, with a floor"""
+    p50 = latency_tracker.percentile(model_name, 50, min_samples=5)
+    return max(settings.deadline_min_attempt_seconds, p50 or 0.0)
+
+
+def can_afford(seconds: float) -> bool:
+    """Whether the remaining budget covers a step expected to take this long"""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+async def sleep(seconds: float) -> None:
+    """Backoff sleep that fails fast instead of sleeping past the deadline"""
+    left = remaining()
+    if left is not None and left <= seconds:
+        raise DeadlineExceeded("Request deadline exceeded during retry backoff")
+    await asyncio.sleep(seconds)
+
+
+async def bounded(awaitable, what: str = "operation"):
+    """Await with a timeout of the remaining budget"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"Request deadline exceeded before {what}")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Request deadline exceeded during {what}")
+
+
+class DeadlineMiddleware:
+    """ASGI middleware starting the request deadline before routing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope.get("headers") or []).get(DEADLINE_HEADER.encode())
+        try:
+            seconds = deadline_from_header(header.decode() if header else None, scope["path"])
+        except InvalidDeadline as e:
+            body = json.dumps({"detail": str(e)}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        token = set_deadline(seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    SQLAlchemy hook: do not start reads once the request is out of time
+
+    Writes still go through, so work already paid for (e.g. translations
+    saved one by one) is kept when the deadline hits mid-request.
+    """
+    if not WRITE_STATEMENT.match(statement):
+        check("database query")
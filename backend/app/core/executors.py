@@ -0,0 +1,182 @@
+"""
+Bounded executors for blocking I/O
+Named thread pools, one per blocking dependency (GCS, Google Sheets, Clerk,
+sync SQLAlchemy), so a slow dependency queues behind its own workers instead
+of starving the others in the default executor. Each pool caps its queue
+(ExecutorSaturated past it) and every call has a timeout, also bounded by
+the request deadline. Calls run in a copy of the caller's context, so trace
+spans and deadlines carry over into the worker thread.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core import deadline
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GCS = "gcs"
+SHEETS = "sheets"
+CLERK = "clerk"
+DATABASE = "database"
+
+
+class ExecutorSaturated(Exception):
+    """The executor's queue is full; the caller should back off"""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} executor is saturated")
+        self.name = name
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded queue and per-call timeouts"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout_seconds: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-io")
+
+    @property
+    def saturation(self) -> float:
+        """Busy share of the workers (above 1.0 once calls are queueing)"""
+        return (self.active + self.queued) / self.max_workers
+
+    def _call(self, context: contextvars.Context, func: Callable, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return context.run(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def _dequeue_if_cancelled(self, future: Future) -> None:
+        if future.cancelled():  # Never started, so _call did not take it off the queue
+            with self._lock:
+                self.queued -= 1
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Queue a call on the pool
+
+        Raises:
+            ExecutorSaturated: If max_queue calls are already waiting for a worker
+        """
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(self.name)
+            self.queued += 1
+        future = self._pool.submit(self._call, contextvars.copy_context(), func, args, kwargs)
+        future.add_done_callback(self._dequeue_if_cancelled)
+        return future
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking call in the pool and await its result
+
+        Raises:
+            ExecutorSaturated: If the queue is full
+            TimeoutError: If the call takes longer than timeout (the executor's default if None)
+            DeadlineExceeded: If the request deadline passes first
+        """
+        timeout = self.timeout_seconds if timeout is None else timeout
+        future = asyncio.wrap_future(self.submit(func, *args, **kwargs))
+        try:
+            return await deadline.bounded(asyncio.wait_for(future, timeout), what=f"{self.name} call")
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            # A call already running keeps its worker until it returns; only the caller is released
+            logger.warning(f"{self.name} call timed out after {timeout}s")
+            raise TimeoutError(f"{self.name} call timed out after {timeout}s")
+
+    async def run_to_completion(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking call in the pool and wait for its outcome, however long
+
+        For writes: a caller released by a timeout could not tell whether the
+        write went through, and would go on while it may still commit.
+
+        Raises:
+            ExecutorSaturated: If the queue is full
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "saturation": round(self.saturation, 3),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global registry (lazy: a pool's threads are only created when it is first used)
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _workers(name: str) -> int:
+    return {
+        GCS: settings.executor_gcs_workers,
+        SHEETS: settings.executor_sheets_workers,
+        CLERK: settings.executor_clerk_workers,
+        DATABASE: settings.executor_database_workers,
+    }[name]
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Executor for a dependency (GCS, SHEETS, CLERK or DATABASE)"""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = BoundedExecutor(
+                    name, _workers(name), settings.executor_max_queue, settings.executor_timeout_seconds
+                )
+    return executor
+
+
+async def run_blocking(name: str, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """Run a blocking call in the named executor (see BoundedExecutor.run)"""
+    return await get_executor(name).run(func, *args, timeout=timeout, **kwargs)
+
+
+async def run_blocking_write(name: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking write in the named executor, without timeout (see BoundedExecutor.run_to_completion)"""
+    return await get_executor(name).run_to_completion(func, *args, **kwargs)
+
+
+def executors_snapshot() -> Dict[str, dict]:
+    return {name: executor.snapshot() for name, executor in sorted(_executors.items())}
+
+
+def shutdown_executors() -> None:
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown()
+        _executors.clear()
@@ -0,0 +1,154 @@
+"""
+Hedged requests
+If a model call has not returned after a percentile of recent latency, a backup
+request is fired; the first valid result wins and the other call is cancelled.
+A global budget caps hedges to a share of primary calls.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.latency import latency_tracker
+
+logger = logging.getLogger(__name__)
+
+HEDGE_WINDOW = 500
+
+
+class HedgeBudget:
+    """Allows hedges while they stay under ratio x recent primary calls"""
+
+    def __init__(self, ratio: float, window: int = HEDGE_WINDOW):
+        self.ratio = ratio
+        self._calls: deque = deque(maxlen=window)  # True = hedged
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._calls.append(False)
+
+    def try_acquire(self) -> bool:
+        """Spend one hedge if the budget allows it"""
+        with self._lock:
+            if not self._calls:
+                return False
+            hedged = sum(self._calls)
+            if (hedged + 1) / len(self._calls) > self.ratio:
+                return False
+            # Mark the most recent primary call as hedged
+            for i in range(len(self._calls) - 1, -1, -1):
+                if not self._calls[i]:
+                    self._calls[i] = True
+                    break
+            return True
+
+
+class HedgeStats:
+    """Counts of hedges fired, won and skipped for lack of budget"""
+
+    def __init__(self):
+        self.fired = 0
+        self.backup_wins = 0
+        self.primary_wins = 0
+        self.budget_denied = 0
+        self._lock = threading.Lock()
+
+    def record(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> Dict[str, float | int | None]:
+        with self._lock:
+            decided = self.backup_wins + self.primary_wins
+            return {
+                "fired": self.fired,
+                "backup_wins": self.backup_wins,
+                "primary_wins": self.primary_wins,
+                "budget_denied": self.budget_denied,
+                "backup_win_rate": self.backup_wins / decided if decided else None,
+            }
+
+
+def hedge_delay(model_name: str) -> Optional[float]:
+    """Seconds to wait before hedging a call to model_name, None if hedging does not apply"""
+    if not settings.hedging_enabled:
+        return None
+    return latency_tracker.percentile(
+        model_name, settings.hedge_percentile, min_samples=settings.hedge_min_samples
+    )
+
+
+def backup_model_for(model_name: str) -> str:
+    return settings.vertex_ai_model_flash if settings.hedge_use_flash else model_name
+
+
+async def hedged_call(
+    primary: Callable[[], Awaitable[str]],
+    backup: Callable[[], Awaitable[str]],
+    delay: Optional[float],
+    is_valid: Callable[[str], bool] = bool,
+) -> Tuple[str, bool]:
+    """
+    Await primary, racing it against backup if it is still running after delay
+
+    Args:
+        primary: Starts the original call
+        backup: Starts the backup call (only invoked if a hedge is fired)
+        delay: Seconds before hedging, None to never hedge
+        is_valid: Whether a result is acceptable; an invalid first result
+                  waits for the other call instead of winning
+
+    Returns:
+        (result, won_by_backup)
+    """
+    hedge_budget.record_call()
+    primary_task = asyncio.ensure_future(primary())
+    if delay is None:
+        return await primary_task, False
+
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done:
+            return primary_task.result(), False
+        if not hedge_budget.try_acquire():
+            hedge_stats.record("budget_denied")
+            return await primary_task, False
+    except BaseException:
+        primary_task.cancel()
+        raise
+
+    hedge_stats.record("fired")
+    logger.info(f"Hedging model call still running after {delay:.1f}s")
+    backup_task = asyncio.ensure_future(backup())
+    pending = {primary_task, backup_task}
+    last_error: BaseException | None = None
+    fallback_result: str | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    continue
+                result = task.result()
+                if not is_valid(result):
+                    fallback_result = result if fallback_result is None else fallback_result
+                    continue
+                won_by_backup = task is backup_task
+                hedge_stats.record("backup_wins" if won_by_backup else "primary_wins")
+                return result, won_by_backup
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if fallback_result is not None:
+        return fallback_result, False
+    raise last_error
+
+
+# Global hedge budget and win-rate counters
+hedge_budget = HedgeBudget(settings.hedge_budget_ratio)
+hedge_stats = HedgeStats()
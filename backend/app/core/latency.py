@@ -0,0 +1,134 @@
+"""
+Rolling latency and error tracking per model
+Feeds adaptive decisions (fan-out, routing) with recently observed call latency
+and failure rates. Samples also expire with age: a model that stops getting
+traffic (e.g. Pro after a fallback to Flash) sheds its bad window instead of
+keeping it until restart.
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+DEFAULT_WINDOW = 200
+
+
+class _RollingWindow:
+    """Fixed-size window of (time, value) samples, dropping those older than max_age_seconds"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, max_age_seconds: Optional[float] = None):
+        self.max_age_seconds = max_age_seconds
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def _append(self, value) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), value))
+
+    def _values(self) -> list:
+        with self._lock:
+            if self.max_age_seconds is not None:
+                cutoff = time.monotonic() - self.max_age_seconds
+                while self._samples and self._samples[0][0] < cutoff:
+                    self._samples.popleft()
+            return [value for _, value in self._samples]
+
+    def __len__(self) -> int:
+        return len(self._values())
+
+
+class RollingLatency(_RollingWindow):
+    """Recent latency samples (seconds)"""
+
+    def record(self, seconds: float) -> None:
+        self._append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile (p in 0-100), None without samples"""
+        samples = sorted(self._values())
+        if not samples:
+            return None
+        rank = max(1, math.ceil(p / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+
+class RollingOutcomes(_RollingWindow):
+    """Recent call outcomes (True = success)"""
+
+    def record(self, ok: bool) -> None:
+        self._append(ok)
+
+    def error_rate(self) -> Optional[float]:
+        outcomes = self._values()
+        if not outcomes:
+            return None
+        return outcomes.count(False) / len(outcomes)
+
+
+class LatencyTracker:
+    """Rolling latency and outcome windows keyed by model name"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, max_age_seconds: Optional[float] = None):
+        self.window = window
+        self.max_age_seconds = max_age_seconds
+        self._series: Dict[str, RollingLatency] = {}
+        self._outcomes: Dict[str, RollingOutcomes] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> RollingLatency:
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = RollingLatency(self.window, self.max_age_seconds)
+            return series
+
+    def _get_outcomes(self, key: str) -> RollingOutcomes:
+        with self._lock:
+            outcomes = self._outcomes.get(key)
+            if outcomes is None:
+                outcomes = self._outcomes[key] = RollingOutcomes(self.window, self.max_age_seconds)
+            return outcomes
+
+    def record(self, key: str, seconds: float) -> None:
+        """Record a successful call and its latency"""
+        self._get(key).record(seconds)
+        self._get_outcomes(key).record(True)
+
+    def record_error(self, key: str) -> None:
+        """Record a failed call (latency of failures is not tracked)"""
+        self._get_outcomes(key).record(False)
+
+    def error_rate(self, key: str, min_samples: int = 1) -> Optional[float]:
+        """Share of failed calls in the window, None until min_samples"""
+        outcomes = self._get_outcomes(key)
+        if len(outcomes) < min_samples:
+            return None
+        return outcomes.error_rate()
+
+    def percentile(self, key: str, p: float, min_samples: int = 1) -> Optional[float]:
+        """Percentile for a key, None until min_samples have been observed"""
+        series = self._get(key)
+        if len(series) < min_samples:
+            return None
+        return series.percentile(p)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """p50/p95, error rate and sample count for every key"""
+        with self._lock:
+            keys = list(self._series.keys() | self._outcomes.keys())
+        return {
+            key: {
+                "samples": len(self._get(key)),
+                "p50": self._get(key).percentile(50),
+                "p95": self._get(key).percentile(95),
+                "error_rate": self._get_outcomes(key).error_rate(),
+            }
+            for key in keys
+        }
+
+
+# Global tracker for model call latency
+latency_tracker = LatencyTracker(max_age_seconds=settings.router_sample_max_age_seconds)
@@ -0,0 +1,413 @@
+"""
+In-process metrics
+A small registry of counters, gauges and histograms rendered in the Prometheus
+text format on /metrics, plus collectors that read the existing stats objects
+(caches, admission control, background work) at scrape time.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+MODEL_LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 12, 16, 24, 32, 45, 60, 90)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}  # counts per bucket, [sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+# A collector returns (name, type, help, [(labels, value), ...]) families read at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+Collector = Callable[[], Iterable[Family]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+                continue
+            for name, type_, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {type_}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "endpoint", "status")
+)
+
+# Vertex AI
+model_call_duration = registry.histogram(
+    "vertex_call_duration_seconds", "Vertex AI call latency",
+    ("endpoint", "model", "operation", "attempt", "outcome"), MODEL_LATENCY_BUCKETS
+)
+model_tokens = registry.histogram(
+    "vertex_tokens", "Tokens per Vertex AI call", ("endpoint", "model", "operation", "kind"), TOKEN_BUCKETS
+)
+json_fixes = registry.counter(
+    "vertex_json_fixes_total", "Model calls re-issued to fix malformed JSON", ("operation",)
+)
+
+# Database
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled DB connection"
+)
+project_service_duration = registry.histogram(
+    "project_service_duration_seconds", "ProjectService call latency (queries included)", ("method",)
+)
+
+# Event loop
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "Delay of the event loop waking a periodic probe",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+# Request context for labels
+_endpoint: ContextVar[str] = ContextVar("metrics_endpoint", default="background")
+_operation: ContextVar[Optional[Tuple[str, List[int]]]] = ContextVar("metrics_operation", default=None)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(path: str) -> str:
+    """Path with numeric ids collapsed, so labels stay bounded"""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+@contextmanager
+def model_operation(name: str):
+    """Label model calls inside with an operation; nested calls of the same operation share the attempt count"""
+    current = _operation.get()
+    if current is not None and current[0] == name:
+        yield
+        return
+    token = _operation.set((name, [0]))
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def task_operation(func):
+    """Async method decorator labelling its model calls with the method's task argument"""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        with model_operation(bound.arguments["task"]):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+def record_model_call(model: str, seconds: float, outcome: str, response=None) -> Dict[str, object]:
+    """Observe one Vertex AI call under the current endpoint and operation; returns the labels and token counts"""
+    operation, calls = _operation.get() or ("other", [0])
+    calls[0] += 1
+    attempt = str(calls[0]) if calls[0] < 3 else "3+"
+    endpoint = _endpoint.get()
+    model_call_duration.observe(
+        seconds, endpoint=endpoint, model=model, operation=operation, attempt=attempt, outcome=outcome
+    )
+    details: Dict[str, object] = {"operation": operation, "attempt": attempt, "outcome": outcome}
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        for kind, count in (("prompt", usage.prompt_token_count), ("output", usage.candidates_token_count)):
+            if count:
+                model_tokens.observe(count, endpoint=endpoint, model=model, operation=operation, kind=kind)
+                details[f"{kind}_tokens"] = count
+    return details
+
+
+def record_json_fix() -> None:
+    operation, _ = _operation.get() or ("other", [0])
+    json_fixes.inc(operation=operation)
+
+
+def instrument_methods(histogram: Histogram):
+    """Class decorator timing every public staticmethod into histogram{method=...}"""
+    def decorator(cls):
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith("_") or not isinstance(attribute, staticmethod):
+                continue
+            func = attribute.__func__
+
+            @functools.wraps(func)
+            def timed(*args, __func=func, __name=name, **kwargs):
+                with histogram.time(method=__name):
+                    return __func(*args, **kwargs)
+
+            setattr(cls, name, staticmethod(timed))
+        return cls
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing requests and labelling the work they do with the endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = endpoint_label(scope["path"])
+        token = _endpoint.set(endpoint)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _endpoint.reset(token)
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                endpoint="unmatched" if status[0] == 404 else endpoint,  # Scanners must not add labels
+                status=str(status[0]),
+            )
+
+
+# Collectors over existing stats objects (imported lazily: they import this module's users)
+def _cache_families() -> Iterable[Family]:
+    from app.core.token_verifier import get_token_verifier
+    from app.services.translation_memory import get_translation_memory
+    from app.services.user_directory import get_user_directory
+
+    caches = {
+        "translation_memory": get_translation_memory().get_statistics(),
+        "auth_token": get_token_verifier().cache.snapshot(),
+        "user_directory": get_user_directory().get_statistics(),
+    }
+    hits, misses, ratios = [], [], []
+    for cache, stats in caches.items():
+        lookups = stats["hits"] + stats["misses"]
+        hits.append(({"cache": cache}, stats["hits"]))
+        misses.append(({"cache": cache}, stats["misses"]))
+        ratios.append(({"cache": cache}, stats["hits"] / lookups if lookups else 0.0))
+    yield "cache_hits_total", "counter", "Cache hits", hits
+    yield "cache_misses_total", "counter", "Cache misses", misses
+    yield "cache_hit_ratio", "gauge", "Cache hits over lookups since start", ratios
+
+
+def _background_families() -> Iterable[Family]:
+    from app.core.admission import admission_controller
+    from app.services.speculative_translation import get_speculative_translator
+
+    try:
+        tasks = len(asyncio.all_tasks())
+    except RuntimeError:
+        tasks = 0
+    yield "asyncio_tasks", "gauge", "Tasks scheduled on the event loop", [({}, tasks)]
+    yield "speculative_translations_pending", "gauge", "Speculative translations not yet claimed", [
+        ({}, get_speculative_translator().get_statistics()["pending"])
+    ]
+    yield "admission_queued_requests", "gauge", "Requests waiting for admission", [({}, admission_controller.queued)]
+    yield "vertex_calls_in_flight", "gauge", "Model calls in flight", [({}, admission_controller.model_calls)]
+    yield "event_loop_lag_last_seconds", "gauge", "Most recent event-loop lag sample", [
+        ({}, admission_controller.loop_lag_seconds)
+    ]
+    yield "admission_requests_total", "counter", "Admission decisions", [
+        ({"priority": priority, "outcome": outcome}, count)
+        for (priority, outcome), count in sorted(admission_controller.counts.items())
+    ]
+
+
+def _blocking_families() -> Iterable[Family]:
+    from app.core.blocking import blocking_detector
+
+    sites = blocking_detector.sites()
+    yield "event_loop_blocked_total", "counter", "Event-loop stalls over the blocking threshold", [
+        ({"site": entry["site"]}, entry["count"]) for entry in sites
+    ]
+    yield "event_loop_blocked_seconds_total", "counter", "Time the event loop was blocked", [
+        ({"site": entry["site"]}, entry["total_seconds"]) for entry in sites
+    ]
+
+
+def _executor_families() -> Iterable[Family]:
+    from app.core.executors import executors_snapshot
+
+    executors = executors_snapshot()
+    for key, type_, help in (
+        ("workers", "gauge", "Threads in the executor"),
+        ("active", "gauge", "Calls running in the executor"),
+        ("queued", "gauge", "Calls waiting for an executor thread"),
+        ("saturation", "gauge", "Running plus queued calls over threads"),
+        ("rejected", "counter", "Calls rejected because the executor queue was full"),
+        ("timeouts", "counter", "Executor calls that timed out"),
+    ):
+        name = f"executor_{key}_total" if type_ == "counter" else f"executor_{key}"
+        yield name, type_, help, [({"executor": executor}, stats[key]) for executor, stats in executors.items()]
+
+
+def _db_pool_families() -> Iterable[Family]:
+    from app.db.session import engine
+
+    pool = engine.pool
+    yield "db_pool_checked_out", "gauge", "DB connections in use", [({}, pool.checkedout())]
+    yield "db_pool_size", "gauge", "DB pool size (without overflow)", [({}, pool.size())]
+
+
+registry.add_collector(_cache_families)
+registry.add_collector(_background_families)
+registry.add_collector(_blocking_families)
+registry.add_collector(_executor_families)
+registry.add_collector(_db_pool_families)
@@ -0,0 +1,226 @@
+"""
+Latency-aware model router
+Chooses Gemini Pro or Flash per call from a routing table (task type,
+structure size, latency SLO) and falls back from Pro to Flash when Pro's
+observed p95 latency or error rate exceeds thresholds. Each model has a
+circuit breaker that stops traffic after repeated failures.
+"""
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.latency import latency_tracker
+
+logger = logging.getLogger(__name__)
+
+PRO = "pro"
+FLASH = "flash"
+LONG_COPY_TYPES = frozenset({"body", "full_email"})  # Narrative copy: never routed to a short_copy_only route
+
+
+@dataclass
+class Route:
+    """One routing table entry; the first matching entry wins"""
+    task: str  # "*" matches any task
+    tier: str  # "pro" or "flash"
+    max_components: Optional[int] = None  # Matches only up to this many components per call
+    short_copy_only: bool = False  # Matches only calls known to produce no body / full_email copy
+    latency_slo_seconds: float = 30.0  # p95 above which a Pro route falls back to Flash
+
+
+# Pro for long/narrative copy, Flash for short or mechanical work
+DEFAULT_ROUTES = [
+    Route(task="generate", tier=FLASH, max_components=2, short_copy_only=True, latency_slo_seconds=10.0),
+    Route(task="generate", tier=PRO, latency_slo_seconds=30.0),
+    Route(task="section", tier=PRO, latency_slo_seconds=20.0),
+    Route(task="component", tier=FLASH, latency_slo_seconds=8.0),
+    Route(task="repair", tier=FLASH, latency_slo_seconds=8.0),
+    Route(task="translate", tier=FLASH, latency_slo_seconds=10.0),
+    Route(task="optimize_prompt", tier=FLASH, latency_slo_seconds=10.0),
+    Route(task="refine", tier=PRO, latency_slo_seconds=15.0),
+    Route(task="*", tier=PRO, latency_slo_seconds=30.0),
+]
+
+
+def load_routes() -> List[Route]:
+    """Routing table from settings.model_routing_table (JSON list), or the defaults"""
+    if not settings.model_routing_table:
+        return list(DEFAULT_ROUTES)
+    try:
+        routes = [Route(**entry) for entry in json.loads(settings.model_routing_table)]
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid MODEL_ROUTING_TABLE, using defaults: {e}")
+        return list(DEFAULT_ROUTES)
+    return routes + [DEFAULT_ROUTES[-1]]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after N consecutive failures; after the cooldown one
+    half-open probe is let through, and its outcome closes or re-opens it
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent to this model now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+                return True  # Single probe
+            return False
+
+    def is_open(self) -> bool:
+        """Non-mutating check used when comparing candidate models"""
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "open":
+                return time.monotonic() - self.opened_at < self.cooldown_seconds
+            return True  # Half-open: a probe is already in flight
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def release_probe(self) -> None:
+        """A half-open probe ended without an outcome (cancelled, out of time): allow the next one"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.cooldown_seconds
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ModelRouter:
+    """Selects a model per call and records per-model outcomes"""
+
+    def __init__(self, routes: List[Route] | None = None):
+        self.routes = routes if routes is not None else load_routes()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def model_for_tier(tier: str) -> str:
+        return settings.vertex_ai_model_flash if tier == FLASH else settings.vertex_ai_model
+
+    def breaker(self, model_name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model_name)
+            if breaker is None:
+                breaker = self._breakers[model_name] = CircuitBreaker(
+                    settings.circuit_breaker_failure_threshold,
+                    settings.circuit_breaker_cooldown_seconds,
+                )
+            return breaker
+
+    def route_for(self, task: str, components: int = 0, long_copy: bool = True) -> Route:
+        for route in self.routes:
+            if route.task not in (task, "*"):
+                continue
+            if route.max_components is not None and components > route.max_components:
+                continue
+            if route.short_copy_only and long_copy:
+                continue
+            return route
+        return DEFAULT_ROUTES[-1]
+
+    def degraded_reason(self, model_name: str, latency_slo_seconds: float) -> Optional[str]:
+        """Why a model should be avoided right now, None if it looks healthy"""
+        if self.breaker(model_name).is_open():
+            return "circuit open"
+        p95 = latency_tracker.percentile(model_name, 95, min_samples=settings.router_min_samples)
+        if p95 is not None and p95 > latency_slo_seconds:
+            return f"p95 {p95:.1f}s > SLO {latency_slo_seconds:.1f}s"
+        error_rate = latency_tracker.error_rate(model_name, min_samples=settings.router_min_samples)
+        if error_rate is not None and error_rate > settings.router_error_rate_threshold:
+            return f"error rate {error_rate:.0%}"
+        return None
+
+    def select(
+        self,
+        task: str,
+        components: int = 0,
+        use_flash: bool | None = None,
+        component_types: Iterable[str] | None = None,
+    ) -> str:
+        """
+        Choose the model for a call
+
+        Args:
+            task: Task type used to look up the routing table
+            components: Components generated by the call (structure size)
+            use_flash: True forces Flash, False prefers Pro (with fallback),
+                       None lets the routing table decide
+            component_types: Types generated by the call; unknown (None) counts
+                             as long copy, so short_copy_only routes never match it
+
+        Returns:
+            Vertex AI model name
+        """
+        long_copy = component_types is None or any(t in LONG_COPY_TYPES for t in component_types)
+        route = self.route_for(task, components, long_copy)
+        tier = FLASH if use_flash else PRO if use_flash is False else route.tier
+        model_name = self.model_for_tier(tier)
+
+        if tier == PRO:
+            reason = self.degraded_reason(model_name, route.latency_slo_seconds)
+            flash = self.model_for_tier(FLASH)
+            if reason and not self.breaker(flash).is_open():
+                logger.info(f"Routing {task} to {flash} instead of {model_name}: {reason}")
+                return flash
+        elif self.breaker(model_name).is_open():
+            # Flash is down: Pro is slower but better than failing
+            pro = self.model_for_tier(PRO)
+            if not self.breaker(pro).is_open():
+                logger.info(f"Routing {task} to {pro}: circuit open for {model_name}")
+                return pro
+
+        self.breaker(model_name).allow()  # Moves an expired open circuit to half-open
+        return model_name
+
+    def record_success(self, model_name: str, seconds: float) -> None:
+        latency_tracker.record(model_name, seconds)
+        self.breaker(model_name).record_success()
+
+    def record_failure(self, model_name: str) -> None:
+        latency_tracker.record_error(model_name)
+        self.breaker(model_name).record_failure()
+
+    def record_abandoned(self, model_name: str) -> None:
+        """A call was cancelled or ran out of request time: no outcome, but free a half-open probe"""
+        self.breaker(model_name).release_probe()
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Per-model latency, error rate and circuit state"""
+        stats = latency_tracker.snapshot()
+        with self._lock:
+            breakers = dict(self._breakers)
+        for model_name, breaker in breakers.items():
+            stats.setdefault(model_name, {})["circuit"] = breaker.state
+        return stats
+
+
+# Global router shared by all Vertex AI calls
+model_router = ModelRouter()
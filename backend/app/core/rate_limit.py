@@ -0,0 +1,215 @@
+"""
+Cost-weighted rate limiting
+Token buckets keyed by authenticated user (client address as a fallback),
+stored in Postgres so the limit is shared by every instance, and charged per
+endpoint by the expected LLM work of the request rather than one per call.
+Responses carry RateLimit-Limit / RateLimit-Remaining / RateLimit-Reset headers.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request
+from sqlalchemy.exc import IntegrityError
+
+from app.core.auth import User
+from app.core.config import settings
+from app.core.executors import DATABASE, run_blocking
+from app.core.token_verifier import get_token_verifier
+from app.db.models import RateLimitBucket
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: float
+    remaining: float
+    reset_seconds: float  # Until the bucket is full again
+    retry_after: float = 0.0  # Until the rejected request would be affordable
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(int(self.limit)),
+            "RateLimit-Remaining": str(int(self.remaining)),
+            "RateLimit-Reset": str(math.ceil(self.reset_seconds)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def take_tokens(
+    tokens: float,
+    updated_at: float,
+    now: float,
+    cost: float,
+    capacity: float,
+    refill_per_second: float,
+) -> Tuple[bool, float]:
+    """Refill a bucket up to now and charge cost if it covers it; returns (allowed, tokens left)"""
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_per_second)
+    if tokens >= cost:
+        return True, tokens - cost
+    return False, tokens
+
+
+class MemoryRateLimitBackend:
+    """Per-process buckets (development, tests)"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            allowed, tokens = take_tokens(tokens, updated_at, now, cost, capacity, refill_per_second)
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens
+
+
+class DatabaseRateLimitBackend:
+    """Shared buckets in the rate_limit_buckets table, updated under a row lock"""
+
+    def take(self, key: str, cost: float, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        db = SessionLocal()
+        try:
+            for _ in range(2):
+                bucket = db.query(RateLimitBucket).filter(RateLimitBucket.key == key).with_for_update().first()
+                if bucket is not None:
+                    break
+                try:
+                    db.add(RateLimitBucket(key=key, tokens=capacity, updated_at=time.time()))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()  # Created concurrently by another request: lock that row instead
+
+            now = time.time()
+            allowed, tokens = take_tokens(bucket.tokens, bucket.updated_at, now, cost, capacity, refill_per_second)
+            bucket.tokens = tokens
+            bucket.updated_at = now
+            db.commit()
+            return allowed, tokens
+        finally:
+            db.close()
+
+
+class RateLimiter:
+    """Charges requests against per-caller token buckets"""
+
+    def __init__(self, backend, capacity: float, refill_per_second: float):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    async def check(self, key: str, cost: float) -> RateLimitDecision:
+        # A request larger than the bucket is charged a full bucket rather than never admitted
+        cost = min(cost, self.capacity)
+        try:
+            allowed, tokens = await run_blocking(
+                DATABASE, self.backend.take, key, cost, self.capacity, self.refill_per_second
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+            return RateLimitDecision(True, self.capacity, self.capacity, 0.0)
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=self.capacity,
+            remaining=tokens,
+            reset_seconds=(self.capacity - tokens) / self.refill_per_second,
+            retry_after=0.0 if allowed else (cost - tokens) / self.refill_per_second,
+        )
+
+
+async def rate_limit_key(request: Request, kwargs: dict) -> str:
+    """Authenticated user if known, otherwise the client address"""
+    user = next((v for v in kwargs.values() if isinstance(v, User)), None)
+    if user is not None:
+        return f"user:{user.id}"
+    authorization = request.headers.get("authorization", "")
+    if settings.clerk_secret_key and authorization.lower().startswith("bearer "):
+        try:
+            claims = await get_token_verifier().verify(authorization[7:])
+            return f"user:{claims['sub']}"
+        except Exception:
+            pass  # Unauthenticated endpoints accept requests without a valid token
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limited(cost: Union[float, Callable[..., float]] = 1.0):
+    """
+    Endpoint decorator charging the caller's bucket
+
+    cost is a number of units (roughly one per component or cell the model
+    produces), or a function receiving the handler's keyword arguments.
+    The handler must take a starlette Request parameter.
+
+    Raises:
+        HTTPException: 429 with Retry-After when the bucket cannot cover the cost
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = next((v for v in kwargs.values() if isinstance(v, Request)), None)
+            if request is None:
+                return await func(*args, **kwargs)
+            units = cost(**kwargs) if callable(cost) else cost
+            decision = await get_rate_limiter().check(await rate_limit_key(request, kwargs), units)
+            if not decision.allowed:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Rate limit exceeded, retry in {decision.headers()['Retry-After']}s",
+                    headers=decision.headers(),
+                )
+            request.state.rate_limit = decision
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitHeadersMiddleware:
+    """ASGI middleware adding the rate limit headers of admitted requests to the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                decision = scope.get("state", {}).get("rate_limit")
+                if decision is not None:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        *((name.lower().encode(), value.encode()) for name, value in decision.headers().items()),
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# Global limiter (lazy, like the other shared singletons)
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        backend = (
+            MemoryRateLimitBackend()
+            if settings.rate_limit_backend == "memory"
+            else DatabaseRateLimitBackend()
+        )
+        _rate_limiter = RateLimiter(backend, settings.rate_limit_burst, settings.rate_limit_per_second)
+    return _rate_limiter
@@ -0,0 +1,57 @@
+"""
+Generation telemetry
+Records observed output lengths per component type so output budgets can be
+derived from what the model actually produces
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+from app.services.generation_validation import component_type_of
+
+DEFAULT_WINDOW = 500
+
+
+class ComponentLengthStats:
+    """Rolling window of generated text lengths (chars) per component type"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, component_type: str, length: int) -> None:
+        with self._lock:
+            samples = self._samples.get(component_type)
+            if samples is None:
+                samples = self._samples[component_type] = deque(maxlen=self.window)
+            samples.append(length)
+
+    def record_variations(self, variations: Iterable[dict]) -> None:
+        """Record every component of a list of flat variation dicts"""
+        for variation in variations:
+            for key, value in variation.items():
+                if isinstance(value, str):
+                    self.record(component_type_of(key), len(value))
+
+    def percentile(self, component_type: str, p: float, min_samples: int = 1) -> Optional[int]:
+        """Nearest-rank percentile of observed lengths, None until min_samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(component_type, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        rank = max(1, math.ceil(p / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            types = list(self._samples.keys())
+        return {
+            t: {"samples": len(self._samples[t]), "p50": self.percentile(t, 50), "p90": self.percentile(t, 90)}
+            for t in types
+        }
+
+
+# Global telemetry for generated component lengths
+component_lengths = ComponentLengthStats()
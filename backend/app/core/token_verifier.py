@@ -0,0 +1,207 @@
+"""
+Local Clerk JWT verification
+Verifies session tokens against a cached JWKS that is refreshed in the
+background, and memoizes verified tokens (by hash, until they expire) in a
+bounded LRU so repeated requests with the same token skip signature checks.
+No network call happens on the request path except when a token is signed
+with a key that is not cached yet.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import jwt
+
+from app.core.config import settings
+from app.core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+JWKS_FETCH_TIMEOUT_SECONDS = 5.0
+MIN_UNKNOWN_KID_REFRESH_SECONDS = 30.0  # Forged kids must not turn into a JWKS request each
+
+
+class TokenVerificationError(Exception):
+    """The token is invalid, expired or signed with an unknown key"""
+
+
+class JWKSCache:
+    """Signing keys by kid, fetched from Clerk and refreshed periodically"""
+
+    def __init__(self, fetch: Callable[[], Awaitable[Dict[str, Any]]], refresh_seconds: float):
+        self._fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self._keys: Dict[str, Any] = {}
+        self._refreshed_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        """Fetch the JWKS (concurrent callers share one fetch)"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self) -> None:
+        jwks = await self._fetch()
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk).key
+            except (KeyError, jwt.PyJWKError) as e:
+                logger.warning(f"Ignoring unusable JWK: {e}")
+        if not keys:
+            raise TokenVerificationError("JWKS did not contain any signing keys")
+        self._keys = keys
+        self._refreshed_at = time.monotonic()
+        logger.info(f"JWKS refreshed ({len(keys)} key(s))")
+
+    async def get_key(self, kid: Optional[str]) -> Any:
+        """Key for kid, refreshing the JWKS once if it is not cached (e.g. after rotation)"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at > MIN_UNKNOWN_KID_REFRESH_SECONDS:
+            await self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise TokenVerificationError("Token signed with an unknown key")
+        return key
+
+    async def run_refresh_loop(self) -> None:
+        """Background task keeping the keys fresh; failures keep the previous keys"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"JWKS refresh failed, keeping {len(self._keys)} cached key(s): {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified claims keyed by token hash, valid until the token's exp"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        expires_at = claims.get("exp")
+        if expires_at is None:
+            return  # Never memoize a token without an expiry
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (claims, float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class TokenVerifier:
+    """Verifies Clerk session tokens locally"""
+
+    def __init__(
+        self,
+        jwks: JWKSCache,
+        cache: VerifiedTokenCache,
+        authorized_parties: Optional[List[str]] = None,
+        leeway_seconds: float = 5.0,
+    ):
+        self.jwks = jwks
+        self.cache = cache
+        self.authorized_parties = authorized_parties
+        self.leeway_seconds = leeway_seconds
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Claims of a valid token
+
+        Raises:
+            TokenVerificationError: If the token is invalid or expired
+        """
+        claims = self.cache.get(token)
+        if claims is not None:
+            return claims
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError as e:
+            raise TokenVerificationError(f"Malformed token: {e}") from e
+        key = await self.jwks.get_key(kid)
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                options={"verify_aud": False, "require": ["exp", "sub"]},
+                leeway=self.leeway_seconds,
+            )
+        except jwt.InvalidTokenError as e:
+            raise TokenVerificationError(str(e)) from e
+
+        if self.authorized_parties and claims.get("azp") not in self.authorized_parties:
+            raise TokenVerificationError("Authorized party (azp) is not allowed")
+
+        self.cache.put(token, claims)
+        return claims
+
+
+@traced("clerk.fetch_jwks")
+async def fetch_clerk_jwks() -> Dict[str, Any]:
+    """JWKS from the Clerk Backend API"""
+    async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT_SECONDS) as client:
+        response = await client.get(
+            f"{settings.clerk_api_url}/v1/jwks",
+            headers={"Accept": "application/json", "Authorization": f"Bearer {settings.clerk_secret_key}"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+# Global verifier (lazy loaded)
+_token_verifier: Optional[TokenVerifier] = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    """Get or create the global Clerk token verifier"""
+    global _token_verifier
+    if _token_verifier is None:
+        parties = [p.strip() for p in settings.clerk_authorized_parties.split(",") if p.strip()]
+        _token_verifier = TokenVerifier(
+            JWKSCache(fetch_clerk_jwks, settings.clerk_jwks_refresh_seconds),
+            VerifiedTokenCache(settings.auth_token_cache_size),
+            authorized_parties=parties or None,
+            leeway_seconds=settings.auth_clock_skew_seconds,
+        )
+    return _token_verifier
@@ -0,0 +1,347 @@
+"""
+Request tracing
+OpenTelemetry-shaped spans (W3C trace and span ids, traceparent propagation)
+around auth, SQL statements, model attempts and GCS, Sheets and Slack calls.
+Finished spans go to an in-memory ring buffer or a JSON-lines file for local
+analysis, and every log record carries the current trace id.
+"""
+import functools
+import inspect
+import json
+import logging
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_CHARS = 300
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    """One timed operation in a trace"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans"""
+
+    def __init__(self, max_spans: int):
+        self._spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        spans = list(self._spans)
+        return [s for s in spans if s.trace_id == trace_id] if trace_id else spans
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class FileExporter:
+    """
+    Appends finished spans to a JSON-lines file
+
+    export only queues the span; a writer thread appends whatever has queued
+    up in one write, so no file I/O happens on the event loop.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._writer = threading.Thread(target=self._write_loop, name="span-file-writer", daemon=True)
+        self._writer.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            spans = [self._queue.get()]
+            while True:
+                try:
+                    spans.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                lines = "".join(json.dumps(span, default=str) + "\n" for span in spans if span is not None)
+                if lines:
+                    with open(self.path, "a") as f:
+                        f.write(lines)
+            except Exception as e:
+                logger.warning(f"Writing {len(spans)} span(s) to {self.path} failed: {e}")
+            finally:
+                for _ in spans:
+                    self._queue.task_done()
+            if None in spans:
+                return
+
+    def flush(self) -> None:
+        """Block until every queued span is written"""
+        self._queue.join()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+
+class NullExporter:
+    """Spans still label logs but are dropped when they finish"""
+
+    def export(self, span: Span) -> None:
+        pass
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace id, parent span id) of a W3C traceparent header, None if absent or malformed"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2)
+
+
+class Tracer:
+    """Creates spans as children of the current one and hands finished spans to the exporter"""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def _export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Span export failed: {e}")
+
+    @contextmanager
+    def span(self, name: str, remote_parent: Optional[Tuple[str, str]] = None, **attributes):
+        """
+        Time the block as a span
+
+        remote_parent is a (trace id, span id) pair from an incoming
+        traceparent header; otherwise the span joins the current trace or
+        starts a new one.
+        """
+        parent = _current_span.get()
+        if remote_parent is not None:
+            trace_id, parent_id = remote_parent
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+
+        span = Span(name, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end = time.time()
+            self._export(span)
+
+    def record(self, name: str, start: float, end: float, error: Optional[str] = None, **attributes) -> None:
+        """Export an already finished operation as a child of the current span (no-op outside a trace)"""
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+        span.start, span.end = start, end
+        if error:
+            span.status, span.error = "error", error
+        self._export(span)
+
+    def shutdown(self) -> None:
+        """Write out spans the exporter still buffers"""
+        shutdown = getattr(self.exporter, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+
+
+def _exporter_from_settings():
+    if settings.tracing_exporter == "file":
+        return FileExporter(settings.tracing_file_path)
+    if settings.tracing_exporter == "none":
+        return NullExporter()
+    return InMemoryExporter(settings.tracing_memory_spans)
+
+
+# Global tracer
+tracer = Tracer(_exporter_from_settings())
+
+
+def traced(name: str, **attributes):
+    """Decorator running a sync or async function inside a span"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(prefix: str):
+    """Class decorator running every public staticmethod in a span, grouping the SQL it issues"""
+    def decorator(cls):
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith("_") or not isinstance(attribute, staticmethod):
+                continue
+            setattr(cls, name, staticmethod(traced(f"{prefix}.{name}")(attribute.__func__)))
+        return cls
+    return decorator
+
+
+# SQL statements (SQLAlchemy engine events)
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("trace_started", []).append(time.time())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("trace_started")
+    if not started:
+        return
+    tracer.record(
+        "db.query",
+        started.pop(),
+        time.time(),
+        **{
+            "db.operation": statement.lstrip().split(" ", 1)[0].upper(),
+            "db.statement": statement[:MAX_STATEMENT_CHARS],
+            "db.executemany": executemany,
+        },
+    )
+
+
+def handle_db_error(exception_context):
+    started = exception_context.connection.info.get("trace_started") if exception_context.connection else None
+    if not started:
+        return
+    tracer.record(
+        "db.query",
+        started.pop(),
+        time.time(),
+        error=f"{type(exception_context.original_exception).__name__}: {exception_context.original_exception}",
+        **{"db.statement": (exception_context.statement or "")[:MAX_STATEMENT_CHARS]},
+    )
+
+
+def install_sql_tracing(engine) -> None:
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_db_error)
+
+
+# Logs
+def install_log_correlation() -> None:
+    """Add trace_id and span_id to every log record ("-" outside a trace)"""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "adds_trace_ids", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        span = _current_span.get()
+        record.trace_id = span.trace_id if span else "-"
+        record.span_id = span.span_id if span else "-"
+        return record
+
+    record_factory.adds_trace_ids = True
+    logging.setLogRecordFactory(record_factory)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of each request and returning its trace id"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from app.core.metrics import endpoint_label
+
+        headers = dict(scope.get("headers") or [])
+        remote_parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        endpoint = endpoint_label(scope["path"])
+        with tracer.span(
+            f"{scope['method']} {endpoint}",
+            remote_parent=remote_parent,
+            **{"http.method": scope["method"], "http.route": endpoint},
+        ) as span:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    message["headers"] = [*message.get("headers", []), (b"x-trace-id", span.trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -1,19 +1,68 @@
 """
 Vertex AI Client Setup
 Modern approach - NO LangChain, direct Vertex AI SDK
+The SDK takes ~2s to import, so it is loaded on first use rather than at startup
 """
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig, Part
+from __future__ import annotations
+
 from app.core.config import settings
+from app.core.model_router import model_router
+from app.core.hedging import hedged_call, hedge_delay, backup_model_for
+from app.core.cancellation import track_model_call
+from app.core.admission import admission_controller
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+from app.core.telemetry import component_lengths
+from app.core import metrics
+from app.core.tracing import tracer
+from app.services.generation_validation import ValidationPipeline
+from app.services import token_budget
 import logging
 import os
 import json
 import httpx
 import asyncio
+import time
+from dataclasses import dataclass, asdict
+import threading
+from typing import TYPE_CHECKING, Callable
 from fastapi import HTTPException
 
+if TYPE_CHECKING:
+    from vertexai.generative_models import GenerativeModel, GenerationConfig
+
 logger = logging.getLogger(__name__)
 
+IMAGE_FETCH_TIMEOUT_SECONDS = 10.0
+AVOID_REPEATS_MAX_CHARS = 4000  # Cap on the already-written variations quoted in a follow-up prompt
+
+
+def _sdk():
+    """vertexai.generative_models, imported on first use"""
+    from vertexai import generative_models
+    return generative_models
+
+
+@dataclass
+class GenerationStats:
+    """Per-request counters filled in by generate_with_fixing"""
+    attempts: int = 0  # Total model calls, including follow-ups and repairs
+    rounds: int = 0  # Iterations of the fixing / top-up loop
+    follow_up_calls: int = 0  # Single-variation calls issued for a shortfall
+    json_fixes: int = 0
+    repaired_components: int = 0
+
+    def merge(self, other: "GenerationStats") -> None:
+        """Fold the counters of a sub-request (e.g. one fan-out call) into this one"""
+        self.attempts += other.attempts
+        self.rounds = max(self.rounds, other.rounds)
+        self.follow_up_calls += other.follow_up_calls
+        self.json_fixes += other.json_fixes
+        self.repaired_components += other.repaired_components
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
 
 class VertexAIClient:
     """Wrapper for Vertex AI client with rate limiting and error handling"""
@@ -34,6 +83,7 @@ class VertexAIClient:
         
         # Initialize Vertex AI
         try:
+            import vertexai
             vertexai.init(
                 project=settings.gcp_project_id,
                 location=settings.gcp_location
@@ -43,6 +93,7 @@ class VertexAIClient:
             logger.error(f"Error initializing Vertex AI client: {str(e)}")
             raise
     
+    @metrics.task_operation
     async def generate_content(
         self,
         prompt: str,
@@ -50,46 +101,45 @@ class VertexAIClient:
         temperature: float = 0.7,
         max_tokens: int = 2048,
         response_mime_type: str = "application/json",
-        use_flash: bool = False
+        use_flash: bool | None = None,
+        task: str = "generate"
     ) -> str:
         """
         Generate content using Vertex AI
         
         Args:
             prompt: The prompt text
-            model: Model name (defaults to settings.vertex_ai_model)
+            model: Model name (bypasses routing when given)
             temperature: Sampling temperature (0-1)
             max_tokens: Maximum output tokens
             response_mime_type: Output format (application/json or text/plain)
-            use_flash: If True, use gemini-2.5-flash instead of gemini-2.5-pro
+            use_flash: True forces Flash, False prefers Pro, None routes by task
+            task: Task type for the model routing table
         
         Returns:
             Generated text content
         """
-        # Use Flash model if requested, otherwise use provided model or default
-        if use_flash:
-            model_name = settings.vertex_ai_model_flash
-        else:
-            model_name = model or settings.vertex_ai_model
+        model_name = self._resolve_model(model, use_flash, task)
         
         try:
             # Create model instance
-            generative_model = GenerativeModel(model_name)
+            generative_model = _sdk().GenerativeModel(model_name)
             
             # Configure generation
-            generation_config = GenerationConfig(
+            generation_config = _sdk().GenerationConfig(
                 temperature=temperature,
-                max_output_tokens=max_tokens,
+                max_output_tokens=token_budget.for_model(max_tokens, model_name),
                 response_mime_type=response_mime_type
             )
             
-            # Generate content asynchronously
-            response = await generative_model.generate_content_async(
+            # Generate content asynchronously (hedged if the call runs long)
+            return await self._hedged_generate(
+                generative_model,
+                model_name,
                 prompt,
-                generation_config=generation_config
+                generation_config,
+                expect_json=response_mime_type == "application/json"
             )
-            
-            return response.text
         
         except Exception as e:
             logger.error(f"Error generating content with {model_name}: {str(e)}")
@@ -111,15 +161,15 @@ class VertexAIClient:
         model_name = model or settings.vertex_ai_model
         
         try:
-            generative_model = GenerativeModel(model_name)
+            generative_model = _sdk().GenerativeModel(model_name)
             
             # Prepare the multimodal content
-            image_part = Part.from_data(data=image_data, mime_type=image_mime_type)
-            prompt_part = Part.from_text(prompt)
+            image_part = _sdk().Part.from_data(data=image_data, mime_type=image_mime_type)
+            prompt_part = _sdk().Part.from_text(prompt)
             
-            generation_config = GenerationConfig(
+            generation_config = _sdk().GenerationConfig(
                 temperature=temperature,
-                max_output_tokens=max_tokens,
+                max_output_tokens=token_budget.for_model(max_tokens, model_name),
                 response_mime_type=response_mime_type
             )
             
@@ -134,6 +184,7 @@ class VertexAIClient:
             logger.error(f"Error generating content from image with {model_name}: {str(e)}")
             raise
     
+    @metrics.task_operation
     async def generate_with_fixing(
         self,
         prompt: str,
@@ -143,84 +194,263 @@ class VertexAIClient:
         image_url: str | None = None,
         model: str | None = None,
         response_mime_type: str = "application/json",
-        use_flash: bool = False,
+        use_flash: bool | None = None,
+        task: str = "generate",
+        validation: ValidationPipeline | None = None,
+        prompt_builder: Callable[[int], str] | None = None,
+        stats: GenerationStats | None = None,
+        seed: int | None = None,
+        image_parts: list | None = None,
     ) -> str:
-        # Use Flash model if requested, otherwise use provided model or default
-        if use_flash:
-            model_name = settings.vertex_ai_model_flash
-        else:
-            model_name = model or settings.vertex_ai_model
-        generative_model = GenerativeModel(model_name)
+        """
+        Generate variations as JSON, fixing malformed output and topping up shortfalls
+
+        Valid variations are accumulated across attempts. When the model returns fewer
+        than expected_variations and a prompt_builder is given, follow-up calls are issued
+        in parallel for the missing variations only (on Flash if shortfall_use_flash),
+        unseeded and told which variations were already written.
+
+        Args:
+            use_flash: True forces Flash, False prefers Pro, None routes by task
+            task: Task type for the model routing table (ignored when model is given)
+            prompt_builder: Builds the prompt for a given variation count (used for follow-ups)
+            stats: Optional GenerationStats filled with per-request attempt counts
+            seed: Optional sampling seed (used to diversify parallel fan-out calls)
+            image_parts: Image already loaded with load_image_parts (instead of image_url)
+        """
+        stats = stats if stats is not None else GenerationStats()
+
+        model_name = self._resolve_model(model, use_flash, task)
+        generative_model = _sdk().GenerativeModel(model_name)
         
         # For high temperature (regeneration), increase top_k for more variety
         top_k_value = 60 if temperature > 0.8 else 40
         
-        generation_config = GenerationConfig(
+        config_args = dict(
             temperature=temperature,
-            max_output_tokens=max_tokens,
+            max_output_tokens=token_budget.for_model(max_tokens, model_name),
             response_mime_type=response_mime_type,
             top_p=0.95,  # Nucleus sampling for diversity
             top_k=top_k_value,  # Higher top_k for regeneration
         )
+        generation_config = _sdk().GenerationConfig(**config_args, seed=seed)
+        # A seeded follow-up with the same prompt would return the same variation again
+        follow_up_config = _sdk().GenerationConfig(**config_args) if seed is not None else generation_config
 
-        final_prompt = [Part.from_text(prompt)]
+        if image_parts is None:
+            image_parts = await self.load_image_parts(image_url)
 
-        if image_url:
-            try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(image_url)
-                    response.raise_for_status()
-                image_part = Part.from_data(
-                    response.content, mime_type=response.headers["Content-Type"]
-                )
-                final_prompt.insert(0, image_part)
-                logger.info(f"Image loaded from {image_url} and added to prompt.")
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Error downloading image from {image_url}: {e}")
-                # Decide how to handle this - maybe proceed without the image?
-                # For now, we'll let it raise or you could return an error message
-                raise
-            except Exception as e:
-                logger.error(f"An unexpected error occurred while handling image: {e}")
-                raise
+        final_prompt = [*image_parts, _sdk().Part.from_text(prompt)]
+        collected: list[dict] = []
 
-        for attempt in range(1, 4):  # 1 initial attempt + 2 fixing attempts
+        for attempt in range(1, 4):  # 1 initial attempt + 2 fixing/top-up attempts
+            if not deadline.can_afford(deadline.expected_call_seconds(model_name)):
+                if collected:
+                    return self._partial_result(collected, expected_variations)
+                raise DeadlineExceeded("Not enough time left for a generation attempt")
+            stats.rounds = attempt
+            response_text = ""
             try:
-                response_text = await self._generate_content_with_retry(
-                    generative_model, final_prompt, generation_config
-                )
-
-                # Validate JSON and variation count
-                parsed_json = json.loads(response_text)
-                if (
-                    "variations" in parsed_json
-                    and isinstance(parsed_json["variations"], list)
-                    and len(parsed_json["variations"]) >= expected_variations
-                ):
-                    logger.info(f"Successfully generated and validated JSON.")
-                    return response_text
+                if collected and prompt_builder:
+                    # Only ask for what is still missing
+                    collected.extend(await self._generate_shortfall(
+                        prompt_builder,
+                        expected_variations - len(collected),
+                        image_parts,
+                        follow_up_config,
+                        model_name,
+                        stats,
+                        collected,
+                    ))
                 else:
-                    logger.warning(
-                        f"Attempt {attempt} produced valid JSON but did not meet variation count expectations."
+                    stats.attempts += 1
+                    response_text = await self._generate_content_with_retry(
+                        generative_model, final_prompt, generation_config, model_name=model_name
+                    )
+                    parsed_json = json.loads(response_text)
+                    variations = parsed_json.get("variations") if isinstance(parsed_json, dict) else None
+                    if isinstance(variations, list):
+                        collected.extend(v for v in variations if isinstance(v, dict))
+
+                # Validate variation count
+                if len(collected) >= expected_variations:
+                    if validation:
+                        collected = await self.validate_and_repair(validation, collected, stats)
+                    component_lengths.record_variations(collected)
+                    logger.info(
+                        f"Successfully generated and validated JSON "
+                        f"({len(collected)} variations, {stats.attempts} model calls)."
                     )
-                    # This could be a case for a more specific fixing prompt
-                    # For now, we rely on the generic fixing prompt to guide the model
+                    return json.dumps({"variations": collected}, ensure_ascii=False)
+
+                logger.warning(
+                    f"Attempt {attempt} produced valid JSON but only {len(collected)}/"
+                    f"{expected_variations} variations so far."
+                )
 
             except json.JSONDecodeError as e:
                 logger.warning(
                     f"Attempt {attempt} failed with error: {str(e)}. Trying to fix..."
                 )
+                stats.json_fixes += 1
+                metrics.record_json_fix()
                 fixing_prompt = self._create_fixing_prompt(prompt, response_text)
-                final_prompt = [Part.from_text(fixing_prompt)]  # For fixing, we only use text
+                final_prompt = [_sdk().Part.from_text(fixing_prompt)]  # For fixing, we only use text
+            except DeadlineExceeded:
+                if collected:
+                    return self._partial_result(collected, expected_variations)
+                raise
             except Exception as e:
                 logger.error(f"An unexpected error occurred during generation: {e}")
                 raise
 
-        logger.error("Failed to generate valid JSON after multiple attempts.")
+        logger.error(
+            f"Failed to generate valid JSON after multiple attempts "
+            f"({len(collected)}/{expected_variations} variations collected)."
+        )
         raise HTTPException(
             status_code=500, detail="Failed to generate valid content from the model."
         )
 
+    async def load_image_parts(self, image_url: str | None) -> list:
+        """Download an image for the prompt ([] without image_url); share the result across parallel calls"""
+        if not image_url:
+            return []
+        try:
+            async with httpx.AsyncClient(timeout=deadline.timeout_for(IMAGE_FETCH_TIMEOUT_SECONDS)) as client:
+                response = await client.get(image_url)
+                response.raise_for_status()
+            image_part = _sdk().Part.from_data(
+                response.content, mime_type=response.headers["Content-Type"]
+            )
+            logger.info(f"Image loaded from {image_url} and added to prompt.")
+            return [image_part]
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Error downloading image from {image_url}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while handling image: {e}")
+            raise
+
+    @staticmethod
+    def _partial_result(collected: list[dict], expected_variations: int) -> str:
+        """Out of time: return what was collected instead of failing the request"""
+        logger.warning(
+            f"Request deadline reached, returning partial result "
+            f"({len(collected)}/{expected_variations} variations)"
+        )
+        component_lengths.record_variations(collected)
+        return json.dumps({"variations": collected}, ensure_ascii=False)
+
+    async def _generate_shortfall(
+        self,
+        prompt_builder: Callable[[int], str],
+        missing: int,
+        image_parts: list,
+        generation_config: GenerationConfig,
+        model_name: str,
+        stats: GenerationStats,
+        collected: list[dict],
+    ) -> list[dict]:
+        """
+        Issue one single-variation call per missing variation, in parallel
+        The prompt lists the variations collected so far so they are not repeated.
+        Failed or malformed follow-ups simply contribute nothing
+        """
+        follow_up_model = settings.vertex_ai_model_flash if settings.shortfall_use_flash else model_name
+        logger.info(f"Requesting {missing} missing variation(s) from {follow_up_model}")
+
+        generative_model = _sdk().GenerativeModel(follow_up_model)
+        follow_up_prompt = [*image_parts, _sdk().Part.from_text(avoid_repeats_prompt(prompt_builder(1), collected))]
+        stats.attempts += missing
+        stats.follow_up_calls += missing
+
+        results = await asyncio.gather(
+            *[
+                self._generate_content_with_retry(
+                    generative_model, follow_up_prompt, generation_config, model_name=follow_up_model
+                )
+                for _ in range(missing)
+            ],
+            return_exceptions=True,
+        )
+
+        variations = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Follow-up generation failed: {result}")
+                continue
+            try:
+                parsed = json.loads(result)
+            except json.JSONDecodeError:
+                logger.warning("Follow-up generation returned malformed JSON, skipping")
+                continue
+            for variation in parsed.get("variations", []) if isinstance(parsed, dict) else []:
+                if isinstance(variation, dict):
+                    variations.append(variation)
+                    break  # One variation per follow-up call
+        return variations
+
+    async def validate_and_repair(
+        self,
+        validation: ValidationPipeline,
+        variations: list[dict],
+        stats: GenerationStats | None = None,
+    ) -> list[dict]:
+        """
+        Run local validation and re-request only the failing components
+        of the failing variations with a small targeted prompt
+        """
+        for round_number in range(1, settings.max_repair_rounds + 1):
+            issues = validation.run(variations)
+            if not issues:
+                return variations
+            if not deadline.can_afford(deadline.expected_call_seconds(settings.vertex_ai_model_flash)):
+                logger.warning(f"No time left to repair {len(issues)} component(s), returning as-is")
+                return variations
+
+            logger.info(
+                f"Repair round {round_number}: {len(issues)} failing component(s): "
+                + ", ".join(f"#{i.variation_index}.{i.key} ({i.reason})" for i in issues)
+            )
+            try:
+                repair_text = await self.generate_content(
+                    prompt=validation.build_repair_prompt(variations, issues),
+                    temperature=0.7,
+                    max_tokens=256 * len(issues) + 256,
+                    task="repair"
+                )
+                repairs = json.loads(repair_text).get("repairs", [])
+                applied = validation.apply_repairs(variations, repairs, issues)
+                if stats is not None:
+                    stats.attempts += 1
+                    stats.repaired_components += applied
+            except Exception as e:
+                logger.warning(f"Component repair failed, returning unrepaired variations: {e}")
+                return variations
+
+        remaining = validation.run(variations)
+        if remaining:
+            logger.warning(f"{len(remaining)} component(s) still failing validation after repair")
+        return variations
+
+    async def warm_up(self, model_name: str) -> None:
+        """Open the model's gRPC channel with a cheap count_tokens call"""
+        await _sdk().GenerativeModel(model_name).count_tokens_async("warm-up")
+
+    @staticmethod
+    def _resolve_model(model: str | None, use_flash: bool | None, task: str) -> str:
+        """
+        Explicit model if given, otherwise ask the router
+
+        The router is not told the structure here, so it treats the call as
+        long copy; callers that know the structure select the model themselves
+        and pass it as model.
+        """
+        if model and not use_flash:
+            return model
+        return model_router.select(task, use_flash=use_flash)
+
     def _create_fixing_prompt(self, original_prompt: str, malformed_json: str) -> str:
         return f"""
 The original prompt was:
@@ -243,22 +473,94 @@ Ensure the output is a single, valid JSON object that fulfills the original prom
         prompt: list,
         generation_config: GenerationConfig,
         max_retries: int = 2,
+        model_name: str | None = None,
     ):
         last_exception = None
         for attempt in range(max_retries):
+            if attempt and not deadline.can_afford(deadline.expected_call_seconds(model_name or "")):
+                raise DeadlineExceeded("Not enough time left to retry the model call")
             try:
+                if model_name:
+                    return await self._hedged_generate(model, model_name, prompt, generation_config)
                 response = await model.generate_content_async(
                     prompt, generation_config=generation_config
                 )
                 return response.text
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 last_exception = e
                 logger.warning(
                     f"Attempt {attempt + 1} failed with error: {str(e)}. Retrying..."
                 )
-                await asyncio.sleep(1)  # simple backoff
+                await deadline.sleep(1)  # simple backoff, unless out of time
         raise last_exception
 
+    async def _timed_call(
+        self,
+        model: GenerativeModel,
+        model_name: str,
+        prompt,
+        generation_config: GenerationConfig,
+    ) -> str:
+        """Single model call, recording latency and outcome for routing"""
+        max_output_tokens = generation_config.to_dict().get("max_output_tokens", 0)
+        with tracer.span(
+            "vertex.generate_content", model=model_name, prompt_chars=_prompt_chars(prompt),
+            max_output_tokens=max_output_tokens,
+        ) as span:
+            started = time.perf_counter()
+            try:
+                with track_model_call(max_output_tokens), admission_controller.track_model_call():
+                    response = await deadline.bounded(
+                        model.generate_content_async(prompt, generation_config=generation_config),
+                        what=f"{model_name} call"
+                    )
+                text = response.text
+            except DeadlineExceeded:
+                model_router.record_abandoned(model_name)
+                span.set_attributes(**metrics.record_model_call(model_name, time.perf_counter() - started, "deadline"))
+                raise
+            except asyncio.CancelledError:
+                model_router.record_abandoned(model_name)
+                span.set_attributes(**metrics.record_model_call(model_name, time.perf_counter() - started, "cancelled"))
+                raise
+            except Exception:
+                model_router.record_failure(model_name)
+                span.set_attributes(**metrics.record_model_call(model_name, time.perf_counter() - started, "error"))
+                raise
+            model_router.record_success(model_name, time.perf_counter() - started)
+            span.set_attributes(**metrics.record_model_call(model_name, time.perf_counter() - started, "ok", response))
+            return text
+
+    async def _hedged_generate(
+        self,
+        model: GenerativeModel,
+        model_name: str,
+        prompt,
+        generation_config: GenerationConfig,
+        expect_json: bool = True,
+    ) -> str:
+        """
+        Model call with optional hedging: past the hedge percentile of recent
+        latency a backup call is fired and the first valid response wins
+        """
+        backup_name = backup_model_for(model_name)
+
+        def backup():
+            backup_model = model if backup_name == model_name else _sdk().GenerativeModel(backup_name)
+            return self._timed_call(backup_model, backup_name, prompt, generation_config)
+
+        result, won_by_backup = await hedged_call(
+            lambda: self._timed_call(model, model_name, prompt, generation_config),
+            backup,
+            hedge_delay(model_name),
+            is_valid=_is_valid_json if expect_json else bool,
+        )
+        if won_by_backup:
+            logger.info(f"Hedged call to {model_name} won by backup on {backup_name}")
+        return result
+
     async def translate_text(
         self,
         texts: list[str],
@@ -268,7 +570,7 @@ Ensure the output is a single, valid JSON object that fulfills the original prom
     ) -> list[str]:
         model_name = model or settings.vertex_ai_model
         try:
-            model = GenerativeModel(model_name)
+            model = _sdk().GenerativeModel(model_name)
             results = await model.translate_async(
                 contents=texts,
                 target_language_code=target_language,
@@ -279,12 +581,16 @@ Ensure the output is a single, valid JSON object that fulfills the original prom
             logger.error(f"Error translating text with {model_name}: {str(e)}")
             raise
 
+    @metrics.task_operation
     async def refine_text(
         self,
         prompt: str,
         schema: dict,
         max_retries: int = 2,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        use_flash: bool | None = None,
+        task: str = "refine"
     ) -> str:
         """
         Generate content with self-healing JSON parsing
@@ -295,6 +601,9 @@ Ensure the output is a single, valid JSON object that fulfills the original prom
             schema: JSON schema dict for validation error messages
             max_retries: Maximum retry attempts
             temperature: Sampling temperature
+            max_tokens: Maximum output tokens
+            use_flash: True forces Flash, False prefers Pro, None routes by task
+            task: Task type for the model routing table
         
         Returns:
             Valid JSON string
@@ -303,12 +612,17 @@ Ensure the output is a single, valid JSON object that fulfills the original prom
         current_prompt = prompt
         
         for attempt in range(max_retries + 1):
+            if attempt and not deadline.can_afford(deadline.expected_call_seconds(settings.vertex_ai_model_flash)):
+                raise DeadlineExceeded("Not enough time left to fix the model output")
             response_text = ""
             try:
                 response_text = await self.generate_content(
                     prompt=current_prompt,
                     temperature=temperature,
-                    response_mime_type="application/json"
+                    max_tokens=max_tokens,
+                    response_mime_type="application/json",
+                    use_flash=use_flash,
+                    task=task
                 )
                 
                 # Validate JSON format
@@ -316,11 +630,15 @@ Ensure the output is a single, valid JSON object that fulfills the original prom
                 
                 return response_text
             
+            except DeadlineExceeded:
+                raise
             except (json.JSONDecodeError, Exception) as e:
                 last_error = e
                 
                 if attempt < max_retries:
                     logger.warning(f"Attempt {attempt + 1} failed with error: {e}. Trying to fix...")
+                    if isinstance(e, json.JSONDecodeError):
+                        metrics.record_json_fix()
                     
                     fix_prompt = f"""The following JSON output is malformed or invalid:
 
@@ -343,8 +661,52 @@ NO markdown formatting, NO explanations, ONLY the JSON object."""
         raise last_error # Should not be reached
 
 
-# Global client instance
-vertex_client = VertexAIClient()
+def avoid_repeats_prompt(prompt: str, variations: list[dict]) -> str:
+    """Append the variations already written to a prompt, asking for different ones"""
+    if not variations:
+        return prompt
+    written = json.dumps(variations, ensure_ascii=False)
+    if len(written) > AVOID_REPEATS_MAX_CHARS:
+        written = written[:AVOID_REPEATS_MAX_CHARS] + "..."
+    return (
+        f"{prompt}\n\nThese variations were already written; do not repeat or paraphrase them, "
+        f"write a clearly different one:\n{written}"
+    )
+
+
+def _is_valid_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _prompt_chars(prompt) -> int:
+    """Text size of a prompt (a string, or a list of strings and Parts for multimodal calls)"""
+    if isinstance(prompt, str):
+        return len(prompt)
+    chars = 0
+    for part in prompt:
+        if isinstance(part, str):
+            chars += len(part)
+            continue
+        try:
+            chars += len(part.text or "")
+        except (AttributeError, ValueError):
+            pass  # Image and other non-text parts
+    return chars
+
+
+# Global client instance (lazy: created by the first request that needs the model)
+_client: VertexAIClient | None = None
+_client_lock = threading.Lock()
+
 
 def get_client() -> VertexAIClient:
-    return vertex_client
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = VertexAIClient()
+    return _client
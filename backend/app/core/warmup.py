@@ -0,0 +1,151 @@
+"""
+Startup warm-up and readiness
+Warms the dependencies the first request would otherwise pay for (pooled DB
+connections, the Vertex AI channel, few-shot data, Clerk JWKS) concurrently
+after startup. /ready reports 503 until warm-up is done, with per-dependency timings.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class StepResult:
+    status: str = PENDING
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+# A step returns SKIPPED when its dependency is not configured, None otherwise
+WarmupStep = Callable[[], Awaitable[Optional[str]]]
+
+
+class Warmup:
+    """Runs warm-up steps and tracks whether the instance is ready for traffic"""
+
+    def __init__(self, steps: Dict[str, WarmupStep], required: Set[str], timeout_seconds: float):
+        self.steps = steps
+        self.required = required  # Steps whose failure keeps the instance unready
+        self.timeout_seconds = timeout_seconds
+        self.results: Dict[str, StepResult] = {name: StepResult() for name in steps}
+        self.done = False
+        self.seconds: Optional[float] = None
+        self._retry: Optional[asyncio.Task] = None
+
+    async def _run_step(self, name: str) -> None:
+        started = time.perf_counter()
+        try:
+            outcome = await asyncio.wait_for(self.steps[name](), timeout=self.timeout_seconds)
+            self.results[name] = StepResult(outcome or OK, time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            self.results[name] = StepResult(FAILED, time.perf_counter() - started, "timed out")
+        except Exception as e:
+            self.results[name] = StepResult(FAILED, time.perf_counter() - started, str(e))
+        result = self.results[name]
+        if result.status == FAILED:
+            logger.warning(f"Warm-up of {name} failed after {result.seconds:.2f}s: {result.error}")
+        else:
+            logger.info(f"Warm-up of {name}: {result.status} in {result.seconds:.2f}s")
+
+    async def run(self) -> None:
+        """Run every step concurrently"""
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run_step(name) for name in self.steps))
+        self.seconds = time.perf_counter() - started
+        self.done = True
+        logger.info(f"Warm-up finished in {self.seconds:.2f}s, ready: {self.ready}")
+
+    def skip(self) -> None:
+        """Mark warm-up as done without running it (warm-up disabled)"""
+        self.results = {name: StepResult(SKIPPED) for name in self.steps}
+        self.seconds = 0.0
+        self.done = True
+
+    async def retry_required(self) -> None:
+        """Re-run failed required steps, so an instance recovers once e.g. the database is back"""
+        failed = [name for name in self.required if self.results[name].status == FAILED]
+        await asyncio.gather(*(self._run_step(name) for name in failed))
+
+    def start_retry(self) -> asyncio.Task:
+        """retry_required in the background, at most one at a time (probes return without waiting)"""
+        if self._retry is None or self._retry.done():
+            self._retry = asyncio.ensure_future(self.retry_required())
+        return self._retry
+
+    @property
+    def ready(self) -> bool:
+        return self.done and all(self.results[name].status != FAILED for name in self.required)
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "ready" if self.ready else ("warming_up" if not self.done else "not_ready"),
+            "seconds": self.seconds,
+            "retrying": self._retry is not None and not self._retry.done(),
+            "dependencies": {name: asdict(result) for name, result in self.results.items()},
+        }
+
+
+async def warm_database() -> None:
+    """Open pooled connections so the first requests do not pay for connection setup"""
+    from app.db.session import engine
+
+    def open_connections():
+        connections = []
+        try:
+            for _ in range(settings.warmup_db_connections):
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()  # Returned to the pool, still open
+
+    await asyncio.to_thread(open_connections)
+
+
+async def warm_model() -> None:
+    from app.core.vertex_ai import get_client
+
+    client = await asyncio.to_thread(get_client)
+    await client.warm_up(settings.vertex_ai_model)
+
+
+async def warm_few_shot() -> None:
+    from app.prompts.few_shot_loader import get_few_shot_db
+
+    await asyncio.to_thread(get_few_shot_db)
+
+
+async def warm_jwks() -> Optional[str]:
+    from app.core.token_verifier import get_token_verifier
+
+    if not settings.clerk_secret_key:
+        return SKIPPED
+    await get_token_verifier().jwks.refresh()
+    return None
+
+
+# Global warm-up state
+warmup = Warmup(
+    steps={
+        "database": warm_database,
+        "vertex_ai": warm_model,
+        "few_shot": warm_few_shot,
+        "clerk_jwks": warm_jwks,
+    },
+    required={"database"},
+    timeout_seconds=settings.warmup_timeout_seconds,
+)
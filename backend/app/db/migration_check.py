@@ -0,0 +1,61 @@
+"""
+Startup migration check
+Compares the database's Alembic revision with the migration heads so the
+container entrypoint only runs `alembic upgrade head` when the schema is behind.
+
+Run with: python -m app.db.migration_check  (exit code 0 = at head, 1 = upgrade needed)
+"""
+import logging
+import sys
+from pathlib import Path
+from typing import Optional, Set
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def head_revisions(config_path: Path = ALEMBIC_INI) -> Set[str]:
+    config = Config(str(config_path))
+    config.set_main_option("script_location", str(config_path.parent / "migrations"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def schema_is_current(engine: Optional[Engine] = None) -> bool:
+    """True when the database is stamped at every migration head"""
+    owns_engine = engine is None
+    if owns_engine:
+        engine = create_engine(settings.database_url, pool_pre_ping=True)
+    try:
+        return current_revisions(engine) == head_revisions()
+    finally:
+        if owns_engine:
+            engine.dispose()
+
+
+def main() -> int:
+    try:
+        current = schema_is_current()
+    except Exception as e:
+        # Let `alembic upgrade head` run (and report) when the check itself fails
+        logger.warning(f"Migration check failed: {e}")
+        return 1
+    return 0 if current else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
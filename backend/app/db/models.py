@@ -2,7 +2,7 @@
 Database models for Mosaico Platform
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, ARRAY
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON, ARRAY, UniqueConstraint
 from sqlalchemy import Enum as SAEnum
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -128,3 +128,79 @@ class ActivityLog(Base):
     # Relationships
     project = relationship("Project", back_populates="activity_logs")
 
+
+
+class IdempotencyRecord(Base):
+    """
+    Stored response for an Idempotency-Key
+    A row without status_code is a request still being executed
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(255), nullable=False)  # "POST /api/v1/generate:<user or client>"
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RateLimitBucket(Base):
+    """Token bucket of one caller ("user:<id>" or "ip:<address>"), shared by all instances"""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # Unix time of the last refill
+
+
+class GenerationRun(Base):
+    """
+    One generation run for a project (prompt fingerprint, model, parameters)
+    Variation texts are stored once in generated_texts and referenced per run
+    """
+    __tablename__ = "generation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String(255))
+    prompt_fingerprint = Column(String(64), nullable=False, index=True)
+    model = Column(String(100))
+    parameters = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    variations = relationship(
+        "GenerationRunText",
+        back_populates="run",
+        cascade="all, delete-orphan",
+        order_by="[GenerationRunText.variation_index, GenerationRunText.position]"
+    )
+
+
+class GeneratedText(Base):
+    """Distinct generated text, shared by every run that produced it"""
+    __tablename__ = "generated_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    content = Column(Text, nullable=False)
+
+
+class GenerationRunText(Base):
+    """One component of one variation of a run"""
+    __tablename__ = "generation_run_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("generation_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    variation_index = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)  # Component order within the variation
+    component_key = Column(String(100), nullable=False)  # "subject", "body_1", "section_1.cta_1", ...
+    text_id = Column(Integer, ForeignKey("generated_texts.id"), nullable=False)
+
+    # Relationships
+    run = relationship("GenerationRun", back_populates="variations")
+    text = relationship("GeneratedText")
@@ -1,9 +1,26 @@
 """
 Database session management
 """
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
+from app.core.deadline import before_cursor_execute
+from app.core.metrics import db_pool_checkout_wait
+from app.core.tracing import install_sql_tracing
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started)
+
 
 # Create database engine
 # Ensure the URL uses the psycopg driver
@@ -13,15 +30,38 @@ if db_url.startswith("postgresql://"):
 
 engine = create_engine(
     db_url,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=5
 )
 
+# Fail fast instead of querying once the request deadline has passed
+event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+# A db.query span per statement, under the request (and ProjectService method) span
+install_sql_tracing(engine)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def run_in_session(func, *args, **kwargs):
+    """
+    Call func(db, *args, **kwargs) with a session of its own, closed afterwards (blocking)
+
+    For executor workers: the request's session from get_db must stay on the
+    request's thread, since a worker released by a timeout would otherwise
+    keep using it after get_db has closed it. Returned rows are detached, so
+    load what the caller needs inside func.
+    """
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
 def get_db():
     """
     Dependency for FastAPI endpoints to get database session
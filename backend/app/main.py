@@ -3,10 +3,9 @@ Mosaico FastAPI Application
 AI-Powered Email Campaign Content Generator
 """
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from app.db.base import Base
@@ -14,6 +13,21 @@ from app.db.session import engine
 
 from app import __version__
 from app.core.config import settings
+from app.core.model_router import model_router
+from app.core.hedging import hedge_stats
+from app.core.cancellation import cancellation_stats
+from app.core.deadline import DeadlineMiddleware
+from app.core.rate_limit import RateLimitHeadersMiddleware
+from app.core.admission import AdmissionMiddleware, admission_controller
+from app.core.blocking import blocking_detector
+from app.core.executors import ExecutorSaturated, executors_snapshot, shutdown_executors
+from app.services.idempotency import get_idempotency_store
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.tracing import InMemoryExporter, TracingMiddleware, install_log_correlation, tracer
+from app.core.warmup import warmup
+from app.core.token_verifier import get_token_verifier
+from app.services.speculative_translation import get_speculative_translator
+from app.services.user_directory import get_user_directory
 from app.api import generate
 from app.api import translate
 from app.api import refine
@@ -24,16 +38,14 @@ from app.api import export
 from app.api import optimize_prompt
 # from app.api import generate_from_image
 
-# Configure logging
+# Configure logging (records carry the trace id of the request that logged them)
+install_log_correlation()
 logging.basicConfig(
     level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [trace=%(trace_id)s] %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -52,8 +64,33 @@ async def lifespan(app: FastAPI):
         logger.info("Database tables ensured (create_all).")
     except Exception as e:
         logger.error(f"DB bootstrap failed: {e}")
+    # Warm dependencies in the background; /ready turns 200 once done
+    warmup_task = None
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(warmup.run())
+    else:
+        warmup.skip()
+    # Keep Clerk's signing keys fresh so token verification never waits on the network
+    jwks_task = None
+    if settings.clerk_secret_key:
+        jwks_task = asyncio.create_task(get_token_verifier().jwks.run_refresh_loop())
+    # Expired Idempotency-Keys are deleted in the background, not only when the same key comes back
+    purge_task = asyncio.create_task(
+        get_idempotency_store().run_purge_loop(settings.idempotency_purge_interval_seconds)
+    )
+    # Event-loop lag feeds admission control
+    lag_task = asyncio.create_task(admission_controller.run_lag_monitor())
+    # Stacks of sync calls holding the loop (see /health "event_loop_blocking" and the logs)
+    blocking_task = None
+    if settings.blocking_detector_enabled:
+        blocking_task = asyncio.create_task(blocking_detector.run(settings.blocking_asyncio_debug))
     yield
     # Shutdown
+    for task in (warmup_task, jwks_task, purge_task, lag_task, blocking_task):
+        if task and not task.done():
+            task.cancel()
+    shutdown_executors()
+    tracer.shutdown()
     logger.info(f"Mosaico backend v{__version__} shutting down")
 
 
@@ -65,9 +102,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add rate limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Rate limit headers on admitted requests (limits are applied per endpoint, see app/core/rate_limit.py)
+app.add_middleware(RateLimitHeadersMiddleware)
+
+# Load shedding: batch work gets 503 + Retry-After while the instance is overloaded
+app.add_middleware(AdmissionMiddleware)
+
+# Per-request deadline (X-Request-Timeout-Ms header or per-endpoint default)
+app.add_middleware(DeadlineMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -78,9 +120,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and endpoint labels for /metrics (outermost, so it sees every response)
+app.add_middleware(MetricsMiddleware)
+
+# Root span per request (honours an incoming traceparent, returns X-Trace-Id)
+app.add_middleware(TracingMiddleware)
 
 
 
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    """A dependency's thread pool is backed up: ask the client to retry"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Service busy ({exc.name}), retry later"},
+        headers={"Retry-After": str(settings.admission_retry_after_seconds)},
+    )
+
+
 @app.get("/", include_in_schema=False)
 async def root():
     """Health check endpoint"""
@@ -98,10 +156,53 @@ async def health_check():
         "status": "healthy",
         "version": __version__,
         "environment": settings.environment,
-        "vertex_ai_model": settings.vertex_ai_model
+        "vertex_ai_model": settings.vertex_ai_model,
+        "models": model_router.snapshot(),
+        "hedging": hedge_stats.snapshot(),
+        "cancellation": cancellation_stats.snapshot(),
+        "admission": admission_controller.snapshot(),
+        "event_loop_blocking": blocking_detector.snapshot(),
+        "executors": executors_snapshot(),
+        "auth_token_cache": get_token_verifier().cache.snapshot(),
+        "user_directory": get_user_directory().get_statistics(),
+        "speculative_translation": get_speculative_translator().get_statistics()
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until startup warm-up is done, with per-dependency timings"""
+    if warmup.done and not warmup.ready:
+        warmup.start_retry()  # Next probe sees the outcome
+    return JSONResponse(
+        status_code=200 if warmup.ready else 503,
+        content=warmup.snapshot()
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text exposition of the in-process metrics registry"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+if settings.environment == "development" and isinstance(tracer.exporter, InMemoryExporter):
+    @app.get("/debug/traces", include_in_schema=False)
+    async def debug_traces(trace_id: str | None = None, limit: int = 20):
+        """Spans of one trace, or the request spans of the most recent traces"""
+        if trace_id:
+            return [span.to_dict() for span in tracer.exporter.spans(trace_id)]
+        requests = [span for span in tracer.exporter.spans() if "http.method" in span.attributes]
+        return [span.to_dict() for span in requests[-limit:]]
+
+
+if settings.environment == "development":
+    @app.get("/debug/blocking", include_in_schema=False)
+    async def debug_blocking():
+        """Every call site that blocked the event loop, with its last stack"""
+        return blocking_detector.sites()
+
+
 # Include routers
 app.include_router(generate.router, prefix="/api/v1", tags=["Generate"])
 app.include_router(translate.router, prefix="/api/v1", tags=["Translate"])
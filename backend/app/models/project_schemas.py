@@ -4,7 +4,7 @@ Pydantic schemas for Project-related API endpoints
 from datetime import datetime
 from pydantic import BaseModel, Field, model_validator
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 # ===== Project Schemas =====
@@ -189,7 +189,7 @@ class ImageResponse(BaseModel):
 
 class GenerateProjectContentRequest(BaseModel):
     """Request to generate content for a project"""
-    count: int = Field(1, ge=1, le=5, description="Number of variations")
+    count: int = Field(1, ge=1, le=5, description="Number of variations (sections are generated once each)")
     image_urls: Optional[List[str]] = Field(default_factory=list, description="Optional image URLs to use as context")
 
 
@@ -269,3 +269,25 @@ class ActivityLogResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+# ===== Generation History Schemas =====
+
+class GenerationRunResponse(BaseModel):
+    """One past generation run with its variations"""
+    id: int
+    project_id: int
+    user_id: Optional[str]
+    prompt_fingerprint: str
+    model: Optional[str]
+    parameters: dict
+    created_at: datetime
+    variations: List[Dict[str, str]]
+
+
+class GenerationRunPage(BaseModel):
+    """Page of generation runs, newest first"""
+    total: int
+    skip: int
+    limit: int
+    runs: List[GenerationRunResponse]
@@ -56,13 +56,32 @@ class GenerateVariationsRequest(BaseModel):
     context: str | None = Field(default=None, description="Optional additional context")
     image_url: str | None = None
     temperature: float | None = Field(default=None, ge=0.0, le=1.0, description="Temperature for generation (0.0-1.0, default 0.7)")
-    use_flash: bool | None = Field(default=False, description="Use Gemini Flash model instead of Pro for faster, cheaper generation")
+    use_flash: bool | None = Field(default=None, description="Force Gemini Flash (true) or prefer Pro (false); omit to let the model router decide")
     use_few_shot: bool | None = Field(default=False, description="Include Few-Shot examples in prompt (for regeneration only, not initial generation)")
+    strategy: Literal["auto", "single", "fan_out"] = Field(default="auto", description="Generate all variations in one call, split them across parallel calls, or let the server decide")
+    project_id: int | None = Field(default=None, description="Project the content is generated for: the run is kept in its generation history and its target languages are used for speculative translation")
+    speculative_translation: bool = Field(default=False, description="Pre-translate the variations in the background so the following translate call is served instantly")
+    target_languages: list[str] | None = Field(default=None, description="Languages for speculative translation (defaults to the project's target languages)")
+
+
+class RegenerateComponentRequest(BaseModel):
+    """Request to regenerate a single component slot"""
+    text: str = Field(..., min_length=1, description="The campaign brief")
+    component: ComponentType = Field(..., description="Component type of the slot to regenerate")
+    current_text: str | None = Field(default=None, description="Current text of the slot, to be replaced")
+    neighbors: dict[str, str] = Field(default_factory=dict, description="Texts of neighboring components by key (e.g. {'title': '...', 'body_1': '...'})")
+    count: int = Field(default=3, ge=1, le=10, description="Number of alternatives to return")
+    tone: ToneType = Field(default=ToneType.PROFESSIONAL, description="Tone of voice")
+    content_type: ContentType = Field(default=ContentType.NEWSLETTER, description="Content type")
+    temperature: float | None = Field(default=None, ge=0.0, le=1.0, description="Temperature for generation (default 0.9)")
+    use_flash: bool = Field(default=True, description="Use Gemini Flash (default) instead of Pro")
+    example_count: int = Field(default=4, ge=0, le=8, description="Few-Shot examples of this component type to include")
+    slot_key: str | None = Field(default=None, description="Client identifier of the slot (e.g. 'section_1.cta_1'); a newer request for the same slot cancels this one")
 
 
 class TranslateRequest(BaseModel):
     """Request to translate text"""
-    text: str = Field(..., description="Text to translate", min_length=1, max_length=2000)
+    text: str = Field(..., description="Text to translate (long body copy is translated per sentence)", min_length=1, max_length=10000)
     target_language: str = Field(..., description="Target language code (e.g., 'it', 'en', 'fr')", min_length=2, max_length=5)
     source_language: str | None = Field(default=None, description="Source language code (auto-detect if None)")
     maintain_tone: bool = Field(default=True, description="Maintain original tone and style")
@@ -93,6 +112,10 @@ class GenerateVariationsResponse(BaseModel):
     variations: list[dict[str, str]]
     original_text: str
     tone: str
+    attempts: int | None = Field(default=None, description="Model calls made for this request (including follow-ups and repairs)")
+    strategy: str | None = Field(default=None, description="Generation strategy used (single or fan_out)")
+    partial: bool = Field(default=False, description="True if the request deadline was reached before all variations were generated")
+    speculative_translations: int = Field(default=0, description="Translations started in the background for these variations")
     
     class Config:
         json_schema_extra = {
@@ -110,6 +133,12 @@ class GenerateVariationsResponse(BaseModel):
         }
 
 
+class RegenerateComponentResponse(BaseModel):
+    """Alternatives for a single component slot"""
+    component: str
+    alternatives: list[str]
+
+
 class TranslateResponse(BaseModel):
     """Response with translated text"""
     translated_text: str = Field(..., description="Translated text")
@@ -0,0 +1,127 @@
+"""
+Service layer for generation history
+Records each generation run per project so past variations can be reopened
+without calling the model again
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from app.db.models import GenerationRun, GenerationRunText, GeneratedText
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(**inputs) -> str:
+    """Stable hash of the inputs that determine the generation prompt"""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class GenerationHistoryService:
+    """Stores and pages generation runs, deduplicating identical texts"""
+
+    @staticmethod
+    def _get_or_create_texts(db: Session, texts: List[str]) -> Dict[str, GeneratedText]:
+        """GeneratedText rows by content hash, inserting the ones not seen before"""
+        by_hash = {content_hash(text): text for text in texts}
+        existing = db.query(GeneratedText).filter(
+            GeneratedText.content_hash.in_(list(by_hash))
+        ).all()
+        rows = {row.content_hash: row for row in existing}
+        for digest, text in by_hash.items():
+            if digest not in rows:
+                rows[digest] = GeneratedText(content_hash=digest, content=text)
+                db.add(rows[digest])
+        return rows
+
+    @staticmethod
+    def record_run(
+        db: Session,
+        project_id: int,
+        user_id: Optional[str],
+        fingerprint: str,
+        model: Optional[str],
+        parameters: dict,
+        variations: List[Dict[str, str]]
+    ) -> GenerationRun:
+        """Persist a run and its variations (retried once if a concurrent run inserted the same text)"""
+        try:
+            return GenerationHistoryService._insert_run(
+                db, project_id, user_id, fingerprint, model, parameters, variations
+            )
+        except IntegrityError:
+            db.rollback()
+            return GenerationHistoryService._insert_run(
+                db, project_id, user_id, fingerprint, model, parameters, variations
+            )
+
+    @staticmethod
+    def _insert_run(
+        db: Session,
+        project_id: int,
+        user_id: Optional[str],
+        fingerprint: str,
+        model: Optional[str],
+        parameters: dict,
+        variations: List[Dict[str, str]]
+    ) -> GenerationRun:
+        texts = [str(value) for variation in variations for value in variation.values()]
+        text_rows = GenerationHistoryService._get_or_create_texts(db, texts)
+
+        run = GenerationRun(
+            project_id=project_id,
+            user_id=user_id,
+            prompt_fingerprint=fingerprint,
+            model=model,
+            parameters=parameters
+        )
+        for variation_index, variation in enumerate(variations):
+            for position, (key, value) in enumerate(variation.items()):
+                run.variations.append(GenerationRunText(
+                    variation_index=variation_index,
+                    position=position,
+                    component_key=key,
+                    text=text_rows[content_hash(str(value))]
+                ))
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+        logger.info(
+            f"Recorded generation run {run.id} for project {project_id} "
+            f"({len(variations)} variations, {len(text_rows)} distinct texts)"
+        )
+        return run
+
+    @staticmethod
+    def list_runs(
+        db: Session,
+        project_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        fingerprint: Optional[str] = None
+    ) -> Tuple[List[GenerationRun], int]:
+        """Runs for a project, newest first, with the total count"""
+        query = db.query(GenerationRun).filter(GenerationRun.project_id == project_id)
+        if fingerprint:
+            query = query.filter(GenerationRun.prompt_fingerprint == fingerprint)
+        total = query.count()
+        runs = query.options(
+            joinedload(GenerationRun.variations).joinedload(GenerationRunText.text)
+        ).order_by(GenerationRun.created_at.desc(), GenerationRun.id.desc()).offset(skip).limit(limit).all()
+        return runs, total
+
+    @staticmethod
+    def assemble_variations(run: GenerationRun) -> List[Dict[str, str]]:
+        """Rebuild the variation dicts of a run in their original order"""
+        variations: Dict[int, Dict[str, str]] = {}
+        for item in run.variations:
+            variations.setdefault(item.variation_index, {})[item.component_key] = item.text.content
+        return [variations[index] for index in sorted(variations)]
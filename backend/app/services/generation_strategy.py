@@ -0,0 +1,162 @@
+"""
+Generation strategies for /generate
+Single call vs parallel fan-out of N variations across K independent calls
+"""
+import asyncio
+import json
+import logging
+import random
+from difflib import SequenceMatcher
+from typing import Callable, List
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core import deadline
+from app.core.latency import latency_tracker
+from app.core.vertex_ai import VertexAIClient, GenerationStats, avoid_repeats_prompt
+from app.services.generation_validation import ValidationPipeline
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_THRESHOLD = 0.95
+
+
+def split_counts(count: int, calls: int) -> List[int]:
+    """Split count variations as evenly as possible, e.g. (5, 3) -> [2, 2, 1]"""
+    calls = max(1, min(calls, count))
+    base, extra = divmod(count, calls)
+    return [base + (1 if i < extra else 0) for i in range(calls)]
+
+
+def choose_call_count(
+    strategy: str,
+    count: int,
+    components_per_variation: int,
+    model_name: str
+) -> int:
+    """
+    Decide how many parallel calls to use (1 = single call)
+
+    The adaptive policy ("auto") fans out when the requested output is large
+    or when the model's recently observed p95 latency is above threshold.
+    """
+    if strategy == "single" or count <= 1:
+        return 1
+
+    max_calls = min(count, settings.fan_out_max_calls)
+    if strategy == "fan_out":
+        return max_calls
+
+    if count * components_per_variation >= settings.fan_out_min_components:
+        return max_calls
+
+    p95 = latency_tracker.percentile(model_name, 95, min_samples=5)
+    if p95 is not None and p95 >= settings.fan_out_latency_threshold_seconds:
+        return max_calls
+
+    return 1
+
+
+def dedup_variations(variations: List[dict], threshold: float = DUPLICATE_THRESHOLD) -> List[dict]:
+    """Drop exact and near-duplicate variations, keeping the first occurrence"""
+    kept: List[dict] = []
+    kept_texts: List[str] = []
+    for variation in variations:
+        text = " | ".join(str(v).strip().lower() for v in variation.values())
+        if any(
+            text == other or SequenceMatcher(None, text, other).ratio() >= threshold
+            for other in kept_texts
+        ):
+            continue
+        kept.append(variation)
+        kept_texts.append(text)
+    return kept
+
+
+async def generate_fan_out(
+    client: VertexAIClient,
+    prompt_builder: Callable[[int], str],
+    count: int,
+    calls: int,
+    temperature: float,
+    token_budget: Callable[[int], int],
+    image_url: str | None,
+    model: str,
+    validation: ValidationPipeline | None,
+    stats: GenerationStats,
+) -> List[dict]:
+    """
+    Generate count variations across parallel calls with different seeds and temperatures,
+    then merge, dedup, top up any shortfall and validate the merged set. The image is
+    downloaded once and shared by every call.
+
+    Args:
+        token_budget: Returns max_output_tokens for a call generating n variations
+    """
+    counts = split_counts(count, calls)
+    base_seed = random.randrange(2**31 - len(counts))
+    call_stats = [GenerationStats() for _ in counts]
+    image_parts = await client.load_image_parts(image_url)
+    logger.info(f"Fanning out {count} variations across {len(counts)} calls: {counts}")
+
+    def temperature_for(index: int) -> float:
+        offset = (index - (len(counts) - 1) / 2) * settings.fan_out_temperature_spread
+        return min(1.0, max(0.0, temperature + offset))
+
+    results = await asyncio.gather(
+        *[
+            client.generate_with_fixing(
+                prompt_builder(n),
+                n,
+                temperature=temperature_for(i),
+                max_tokens=token_budget(n),
+                image_parts=image_parts,
+                model=model,
+                prompt_builder=prompt_builder,
+                stats=call_stats[i],
+                seed=base_seed + i,
+            )
+            for i, n in enumerate(counts)
+        ],
+        return_exceptions=True,
+    )
+
+    merged: List[dict] = []
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning(f"Fan-out call failed: {result}")
+            continue
+        merged.extend(json.loads(result).get("variations", []))
+    for call in call_stats:
+        stats.merge(call)
+
+    merged = dedup_variations(merged)
+    if len(merged) < count:
+        missing = count - len(merged)
+        logger.info(f"Fan-out produced {len(merged)}/{count} unique variations, topping up {missing}")
+        try:
+            top_up = await client.generate_with_fixing(
+                avoid_repeats_prompt(prompt_builder(missing), merged),
+                missing,
+                temperature=temperature,
+                max_tokens=token_budget(missing),
+                image_parts=image_parts,
+                model=model,
+                prompt_builder=prompt_builder,
+                stats=stats,
+            )
+            merged = dedup_variations(merged + json.loads(top_up).get("variations", []))
+        except Exception as e:
+            logger.warning(f"Fan-out top-up failed: {e}")
+
+    if not merged:
+        deadline.check("merging fan-out results")
+        raise HTTPException(
+            status_code=500, detail="Failed to generate valid content from the model."
+        )
+
+    merged = merged[:count]
+    if validation:
+        merged = await client.validate_and_repair(validation, merged, stats)
+    return merged
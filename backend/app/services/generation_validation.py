@@ -0,0 +1,229 @@
+"""
+Local post-generation validation
+Pluggable checks that run on generated variations before they are returned,
+so only the failing components need to be re-requested from the model
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Character budgets for components without a dedicated setting
+DEFAULT_CHAR_LIMITS = {
+    "title": 80,
+    "cta": 30,
+}
+
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
+
+@dataclass
+class ValidationIssue:
+    """A single failing component in a single variation"""
+    variation_index: int
+    key: str
+    reason: str
+
+
+@dataclass
+class ValidationContext:
+    """Everything validators need to know about the requested output"""
+    required_keys: List[str]
+    brief: str = ""
+    tone: str = "professional"
+    char_limits: Dict[str, int] = field(default_factory=dict)
+    banned_phrases: List[str] = field(default_factory=list)
+    similarity_threshold: float = NEAR_DUPLICATE_THRESHOLD
+
+
+Validator = Callable[[List[dict], ValidationContext], List[ValidationIssue]]
+
+
+def component_type_of(key: str) -> str:
+    """'cta_2' -> 'cta', 'pre_header' -> 'pre_header'"""
+    base, _, suffix = key.rpartition("_")
+    return base if base and suffix.isdigit() else key
+
+
+def get_char_limits() -> Dict[str, int]:
+    """Character budgets per component type"""
+    return {
+        **DEFAULT_CHAR_LIMITS,
+        "subject": settings.subject_char_budget,
+        "pre_header": settings.pre_header_char_budget,
+    }
+
+
+def get_banned_phrases() -> List[str]:
+    """Parse banned phrases from comma-separated settings"""
+    if not settings.banned_phrases:
+        return []
+    return [phrase.strip() for phrase in settings.banned_phrases.split(",") if phrase.strip()]
+
+
+# ===== Validators =====
+
+def check_required_keys(variations: List[dict], ctx: ValidationContext) -> List[ValidationIssue]:
+    """Every requested key must be present with a non-empty string"""
+    issues = []
+    for index, variation in enumerate(variations):
+        for key in ctx.required_keys:
+            value = variation.get(key)
+            if not isinstance(value, str) or not value.strip():
+                issues.append(ValidationIssue(index, key, "missing or empty"))
+    return issues
+
+
+def check_length_limits(variations: List[dict], ctx: ValidationContext) -> List[ValidationIssue]:
+    """Components must fit their character budget"""
+    issues = []
+    for index, variation in enumerate(variations):
+        for key, value in variation.items():
+            limit = ctx.char_limits.get(component_type_of(key))
+            if limit and isinstance(value, str) and len(value) > limit:
+                issues.append(ValidationIssue(
+                    index, key, f"too long ({len(value)} chars, max {limit})"
+                ))
+    return issues
+
+
+def normalize_cta_case(variations: List[dict], ctx: ValidationContext) -> List[ValidationIssue]:
+    """CTAs are always UPPERCASE - fixed locally, never worth a model call"""
+    for variation in variations:
+        for key, value in variation.items():
+            if component_type_of(key) == "cta" and isinstance(value, str):
+                variation[key] = value.upper()
+    return []
+
+
+def check_banned_phrases(variations: List[dict], ctx: ValidationContext) -> List[ValidationIssue]:
+    """Components must not contain banned phrases (case-insensitive)"""
+    if not ctx.banned_phrases:
+        return []
+    issues = []
+    for index, variation in enumerate(variations):
+        for key, value in variation.items():
+            if not isinstance(value, str):
+                continue
+            lowered = value.lower()
+            found = [p for p in ctx.banned_phrases if p.lower() in lowered]
+            if found:
+                issues.append(ValidationIssue(index, key, f"contains banned phrase(s): {', '.join(found)}"))
+    return issues
+
+
+def check_near_duplicates(variations: List[dict], ctx: ValidationContext) -> List[ValidationIssue]:
+    """
+    Instances of the same component (cta_1 vs cta_2) must differ,
+    and the same key must differ across variations. The later one is flagged.
+    """
+    def similar(a: str, b: str) -> bool:
+        return SequenceMatcher(None, a.lower(), b.lower()).ratio() >= ctx.similarity_threshold
+
+    issues = []
+    seen_by_key: Dict[str, List[str]] = {}
+    for index, variation in enumerate(variations):
+        seen_by_type: Dict[str, List[tuple]] = {}
+        for key, value in variation.items():
+            if not isinstance(value, str) or not value.strip():
+                continue
+            comp_type = component_type_of(key)
+            duplicate_of = next(
+                (other_key for other_key, other in seen_by_type.get(comp_type, []) if similar(value, other)),
+                None
+            )
+            if duplicate_of:
+                issues.append(ValidationIssue(index, key, f"near-duplicate of {duplicate_of}"))
+            elif any(similar(value, other) for other in seen_by_key.get(key, [])):
+                issues.append(ValidationIssue(index, key, "near-duplicate of another variation"))
+            seen_by_type.setdefault(comp_type, []).append((key, value))
+            seen_by_key.setdefault(key, []).append(value)
+    return issues
+
+
+DEFAULT_VALIDATORS: List[Validator] = [
+    normalize_cta_case,
+    check_required_keys,
+    check_length_limits,
+    check_banned_phrases,
+    check_near_duplicates,
+]
+
+
+class ValidationPipeline:
+    """Runs validators over variations and builds targeted repair prompts"""
+
+    def __init__(self, context: ValidationContext, validators: Optional[List[Validator]] = None):
+        self.context = context
+        self.validators = validators if validators is not None else list(DEFAULT_VALIDATORS)
+
+    @classmethod
+    def for_structure(cls, required_keys: List[str], brief: str = "", tone: str = "professional") -> "ValidationPipeline":
+        """Pipeline with the default validators and settings-driven limits"""
+        return cls(ValidationContext(
+            required_keys=required_keys,
+            brief=brief,
+            tone=tone,
+            char_limits=get_char_limits(),
+            banned_phrases=get_banned_phrases()
+        ))
+
+    def run(self, variations: List[dict]) -> List[ValidationIssue]:
+        """Run all validators; one issue per (variation, key) is kept"""
+        issues: Dict[tuple, ValidationIssue] = {}
+        for validator in self.validators:
+            for issue in validator(variations, self.context):
+                issues.setdefault((issue.variation_index, issue.key), issue)
+        return list(issues.values())
+
+    def build_repair_prompt(self, variations: List[dict], issues: List[ValidationIssue]) -> str:
+        """Tiny prompt asking only for replacements of the failing components"""
+        items = []
+        for issue in issues:
+            comp_type = component_type_of(issue.key)
+            limit = self.context.char_limits.get(comp_type)
+            items.append({
+                "variation": issue.variation_index,
+                "key": issue.key,
+                "current": variations[issue.variation_index].get(issue.key, ""),
+                "problem": issue.reason,
+                "max_chars": limit,
+            })
+
+        banned = f"\nNever use: {', '.join(self.context.banned_phrases)}" if self.context.banned_phrases else ""
+        return f"""You are a senior copywriter fixing individual email components.
+Brief: "{self.context.brief}"
+Tone: {self.context.tone}{banned}
+
+Rewrite ONLY these components so the problem is solved. CTAs are UPPERCASE.
+{json.dumps(items, ensure_ascii=False, indent=2)}
+
+Output ONLY valid JSON:
+{{"repairs": [{{"variation": 0, "key": "cta_1", "text": "..."}}]}}"""
+
+    @staticmethod
+    def apply_repairs(variations: List[dict], repairs: List[dict], issues: List[ValidationIssue]) -> int:
+        """
+        Apply model repairs in place, returns how many were applied
+
+        Only components listed in issues are replaced; anything else the
+        model rewrote (or invented) is ignored.
+        """
+        failing = {(issue.variation_index, issue.key) for issue in issues}
+        applied = 0
+        for repair in repairs:
+            try:
+                index = int(repair["variation"])
+                key = str(repair["key"])
+                text = str(repair["text"]).strip()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if (index, key) in failing and text:
+                variations[index][key] = text
+                applied += 1
+        return applied
@@ -0,0 +1,379 @@
+"""
+Idempotency-Key support
+Stores the response of a request under its Idempotency-Key for a TTL so
+network retries replay it instead of re-running LLM work or writes.
+The first execution runs to completion even if its client disconnects, so
+the retry that follows finds its response. Concurrent duplicates wait for
+it: in-process via a shared future, across instances by polling the pending
+row. Backend calls run in the database executor; expired rows are purged
+periodically.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+
+from app.core import deadline
+from app.core.auth import User
+from app.core.cancellation import survive_disconnect
+from app.core.config import settings
+from app.core.executors import DATABASE, run_blocking, run_blocking_write
+from app.db.models import IdempotencyRecord
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+PENDING_POLL_SECONDS = 0.25  # First poll of a row pending on another instance, doubling up to the max
+PENDING_POLL_MAX_SECONDS = 2.0
+PENDING_WAIT_SECONDS = 60.0
+
+
+@dataclass
+class StoredResponse:
+    request_hash: str
+    status_code: Optional[int]  # None while the first execution is running
+    body: Any = None
+
+
+class MemoryIdempotencyBackend:
+    """Single-instance backend (development, tests)"""
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, str], Tuple[StoredResponse, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._records.get((scope, key))
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._records[(scope, key)]
+                return None
+            return entry[0]
+
+    def reserve(self, scope: str, key: str, request_hash: str, ttl: float) -> bool:
+        if self.get(scope, key) is not None:
+            return False
+        with self._lock:
+            if (scope, key) in self._records:
+                return False
+            self._records[(scope, key)] = (StoredResponse(request_hash, None), time.time() + ttl)
+            return True
+
+    def complete(self, scope: str, key: str, status_code: int, body: Any) -> None:
+        with self._lock:
+            entry = self._records.get((scope, key))
+            if entry is not None:
+                entry[0].status_code = status_code
+                entry[0].body = body
+
+    def release(self, scope: str, key: str) -> None:
+        with self._lock:
+            self._records.pop((scope, key), None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._records.items() if expires_at < now]
+            for k in expired:
+                del self._records[k]
+        return len(expired)
+
+
+class DatabaseIdempotencyBackend:
+    """Shared backend on the idempotency_keys table"""
+
+    def get(self, scope: str, key: str) -> Optional[StoredResponse]:
+        db = SessionLocal()
+        try:
+            record = db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.scope == scope,
+                IdempotencyRecord.key == key
+            ).first()
+            if record is None:
+                return None
+            if record.expires_at < datetime.utcnow():
+                db.delete(record)
+                db.commit()
+                return None
+            return StoredResponse(record.request_hash, record.status_code, record.response_body)
+        finally:
+            db.close()
+
+    def reserve(self, scope: str, key: str, request_hash: str, ttl: float) -> bool:
+        if self.get(scope, key) is not None:  # Also clears an expired row
+            return False
+        db = SessionLocal()
+        try:
+            db.add(IdempotencyRecord(
+                scope=scope,
+                key=key,
+                request_hash=request_hash,
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+            ))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def complete(self, scope: str, key: str, status_code: int, body: Any) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.scope == scope,
+                IdempotencyRecord.key == key
+            ).update({"status_code": status_code, "response_body": body})
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, scope: str, key: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.scope == scope,
+                IdempotencyRecord.key == key,
+                IdempotencyRecord.status_code.is_(None)
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        db = SessionLocal()
+        try:
+            deleted = db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+class IdempotencyStore:
+    """Backend plus in-process futures for concurrent duplicates"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._runs: set = set()  # Strong references to executions whose caller may be gone
+
+    async def _backend(self, method: Callable, *args) -> Any:
+        """Backend call off the event loop (the database backend is sync SQLAlchemy)"""
+        return await run_blocking(DATABASE, method, *args)
+
+    async def _backend_write(self, method: Callable, *args) -> Any:
+        """
+        Backend write that always runs to completion (no timeout or request deadline)
+
+        Storing or releasing a key must not fail because the handler finished
+        close to the deadline: the work is done, and a key left pending would
+        stall retries until its TTL.
+        """
+        return await run_blocking_write(DATABASE, method, *args)
+
+    async def _release(self, scope: str, key: str) -> None:
+        try:
+            await self._backend_write(self.backend.release, scope, key)
+        except Exception as release_error:
+            logger.warning(f"Failed to release Idempotency-Key {key}: {release_error}")
+
+    async def _wait_for_pending(self, scope: str, key: str) -> Optional[StoredResponse]:
+        """Poll a row reserved by another instance until it completes or disappears"""
+        waited = 0.0
+        delay = PENDING_POLL_SECONDS
+        limit = min(PENDING_WAIT_SECONDS, deadline.remaining() or PENDING_WAIT_SECONDS)
+        while waited < limit:
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = min(delay * 2, PENDING_POLL_MAX_SECONDS)
+            stored = await self._backend(self.backend.get, scope, key)
+            if stored is None or stored.status_code is not None:
+                return stored
+        raise HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is still in progress"
+        )
+
+    @staticmethod
+    def _replay(body: Any, status_code: int = 200) -> JSONResponse:
+        return JSONResponse(content=body, status_code=status_code, headers={REPLAYED_HEADER: "true"})
+
+    async def execute(
+        self,
+        scope: str,
+        key: str,
+        request_hash: str,
+        run: Callable[[], Any],
+        serialize: Callable[[Any], Any],
+    ) -> Any:
+        """
+        Run the request once per (scope, key); replays and waiters get the stored response
+
+        Raises:
+            HTTPException: 422 if the key was used with a different request body
+        """
+        inflight = self._inflight.get((scope, key))
+        if inflight is not None:
+            logger.info(f"Waiting on in-flight request for Idempotency-Key {key}")
+            return self._replay(await asyncio.shield(inflight))
+
+        while True:
+            stored = await self._backend(self.backend.get, scope, key)
+            if stored is not None:
+                if stored.request_hash != request_hash:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Idempotency-Key was already used with a different request"
+                    )
+                if stored.status_code is None:
+                    stored = await self._wait_for_pending(scope, key)
+                    if stored is None:
+                        continue  # First execution failed and released the key: run it here
+                logger.info(f"Replaying stored response for Idempotency-Key {key}")
+                return self._replay(stored.body, stored.status_code)
+            if await self._backend(
+                self.backend.reserve, scope, key, request_hash, settings.idempotency_ttl_seconds
+            ):
+                break
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[(scope, key)] = future
+        execution = asyncio.ensure_future(self._run_and_store(scope, key, run, serialize, future))
+        self._runs.add(execution)
+        execution.add_done_callback(self._finished)
+        # Shielded: if this caller goes away the run still finishes and stores the response for its retry
+        return await asyncio.shield(execution)
+
+    def _finished(self, execution: asyncio.Future) -> None:
+        self._runs.discard(execution)
+        if not execution.cancelled():
+            execution.exception()  # Mark retrieved when the caller is gone
+
+    async def _run_and_store(
+        self,
+        scope: str,
+        key: str,
+        run: Callable[[], Any],
+        serialize: Callable[[Any], Any],
+        future: asyncio.Future,
+    ) -> Any:
+        survive_disconnect()
+        try:
+            try:
+                result = await run()
+                body = serialize(result)
+            except BaseException as e:
+                await self._release(scope, key)
+                if isinstance(e, HTTPException):
+                    future.set_exception(e)
+                else:
+                    future.set_exception(HTTPException(
+                        status_code=409, detail="The original request for this Idempotency-Key failed, retry"
+                    ))
+                future.exception()  # Mark retrieved when nobody is waiting
+                raise
+
+            try:
+                await self._backend_write(self.backend.complete, scope, key, 200, body)
+            except Exception as e:
+                # The work succeeded: answer it, and free the key so a retry runs again instead of waiting
+                logger.warning(f"Failed to store the response for Idempotency-Key {key}: {e}")
+                await self._release(scope, key)
+            future.set_result(body)
+            return result
+        finally:
+            self._inflight.pop((scope, key), None)
+
+    async def run_purge_loop(self, interval_seconds: float) -> None:
+        """Background task deleting expired keys"""
+        while True:
+            try:
+                purged = await self._backend(self.backend.purge_expired)
+                if purged:
+                    logger.info(f"Purged {purged} expired idempotency keys")
+            except Exception as e:
+                logger.warning(f"Idempotency key purge failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+def request_hash(kwargs: Dict[str, Any]) -> str:
+    """Stable hash of the request's body models and scalar parameters"""
+    payload = {}
+    for name, value in sorted(kwargs.items()):
+        if isinstance(value, BaseModel):
+            payload[name] = value.model_dump(mode="json")
+        elif isinstance(value, (str, int, float, bool)) or value is None:
+            payload[name] = value
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def idempotent(response_model: Type[BaseModel]):
+    """
+    Endpoint decorator honoring the Idempotency-Key header
+
+    Keys are scoped to the method, path and caller (authenticated user, or
+    client address for unauthenticated endpoints). The handler must take a
+    starlette Request parameter. Place it outside rate_limited, so replays and
+    duplicates are not charged again, and outside cancel_on_disconnect: a run
+    with a key is not cancelled when its client disconnects.
+    """
+    def serialize(result: Any) -> Any:
+        return response_model.model_validate(result).model_dump(mode="json")
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = next((v for v in kwargs.values() if isinstance(v, Request)), None)
+            key = request.headers.get(IDEMPOTENCY_HEADER) if request is not None else None
+            if not key:
+                return await func(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} is too long")
+
+            user = next((v for v in kwargs.values() if isinstance(v, User)), None)
+            caller = user.id if user else (request.client.host if request.client else "")
+            scope = f"{request.method} {request.url.path}:{caller}"
+            return await get_idempotency_store().execute(
+                scope,
+                key,
+                request_hash(kwargs),
+                lambda: func(*args, **kwargs),
+                serialize,
+            )
+        return wrapper
+    return decorator
+
+
+# Global store (lazy, like the other shared singletons)
+_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        backend = (
+            MemoryIdempotencyBackend()
+            if settings.idempotency_backend == "memory"
+            else DatabaseIdempotencyBackend()
+        )
+        _store = IdempotencyStore(backend)
+    return _store
@@ -6,6 +6,8 @@ from typing import List, Optional
 from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException, status
 
+from app.core.metrics import instrument_methods, project_service_duration
+from app.core.tracing import trace_methods
 from app.db.models import Project, Component, Translation, Image, ActivityLog
 from app.models.project_schemas import (
     ProjectCreate,
@@ -17,6 +19,8 @@ from app.models.project_schemas import (
 logger = logging.getLogger(__name__)
 
 
+@instrument_methods(project_service_duration)
+@trace_methods("project_service")
 class ProjectService:
     """Service for managing projects with collaboration support"""
     
@@ -472,6 +476,57 @@ class ProjectService:
         logger.info(f"Saved {len(saved_components)} components for project {project_id}")
         return saved_components
     
+    @staticmethod
+    def upsert_generated_components(
+        db: Session,
+        project_id: int,
+        user_id: str,
+        user_name: Optional[str],
+        components_data: List[dict]
+    ) -> List[Component]:
+        """
+        Write AI-generated content into the project's components
+        Existing components are matched by (component_type, component_index)
+        the way the editor identifies them: saved components carry
+        section_key "default", and a missing or 0 index counts as 1 (the
+        subject created with a project has index 0). Matches are updated in
+        place and moved to the generated section, others are created.
+        """
+        existing = {}
+        for c in db.query(Component).filter(Component.project_id == project_id).order_by(Component.id).all():
+            existing.setdefault((c.component_type, c.component_index or 1), c)
+        
+        saved_components = []
+        for comp_data in components_data:
+            key = (comp_data["component_type"], comp_data.get("component_index") or 1)
+            component = existing.get(key)
+            if component is None:
+                component = Component(
+                    project_id=project_id,
+                    section_key=comp_data["section_key"],
+                    section_order=comp_data.get("section_order", 0),
+                    component_type=comp_data["component_type"],
+                    component_index=comp_data.get("component_index")
+                )
+                db.add(component)
+            else:
+                component.section_key = comp_data["section_key"]
+                component.section_order = comp_data.get("section_order", 0)
+            component.generated_content = comp_data["generated_content"]
+            saved_components.append(component)
+        
+        ProjectService._log_activity(
+            db, project_id, user_id, user_name,
+            "generated_content",
+            None, None, f"{len(saved_components)} components"
+        )
+        
+        db.commit()
+        for component in saved_components:
+            db.refresh(component)
+        
+        return saved_components
+    
     @staticmethod
     def get_activity_log(db: Session, project_id: int, limit: int = 50) -> List[ActivityLog]:
         """Get recent activity for a project"""
@@ -0,0 +1,187 @@
+"""
+Section-aware generation engine
+Generates the header (subject, pre-header) and every content section of a
+project concurrently with a shared brief, then assembles them in section order
+"""
+import asyncio
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import List
+
+from app.api.generate import build_generation_prompt, structure_keys
+from app.core.vertex_ai import VertexAIClient, GenerationStats
+from app.models.schemas import ComponentType, StructureComponent
+from app.services.generation_validation import ValidationPipeline, component_type_of
+from app.services.token_budget import budget_for_structure
+
+logger = logging.getLogger(__name__)
+
+HEADER_SECTION_KEY = "header"
+HEADER_COMPONENTS = [ComponentType.SUBJECT, ComponentType.PRE_HEADER]
+
+# Component types generated inside content sections (images are uploaded, not generated)
+SECTION_COMPONENTS = {ComponentType.TITLE.value, ComponentType.BODY.value, ComponentType.CTA.value}
+
+# Sections made only of these are routed to Flash; anything with a body goes to Pro
+SHORT_COMPONENTS = {
+    ComponentType.SUBJECT.value,
+    ComponentType.PRE_HEADER.value,
+    ComponentType.TITLE.value,
+    ComponentType.CTA.value,
+}
+
+
+@dataclass
+class SectionPlan:
+    """One independently generated slice of the email"""
+    key: str
+    name: str
+    order: int
+    structure: List[StructureComponent]
+    use_flash: bool
+
+
+def plan_sections(structure: List[dict]) -> List[SectionPlan]:
+    """
+    Turn a project structure into generation units: the header first,
+    then every content section that has text components, in order
+
+    Accepts both the section format ({key, name, components}) and the
+    legacy format ({component, count}), which becomes a single "main" section.
+    """
+    plans = [SectionPlan(
+        key=HEADER_SECTION_KEY,
+        name="Header",
+        order=0,
+        structure=[StructureComponent(component=c, count=1) for c in HEADER_COMPONENTS],
+        use_flash=True
+    )]
+
+    if structure and "component" in structure[0]:
+        components: List[str] = []
+        for item in structure:
+            components.extend([item["component"]] * int(item.get("count", 1) or 1))
+        structure = [{"key": "main", "name": "Main Section", "components": components}]
+
+    for order, section in enumerate(structure, start=1):
+        counts = Counter(c for c in section.get("components", []) if c in SECTION_COMPONENTS)
+        if not counts:
+            continue
+        plans.append(SectionPlan(
+            key=section.get("key", f"section_{order}"),
+            name=section.get("name", f"Section {order}"),
+            order=order,
+            structure=[
+                StructureComponent(component=ComponentType(comp), count=count)
+                for comp, count in counts.items()
+            ],
+            use_flash=set(counts) <= SHORT_COMPONENTS
+        ))
+    return plans
+
+
+def build_outline(plans: List[SectionPlan]) -> str:
+    """Shared description of the whole email given to every section call"""
+    lines = []
+    for plan in plans:
+        parts = ", ".join(
+            f"{item.count} {item.component.value.replace('_', ' ')}" for item in plan.structure
+        )
+        lines.append(f"- {plan.name}: {parts}")
+    return "FULL EMAIL OUTLINE (for coherence across sections):\n" + "\n".join(lines)
+
+
+async def generate_section(
+    client: VertexAIClient,
+    plan: SectionPlan,
+    brief: str,
+    tone: str,
+    outline: str,
+    image_url: str | None = None,
+    stats: GenerationStats | None = None,
+) -> dict:
+    """Generate one variation of a single section"""
+    context = (
+        f"{outline}\n\nYou are writing ONLY the \"{plan.name}\" part of this email. "
+        f"Other parts are written separately from the same brief."
+    )
+
+    def prompt_for(count: int) -> str:
+        return build_generation_prompt(
+            text=brief,
+            count=count,
+            tone=tone,
+            content_type="newsletter",
+            structure=plan.structure,
+            context=context,
+        )
+
+    response_text = await client.generate_with_fixing(
+        prompt=prompt_for(1),
+        expected_variations=1,
+        temperature=0.7,
+        max_tokens=budget_for_structure(plan.structure, 1),
+        image_url=image_url,
+        use_flash=plan.use_flash,
+        task="section",
+        validation=ValidationPipeline.for_structure(
+            required_keys=structure_keys(plan.structure), brief=brief, tone=tone
+        ),
+        prompt_builder=prompt_for,
+        stats=stats,
+    )
+    return json.loads(response_text)["variations"][0]
+
+
+async def generate_sections(
+    client: VertexAIClient,
+    brief: str,
+    tone: str,
+    structure: List[dict],
+    image_url: str | None = None,
+    stats: GenerationStats | None = None,
+) -> List[dict]:
+    """
+    Generate all sections concurrently and assemble them in section order
+
+    Wall-clock time approaches the slowest section rather than the sum.
+
+    Returns:
+        Component dicts with section_key, section_order, component_type,
+        component_index and generated_content. Every type is numbered 1..n
+        across the whole email, the convention the editor saves components
+        with (see ProjectService.upsert_generated_components).
+    """
+    plans = plan_sections(structure)
+    outline = build_outline(plans)
+    stats = stats if stats is not None else GenerationStats()
+    section_stats = [GenerationStats() for _ in plans]
+
+    logger.info(
+        f"Generating {len(plans)} sections concurrently: "
+        + ", ".join(f"{p.key} ({'flash' if p.use_flash else 'pro'})" for p in plans)
+    )
+    results = await asyncio.gather(*[
+        generate_section(client, plan, brief, tone, outline, image_url, stats=section_stats[i])
+        for i, plan in enumerate(plans)
+    ])
+    for section in section_stats:
+        stats.merge(section)
+
+    type_counters: Counter = Counter()
+    components = []
+    for plan, variation in zip(plans, results):
+        for key in structure_keys(plan.structure):
+            comp_type = component_type_of(key)
+            type_counters[comp_type] += 1
+            index = type_counters[comp_type]
+            components.append({
+                "section_key": plan.key,
+                "section_order": plan.order,
+                "component_type": comp_type,
+                "component_index": index,
+                "generated_content": variation.get(key, ""),
+            })
+    return components
@@ -0,0 +1,220 @@
+"""
+Speculative background translation
+After /generate, pre-translates the variations into the project's languages at
+low priority so the translate call that usually follows is served instantly.
+Once a translate call touches one variation, work for the others is cancelled.
+A translate call never waits for speculative work that has not started yet:
+that job is dropped and the call translates in the foreground instead.
+"""
+import asyncio
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.translation_memory import TranslationMemory, get_translation_memory
+
+logger = logging.getLogger(__name__)
+
+FOREGROUND_BACKOFF_SECONDS = 0.2
+
+_speculating: contextvars.ContextVar[bool] = contextvars.ContextVar("speculating", default=False)
+
+
+class SpeculativeBatch:
+    """Translation tasks for the variations of one /generate response"""
+
+    def __init__(self, project_id: Optional[int]):
+        self.project_id = project_id
+        self.tasks: Dict[int, List[asyncio.Task]] = {}  # variation index -> tasks
+        self.keys: List[str] = []
+        self.chosen: Optional[int] = None
+
+    def cancel(self, keep: Optional[int] = None) -> int:
+        """Cancel unfinished tasks of every variation except keep"""
+        cancelled = 0
+        for index, tasks in self.tasks.items():
+            if index == keep:
+                continue
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    cancelled += 1
+        return cancelled
+
+
+class SpeculativeTranslator:
+    """Schedules speculative translations and serves them to later translate calls"""
+
+    def __init__(self, max_concurrency: int, ttl_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.ttl_seconds = ttl_seconds
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[str, Tuple[SpeculativeBatch, int, asyncio.Task]] = {}
+        self._batches_by_project: Dict[int, SpeculativeBatch] = {}
+        self._started: Set[str] = set()  # Keys whose model call is under way
+        self._foreground = 0
+        self.scheduled = 0
+        self.served = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def is_speculative() -> bool:
+        return _speculating.get()
+
+    @contextmanager
+    def foreground(self):
+        """Mark user-facing translation work; speculative jobs yield while any is running"""
+        self._foreground += 1
+        try:
+            yield
+        finally:
+            self._foreground -= 1
+
+    def schedule(
+        self,
+        variations: List[dict],
+        languages: List[str],
+        project_id: Optional[int] = None,
+    ) -> int:
+        """
+        Queue translations of every text component of every variation
+
+        Returns:
+            Number of translations scheduled
+        """
+        if project_id is not None and project_id in self._batches_by_project:
+            self._expire(self._batches_by_project.pop(project_id))  # Superseded by a newer generation
+
+        loop = asyncio.get_running_loop()
+        memory = get_translation_memory()
+        batch = SpeculativeBatch(project_id)
+        for index, variation in enumerate(variations):
+            for component_key, text in variation.items():
+                if not isinstance(text, str) or not text.strip():
+                    continue
+                for language in languages:
+                    key = TranslationMemory.make_key(text, language)
+                    if key in self._pending or memory.get(text, language) is not None:
+                        continue
+                    # Fresh context: no request deadline or cancellation tracking applies
+                    task = loop.create_task(
+                        self._run(key, text, language, component_key.startswith("body")),
+                        context=contextvars.Context()
+                    )
+                    batch.tasks.setdefault(index, []).append(task)
+                    batch.keys.append(key)
+                    self._pending[key] = (batch, index, task)
+
+        scheduled = len(batch.keys)
+        if scheduled:
+            self.scheduled += scheduled
+            if project_id is not None:
+                self._batches_by_project[project_id] = batch
+            loop.call_later(self.ttl_seconds, self._expire, batch)
+            logger.info(
+                f"Scheduled {scheduled} speculative translation(s) for {len(variations)} "
+                f"variation(s) into {languages}"
+            )
+        return scheduled
+
+    async def _run(self, key: str, text: str, language: str, segmented: bool) -> Optional[str]:
+        """Wait for a concurrency slot and idle foreground, then translate"""
+        _speculating.set(True)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            while self._foreground:
+                await asyncio.sleep(FOREGROUND_BACKOFF_SECONDS)
+            self._started.add(key)
+            try:
+                return await self._translate(text, language, segmented)
+            finally:
+                self._started.discard(key)
+
+    async def _translate(self, text: str, language: str, segmented: bool) -> Optional[str]:
+        from app.api.translate import translate_segmented, translate_with_protection
+
+        translate = translate_segmented if segmented else translate_with_protection
+        try:
+            translated, _ = await translate(text=text, target_language=language, source_language="auto")
+            return translated
+        except Exception as e:
+            logger.debug(f"Speculative translation to {language} failed: {e}")
+            return None
+
+    async def claim(
+        self,
+        text: str,
+        language: str,
+        maintain_tone: bool = True,
+        content_type: str = "newsletter",
+    ) -> Optional[str]:
+        """
+        Serve a speculative translation to a user-facing translate call
+
+        The first claim on a batch marks that variation as chosen and cancels
+        speculative work for the others. A job still queued behind the
+        concurrency limit or the foreground back-off is cancelled too, and
+        None returned so the caller translates directly. Jobs run with the
+        default options, so calls with other options never match them.
+        """
+        if self.is_speculative():
+            return None
+        key = TranslationMemory.make_key(text, language, maintain_tone, content_type)
+        entry = self._pending.get(key)
+        if entry is None:
+            return None
+
+        batch, index, task = entry
+        if batch.chosen is None:
+            batch.chosen = index
+            cancelled = batch.cancel(keep=index)
+            self.cancelled += cancelled
+            if cancelled:
+                logger.info(f"Variation {index} chosen, cancelled {cancelled} speculative translation(s)")
+
+        if not task.done() and key not in self._started:
+            task.cancel()
+            del self._pending[key]
+            self.cancelled += 1
+            return None
+
+        await asyncio.wait({task})
+        if task.cancelled() or task.result() is None:
+            return None
+        self.served += 1
+        return task.result()
+
+    def _expire(self, batch: SpeculativeBatch) -> None:
+        self.cancelled += batch.cancel()
+        for key in batch.keys:
+            entry = self._pending.get(key)
+            if entry is not None and entry[0] is batch:
+                del self._pending[key]
+        if batch.project_id is not None and self._batches_by_project.get(batch.project_id) is batch:
+            del self._batches_by_project[batch.project_id]
+
+    def get_statistics(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "scheduled": self.scheduled,
+            "served": self.served,
+            "cancelled": self.cancelled,
+        }
+
+
+# Global instance (lazy loaded)
+_speculative_translator = None
+
+
+def get_speculative_translator() -> SpeculativeTranslator:
+    """Get or create the global speculative translator"""
+    global _speculative_translator
+    if _speculative_translator is None:
+        _speculative_translator = SpeculativeTranslator(
+            max_concurrency=settings.speculative_translation_max_concurrency,
+            ttl_seconds=settings.speculative_translation_ttl_seconds,
+        )
+    return _speculative_translator
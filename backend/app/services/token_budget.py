@@ -0,0 +1,93 @@
+"""
+Output token budgeting
+Derives max_output_tokens from the requested structure, the number of
+variations and historical per-component output lengths. Budgets include the
+Flash reasoning allowance; the client widens them for Pro once the model is
+routed (for_model).
+"""
+import math
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.telemetry import component_lengths
+from app.models.schemas import StructureComponent
+
+# Fallback lengths (chars) until telemetry has enough samples
+DEFAULT_COMPONENT_CHARS = {
+    "subject": 60,
+    "pre_header": 90,
+    "title": 60,
+    "body": 600,
+    "cta": 25,
+}
+UNKNOWN_COMPONENT_CHARS = 200
+
+# A full_email is estimated as the components it asks for (COMPONENT_INSTRUCTIONS in api/generate.py), plus a title
+FULL_EMAIL_COMPONENTS = {"subject": 1, "pre_header": 1, "title": 1, "body": 2, "cta": 2}
+
+CHARS_PER_TOKEN = 3.5  # Conservative for non-English copy
+JSON_TOKENS_PER_COMPONENT = 8  # Key, quotes, separators
+JSON_TOKENS_BASE = 32
+MIN_TELEMETRY_SAMPLES = 20
+
+
+def expected_chars(component_type: str) -> int:
+    """p90 of observed lengths once there is enough history, the default otherwise"""
+    observed = component_lengths.percentile(component_type, 90, min_samples=MIN_TELEMETRY_SAMPLES)
+    if observed is not None:
+        return observed
+    return DEFAULT_COMPONENT_CHARS.get(component_type, UNKNOWN_COMPONENT_CHARS)
+
+
+def _finalize(content_tokens: float) -> int:
+    """Apply the safety factor, reasoning allowance and global bounds"""
+    budget = math.ceil(content_tokens * settings.token_budget_safety_factor) + settings.token_budget_reasoning_tokens
+    return max(settings.token_budget_min, min(settings.token_budget_max, budget))
+
+
+def for_model(max_tokens: int, model_name: str) -> int:
+    """
+    Widen a budget for the model it is spent on
+
+    Gemini 2.5 Pro cannot turn thinking off and routinely thinks past the
+    default allowance, which would truncate the visible output.
+    """
+    if model_name == settings.vertex_ai_model or "pro" in model_name.lower():
+        return max_tokens + settings.token_budget_reasoning_tokens_pro - settings.token_budget_reasoning_tokens
+    return max_tokens
+
+
+def estimate_output_tokens(component_counts: Dict[str, int], variations: int = 1) -> int:
+    """
+    Estimate max_output_tokens for a generation call
+
+    Args:
+        component_counts: {component_type: instances per variation}
+        variations: Number of variations requested in the call
+
+    Returns:
+        Token budget, bounded by token_budget_min / token_budget_max
+    """
+    expanded: Dict[str, int] = {}
+    for comp_type, count in component_counts.items():
+        parts = FULL_EMAIL_COMPONENTS if comp_type == "full_email" else {comp_type: 1}
+        for part, per_instance in parts.items():
+            expanded[part] = expanded.get(part, 0) + count * per_instance
+    per_variation = sum(
+        count * (expected_chars(comp_type) / CHARS_PER_TOKEN + JSON_TOKENS_PER_COMPONENT)
+        for comp_type, count in expanded.items()
+    )
+    return _finalize(JSON_TOKENS_BASE + per_variation * max(1, variations))
+
+
+def budget_for_structure(structure: List[StructureComponent], variations: int = 1) -> int:
+    """Token budget for a generation prompt built from a structure"""
+    counts: Dict[str, int] = {}
+    for item in structure:
+        counts[item.component.value] = counts.get(item.component.value, 0) + item.count
+    return estimate_output_tokens(counts, variations)
+
+
+def budget_for_text(text: str) -> int:
+    """Token budget for rewriting a text of similar length (refine)"""
+    return _finalize(JSON_TOKENS_BASE + len(text) / CHARS_PER_TOKEN)
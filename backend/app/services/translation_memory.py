@@ -0,0 +1,114 @@
+"""
+In-process translation memory
+Caches translations by source text hash, target language and translation
+options (tone, content type) so repeated sentences across cells and campaigns
+skip the model
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_INLINE_WHITESPACE = re.compile(r"[ \t]+")
+
+
+class TranslationMemory:
+    """Bounded LRU of (source text, target language, options) -> translation with a TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        text: str,
+        target_language: str,
+        maintain_tone: bool = True,
+        content_type: str = "newsletter",
+    ) -> str:
+        """
+        Hash of normalized source text, target language and the options that change the translation
+
+        Only runs of spaces and tabs are collapsed: line and paragraph breaks
+        are part of the translation a hit returns. The source language is
+        left out on purpose: it is a hint ("auto" or a code) for the same
+        text, so keying on it would only split hits between the two forms.
+        """
+        lines = text.replace("\r\n", "\n").split("\n")
+        normalized = "\n".join(_INLINE_WHITESPACE.sub(" ", line).strip() for line in lines).strip()
+        options = f"{target_language.lower()}\x00{int(maintain_tone)}\x00{content_type}"
+        digest = hashlib.sha256(f"{options}\x00{normalized}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(
+        self,
+        text: str,
+        target_language: str,
+        maintain_tone: bool = True,
+        content_type: str = "newsletter",
+    ) -> Optional[str]:
+        """Return a cached translation or None"""
+        key = self.make_key(text, target_language, maintain_tone, content_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, translation = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return translation
+
+    def put(
+        self,
+        text: str,
+        target_language: str,
+        translation: str,
+        maintain_tone: bool = True,
+        content_type: str = "newsletter",
+    ) -> None:
+        """Store a translation, evicting the least recently used entries"""
+        key = self.make_key(text, target_language, maintain_tone, content_type)
+        self._entries[key] = (time.monotonic(), translation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_statistics(self) -> dict:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global instance (lazy loaded)
+_translation_memory = None
+
+
+def get_translation_memory() -> TranslationMemory:
+    """Get or create the global translation memory"""
+    global _translation_memory
+    if _translation_memory is None:
+        _translation_memory = TranslationMemory(
+            max_entries=settings.translation_memory_max_entries,
+            ttl_seconds=settings.translation_memory_ttl_seconds
+        )
+    return _translation_memory
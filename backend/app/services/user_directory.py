@@ -0,0 +1,182 @@
+"""
+User directory
+Resolves user ids to display names for audit fields (activity logs, project
+created/updated by) with batched lookups against the Clerk users API and a
+TTL cache, so serializing a list costs at most one remote call.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+CLERK_LOOKUP_TIMEOUT_MS = 3000
+
+# Given user ids, return {user_id: display name or None} for the users that exist
+UserLookup = Callable[[List[str]], Awaitable[Dict[str, Optional[str]]]]
+
+
+class UserDirectory:
+    """TTL cache of display names in front of a batched user lookup"""
+
+    def __init__(
+        self,
+        lookup: UserLookup,
+        ttl_seconds: float,
+        miss_ttl_seconds: float,
+        max_entries: int,
+        batch_size: int,
+    ):
+        self.lookup = lookup
+        self.ttl_seconds = ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds  # Unknown users and failed lookups
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._names: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, user_id: str) -> Optional[str]:
+        """Cached name without a remote call"""
+        entry = self._names.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def _store(self, user_id: str, name: Optional[str]) -> None:
+        ttl = self.ttl_seconds if name else self.miss_ttl_seconds
+        self._names[user_id] = (name, time.monotonic() + ttl)
+        self._names.move_to_end(user_id)
+        while len(self._names) > self.max_entries:
+            self._names.popitem(last=False)
+
+    async def _fetch(self, user_ids: List[str]) -> None:
+        self.lookups += 1
+        try:
+            found = await self.lookup(user_ids)
+        except Exception as e:
+            logger.warning(f"User lookup for {len(user_ids)} user(s) failed: {e}")
+            found = {}
+        finally:
+            for user_id in user_ids:
+                self._inflight.pop(user_id, None)
+        for user_id in user_ids:
+            self._store(user_id, found.get(user_id))
+
+    async def resolve_many(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """Names of the given users; ids that cannot be resolved are left out"""
+        now = time.monotonic()
+        wanted = {user_id for user_id in user_ids if user_id}
+        missing = [
+            user_id for user_id in wanted
+            if (user_id not in self._names or self._names[user_id][1] <= now) and user_id not in self._inflight
+        ]
+
+        self.misses += len(missing)
+        self.hits += len(wanted) - len(missing)
+
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            task = loop.create_task(self._fetch(batch))
+            for user_id in batch:
+                self._inflight[user_id] = task
+
+        pending = {self._inflight[user_id] for user_id in wanted if user_id in self._inflight}
+        if pending:
+            await asyncio.wait(pending)
+
+        names = {}
+        for user_id in wanted:
+            name = self.peek(user_id)
+            if name:
+                names[user_id] = name
+        return names
+
+    def prefetch(self, user_id: str) -> None:
+        """Resolve a user in the background if not cached"""
+        if self.peek(user_id) is None and user_id not in self._inflight:
+            asyncio.get_running_loop().create_task(self.resolve_many([user_id]))
+
+    async def apply_names(
+        self,
+        items: Sequence[BaseModel],
+        fields: Sequence[Tuple[str, str]],
+    ) -> Sequence[BaseModel]:
+        """
+        Overwrite name fields from the directory in one bulk lookup
+
+        Args:
+            items: Response models (not ORM objects, which would be marked dirty)
+            fields: (user id attribute, name attribute) pairs
+        """
+        user_ids = {getattr(item, id_field) for item in items for id_field, _ in fields}
+        names = await self.resolve_many(user_id for user_id in user_ids if user_id)
+        for item in items:
+            for id_field, name_field in fields:
+                name = names.get(getattr(item, id_field))
+                if name:
+                    setattr(item, name_field, name)
+        return items
+
+    def get_statistics(self) -> dict:
+        return {"cached": len(self._names), "lookups": self.lookups, "hits": self.hits, "misses": self.misses}
+
+
+def display_name(user) -> Optional[str]:
+    """Full name, else username, else primary email of a Clerk user"""
+    full_name = " ".join(part for part in (user.first_name, user.last_name) if part)
+    if full_name:
+        return full_name
+    if user.username:
+        return user.username
+    for email in user.email_addresses or []:
+        if email.id == user.primary_email_address_id:
+            return email.email_address
+    return None
+
+
+@traced("clerk.list_users")
+async def clerk_user_lookup(user_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Batched lookup against the Clerk users API"""
+    from app.core.auth import get_clerk_client_async
+
+    clerk_client = await get_clerk_client_async()
+    if clerk_client is None:
+        return {}
+    users = await clerk_client.users.list_async(
+        user_id=user_ids, limit=len(user_ids), timeout_ms=CLERK_LOOKUP_TIMEOUT_MS
+    )
+    return {user.id: display_name(user) for user in users or []}
+
+
+async def local_user_lookup(user_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Stand-in for development without Clerk"""
+    return {user_id: "Dev User" for user_id in user_ids if user_id == "dev-user-123"}
+
+
+# Global instance (lazy loaded)
+_user_directory: Optional[UserDirectory] = None
+
+
+def get_user_directory() -> UserDirectory:
+    """Get or create the global user directory"""
+    global _user_directory
+    if _user_directory is None:
+        _user_directory = UserDirectory(
+            lookup=clerk_user_lookup if settings.clerk_secret_key else local_user_lookup,
+            ttl_seconds=settings.user_directory_ttl_seconds,
+            miss_ttl_seconds=settings.user_directory_miss_ttl_seconds,
+            max_entries=settings.user_directory_max_entries,
+            batch_size=settings.user_directory_batch_size,
+        )
+    return _user_directory
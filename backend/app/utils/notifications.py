@@ -7,6 +7,7 @@ import logging
 from datetime import datetime
 from typing import Optional
 from app.core.config import settings
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -77,12 +78,13 @@ async def send_slack_notification(
         
         payload = {"blocks": blocks}
         
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(
-                settings.slack_webhook_url,
-                json=payload
-            )
-            response.raise_for_status()
+        with tracer.span("slack.notify", event_type=event_type):
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.post(
+                    settings.slack_webhook_url,
+                    json=payload
+                )
+                response.raise_for_status()
             
         logger.info(f"Slack notification sent: {message}")
         return True
@@ -0,0 +1,128 @@
+"""
+Placeholder protection for translations
+Masks handlebars, URLs, prices, SKUs and brand names with stable tokens
+so the model cannot mangle them, and verifies they survive the round trip
+"""
+import re
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Order matters: earlier patterns win when spans overlap
+# (a URL containing digits must be masked as a whole, not as numbers)
+PROTECTED_PATTERNS = [
+    ("handlebars", r"\{\{\{?[^{}]+\}?\}\}"),
+    ("html_tag", r"</?[a-zA-Z][^<>]*>"),
+    ("url", r"(?:https?://|www\.)[^\s\"'<>]+[^\s\"'<>.,;:!?)]"),
+    ("email", r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    ("price", r"(?:[€$£¥]\s?\d[\d.,]*\d|[€$£¥]\s?\d|\d[\d.,]*\s?(?:€|\$|£|EUR|USD|GBP)(?![A-Za-z]))"),
+    ("percent", r"-?\d+(?:[.,]\d+)?\s?%"),
+    ("sku", r"\b(?=[A-Z0-9-]*\d)(?=[A-Z0-9-]*[A-Z])[A-Z0-9]{2,}(?:-[A-Z0-9]+)*\b"),
+    ("number", r"\b\d+(?:[.,]\d+)*\b"),
+]
+
+TOKEN_TEMPLATE = "[[PH{index}]]"
+TOKEN_PATTERN = re.compile(r"\[\[PH\d+\]\]")
+
+_COMPILED_PATTERNS = [(name, re.compile(pattern)) for name, pattern in PROTECTED_PATTERNS]
+
+
+def get_protected_terms() -> List[str]:
+    """Parse brand names / protected terms from comma-separated settings"""
+    if not settings.translation_protected_terms:
+        return []
+    return [term.strip() for term in settings.translation_protected_terms.split(",") if term.strip()]
+
+
+@dataclass
+class MaskedText:
+    """Text with protected spans replaced by stable placeholder tokens"""
+    original: str
+    text: str
+    placeholders: Dict[str, str] = field(default_factory=dict)  # token -> original span
+
+    @property
+    def tokens(self) -> List[str]:
+        return list(self.placeholders.keys())
+
+    @property
+    def is_non_linguistic(self) -> bool:
+        """True when nothing is left to translate once protected spans are removed"""
+        remainder = TOKEN_PATTERN.sub("", self.text)
+        return not any(ch.isalpha() for ch in remainder)
+
+    def verify(self, translated: str) -> bool:
+        """
+        Check that every placeholder survived translation exactly as often as in the source
+        and that the model did not invent new ones
+        """
+        return Counter(TOKEN_PATTERN.findall(translated)) == Counter(TOKEN_PATTERN.findall(self.text))
+
+    def unmask(self, translated: str) -> str:
+        """Restore the original spans in a translated string"""
+        return TOKEN_PATTERN.sub(
+            lambda match: self.placeholders.get(match.group(0), match.group(0)),
+            translated
+        )
+
+
+def mask_protected_spans(text: str, extra_terms: Optional[List[str]] = None) -> MaskedText:
+    """
+    Replace protected spans with stable tokens
+
+    The same span always maps to the same token, so repeated URLs or prices
+    collapse to a single placeholder.
+
+    Args:
+        text: Source text
+        extra_terms: Additional literal terms (brand names) to protect
+
+    Returns:
+        MaskedText with the masked text and the token -> span mapping
+    """
+    terms = get_protected_terms() + list(extra_terms or [])
+    patterns = list(_COMPILED_PATTERNS)
+    if terms:
+        # Longest first so "Luisa Via Roma" wins over "Luisa"
+        escaped = "|".join(re.escape(t) for t in sorted(set(terms), key=len, reverse=True))
+        patterns.insert(0, ("term", re.compile(rf"(?<!\w)(?:{escaped})(?!\w)")))
+
+    # Collect non-overlapping spans, earlier patterns take precedence
+    spans: List[tuple] = []
+    for _, pattern in patterns:
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if start == end:
+                continue
+            if any(start < s_end and end > s_start for s_start, s_end in spans):
+                continue
+            spans.append((start, end))
+    spans.sort()
+
+    if not spans:
+        return MaskedText(original=text, text=text)
+
+    token_by_span: Dict[str, str] = {}
+    parts = []
+    cursor = 0
+    for start, end in spans:
+        span_text = text[start:end]
+        token = token_by_span.get(span_text)
+        if token is None:
+            token = TOKEN_TEMPLATE.format(index=len(token_by_span))
+            token_by_span[span_text] = token
+        parts.append(text[cursor:start])
+        parts.append(token)
+        cursor = end
+    parts.append(text[cursor:])
+
+    return MaskedText(
+        original=text,
+        text="".join(parts),
+        placeholders={token: span for span, token in token_by_span.items()}
+    )
@@ -0,0 +1,42 @@
+"""
+Text segmentation for translation
+Splits long body copy into paragraphs and sentences that can be translated
+in parallel and reassembled in order with the original separators
+"""
+import re
+from typing import List
+
+# Paragraph breaks first, then whitespace following sentence-ending punctuation
+# (optionally followed by a closing quote or parenthesis)
+SEGMENT_SEPARATOR = re.compile(
+    r"(\s*\n\s*\n\s*|(?:(?<=[.!?…])|(?<=[.!?…][\"”’)]))\s+)"
+)
+
+
+def split_segments(text: str) -> List[str]:
+    """
+    Split text into alternating [segment, separator, segment, ...] parts
+
+    Even indexes are translatable segments, odd indexes are the separators
+    that followed them, so ''.join(parts) == text.
+    """
+    return SEGMENT_SEPARATOR.split(text)
+
+
+def translatable_indexes(parts: List[str]) -> List[int]:
+    """Indexes of the parts that contain actual content to translate"""
+    return [i for i in range(0, len(parts), 2) if parts[i].strip()]
+
+
+def join_segments(parts: List[str], translations: dict) -> str:
+    """
+    Reassemble translated segments in source order
+
+    Args:
+        parts: Output of split_segments
+        translations: {part_index: translated_text} for translated parts
+
+    Returns:
+        The reassembled text with original separators preserved
+    """
+    return "".join(translations.get(i, part) for i, part in enumerate(parts))
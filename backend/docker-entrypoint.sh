@@ -3,9 +3,14 @@
 # Exit immediately if a command exits with a non-zero status.
 set -e
 
-# Run alembic migrations
-echo "Running database migrations..."
-alembic upgrade head
+# Run alembic migrations, unless the schema is already at head
+# (skips loading the migration environment on every cold start)
+if python -m app.db.migration_check; then
+    echo "Database schema is up to date, skipping migrations."
+else
+    echo "Running database migrations..."
+    alembic upgrade head
+fi
 
 # Then exec the container's main process (what's set as CMD in the Dockerfile).
 exec "$@"
@@ -0,0 +1,71 @@
+"""add generation runs
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'generation_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(length=255), nullable=True),
+        sa.Column('prompt_fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=True),
+        sa.Column('parameters', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_generation_runs_id'), 'generation_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_generation_runs_project_id'), 'generation_runs', ['project_id'], unique=False)
+    op.create_index(op.f('ix_generation_runs_prompt_fingerprint'), 'generation_runs', ['prompt_fingerprint'], unique=False)
+
+    op.create_table(
+        'generated_texts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_hash')
+    )
+    op.create_index(op.f('ix_generated_texts_id'), 'generated_texts', ['id'], unique=False)
+
+    op.create_table(
+        'generation_run_texts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('variation_index', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('component_key', sa.String(length=100), nullable=False),
+        sa.Column('text_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['run_id'], ['generation_runs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['text_id'], ['generated_texts.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_generation_run_texts_id'), 'generation_run_texts', ['id'], unique=False)
+    op.create_index(op.f('ix_generation_run_texts_run_id'), 'generation_run_texts', ['run_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_generation_run_texts_run_id'), table_name='generation_run_texts')
+    op.drop_index(op.f('ix_generation_run_texts_id'), table_name='generation_run_texts')
+    op.drop_table('generation_run_texts')
+    op.drop_index(op.f('ix_generated_texts_id'), table_name='generated_texts')
+    op.drop_table('generated_texts')
+    op.drop_index(op.f('ix_generation_runs_prompt_fingerprint'), table_name='generation_runs')
+    op.drop_index(op.f('ix_generation_runs_project_id'), table_name='generation_runs')
+    op.drop_index(op.f('ix_generation_runs_id'), table_name='generation_runs')
+    op.drop_table('generation_runs')
@@ -0,0 +1,29 @@
+"""add rate limit buckets
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Auth Overhead Microbenchmark
+Per-request cost of get_current_user's token verification:
+  - first sight of a token (local RS256 signature check against the cached JWKS)
+  - repeated token (memoized claims)
+Clerk's authenticate_request, which this replaces, also fetched the JWKS over
+the network on every call; that cost is not reproduced here.
+
+Run from backend/: python scripts/benchmark_auth.py --tokens 1000 --repeats 10
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.token_verifier import JWKSCache, TokenVerifier, VerifiedTokenCache  # noqa: E402
+
+
+def build_verifier(private_key) -> TokenVerifier:
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid="bench", alg="RS256")
+
+    async def fetch():
+        return {"keys": [jwk]}
+
+    return TokenVerifier(JWKSCache(fetch, refresh_seconds=3600), VerifiedTokenCache(100_000))
+
+
+async def run(tokens: int, repeats: int) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    verifier = build_verifier(private_key)
+    expiry = int(time.time()) + 3600
+    issued = [
+        jwt.encode({"sub": f"user_{i}", "exp": expiry}, private_key, algorithm="RS256", headers={"kid": "bench"})
+        for i in range(tokens)
+    ]
+    await verifier.jwks.refresh()
+
+    first, repeated = [], []
+    for token in issued:
+        started = time.perf_counter()
+        await verifier.verify(token)
+        first.append(time.perf_counter() - started)
+    for _ in range(repeats):
+        for token in issued:
+            started = time.perf_counter()
+            await verifier.verify(token)
+            repeated.append(time.perf_counter() - started)
+
+    for name, samples in (("first verification", first), ("memoized", repeated)):
+        samples.sort()
+        print(
+            f"{name:<20} p50 {statistics.median(samples) * 1e6:8.1f}us  "
+            f"p99 {samples[int(len(samples) * 0.99)] * 1e6:8.1f}us  ({len(samples)} calls)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request auth overhead")
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.tokens, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
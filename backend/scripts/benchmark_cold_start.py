@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+Measures, over several fresh processes:
+  - import time of app.main
+  - time from process start to the first successful /health
+  - time from process start to the first authenticated request
+
+Run from backend/: python scripts/benchmark_cold_start.py --runs 5 --token <jwt>
+(without Clerk configured, development mode accepts any bearer token)
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _wait_for_health(client: httpx.Client, url: str, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not respond within {timeout}s")
+
+
+def measure_server(port: int, token: str, auth_path: str, timeout: float) -> Dict[str, float]:
+    """Start uvicorn and time the first /health and the first authenticated request"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        with httpx.Client(timeout=timeout) as client:
+            health = _wait_for_health(client, f"{base}/health", started, timeout)
+            response = client.get(f"{base}{auth_path}", headers={"Authorization": f"Bearer {token}"})
+            authenticated = time.perf_counter() - started
+        if response.status_code >= 400:
+            print(f"warning: {auth_path} returned {response.status_code}", file=sys.stderr)
+        return {"first_health": health, "first_authenticated": authenticated}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(name: str, samples: List[float]) -> str:
+    return (
+        f"{name:<22} median {statistics.median(samples):6.3f}s  "
+        f"min {min(samples):6.3f}s  max {max(samples):6.3f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", default=os.getenv("BENCHMARK_TOKEN", "dev-token"))
+    parser.add_argument("--auth-path", default="/api/v1/projects")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    args = parser.parse_args()
+
+    results: Dict[str, List[float]] = {"import app.main": []}
+    for _ in range(args.runs):
+        results["import app.main"].append(measure_import())
+        if not args.skip_server:
+            for name, seconds in measure_server(args.port, args.token, args.auth_path, args.timeout).items():
+                results.setdefault(name, []).append(seconds)
+
+    print(f"Cold start over {args.runs} run(s):")
+    for name, samples in results.items():
+        print(summarize(name, samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Tests for admission control
+Run with: pytest tests/
+"""
+import asyncio
+
+from app.core import admission
+from app.core.admission import INTERACTIVE, LOW, NORMAL, AdmissionController, priority_for
+
+
+def _controller(monkeypatch, db_usage=0.0, **overrides):
+    options = dict(
+        max_model_calls=10,
+        max_db_pool_usage=0.9,
+        max_loop_lag_seconds=0.25,
+        critical_factor=1.5,
+        queue_seconds=0.3,
+        max_queued=5,
+        retry_after_seconds=5,
+    )
+    options.update(overrides)
+    monkeypatch.setattr(AdmissionController, "db_pool_usage", staticmethod(lambda: db_usage))
+    return AdmissionController(**options)
+
+
+def test_priorities():
+    assert priority_for("POST", "/api/v1/translate/batch") == LOW
+    assert priority_for("POST", "/api/v1/projects/12/translate") == LOW
+    assert priority_for("POST", "/api/v1/generate") == NORMAL
+    assert priority_for("POST", "/api/v1/generate/component") == INTERACTIVE
+    assert priority_for("POST", "/api/v1/refine") == INTERACTIVE
+    assert priority_for("GET", "/api/v1/projects/12") == INTERACTIVE
+
+
+def test_batch_work_is_shed_first_and_interactive_never(monkeypatch):
+    controller = _controller(monkeypatch, queue_seconds=0)
+    controller.model_calls = 10  # At threshold
+
+    async def decide():
+        return [await controller.admit(priority) for priority in (LOW, NORMAL, INTERACTIVE)]
+
+    assert asyncio.run(decide()) == ["model_calls", None, None]
+
+    controller.model_calls = 15  # Critical
+    assert asyncio.run(decide()) == ["model_calls", "model_calls", None]
+    assert controller.snapshot()["shed_reasons"] == {"model_calls": 3}
+
+
+def test_queued_request_is_admitted_when_load_drops(monkeypatch):
+    controller = _controller(monkeypatch, db_usage=0.95)
+
+    async def scenario():
+        waiting = asyncio.ensure_future(controller.admit(LOW))
+        await asyncio.sleep(0.15)
+        assert controller.queued == 1
+        monkeypatch.setattr(AdmissionController, "db_pool_usage", staticmethod(lambda: 0.1))
+        return await waiting
+
+    assert asyncio.run(scenario()) is None
+    assert controller.snapshot()["requests"] == {"low_queued": 1}
+
+
+def test_middleware_returns_503_with_retry_after(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    controller = _controller(monkeypatch, queue_seconds=0)
+    controller.loop_lag_seconds = 1.0
+    monkeypatch.setattr(admission, "admission_controller", controller)
+
+    api = FastAPI()
+    api.add_middleware(admission.AdmissionMiddleware)
+
+    @api.post("/api/v1/translate/batch")
+    async def batch():
+        return {"ok": True}
+
+    @api.post("/api/v1/refine")
+    async def refine():
+        return {"ok": True}
+
+    client = TestClient(api)
+    response = client.post("/api/v1/translate/batch")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert client.post("/api/v1/refine").status_code == 200
@@ -55,6 +55,16 @@ def test_generate_variations_valid_input():
     assert response.status_code in [200, 500]
 
 
+def test_regenerate_component_validation():
+    """Test single-component regenerate endpoint validation"""
+    # Missing component type should fail
+    response = client.post(
+        "/api/v1/generate/component",
+        json={"text": "Spring sale", "count": 3}
+    )
+    assert response.status_code == 422
+
+
 def test_translate_validation():
     """Test translate endpoint validation"""
     response = client.post(
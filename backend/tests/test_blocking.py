@@ -0,0 +1,59 @@
+"""
+Tests for the event-loop blocking detector
+Run with: pytest tests/
+"""
+import asyncio
+import time
+import traceback
+
+from app.core.blocking import APP_ROOT, BlockingDetector, call_site
+
+
+def _frame(filename, lineno, name):
+    return traceback.FrameSummary(filename, lineno, name, lookup_line=False)
+
+
+def test_call_site_is_the_innermost_app_frame():
+    stack = [
+        _frame("/usr/lib/python3.11/asyncio/events.py", 80, "_run"),
+        _frame(APP_ROOT + "api/upload.py", 105, "upload_image"),
+        _frame("/usr/lib/python3.11/site-packages/google/cloud/storage/blob.py", 2900, "upload_from_string"),
+        _frame("/usr/lib/python3.11/ssl.py", 1100, "read"),
+    ]
+    site, blocked_in = call_site(stack)
+    assert site == "app/api/upload.py:105 upload_image"
+    assert blocked_in == "/usr/lib/python3.11/ssl.py:1100 read"
+
+
+def test_sync_call_in_a_coroutine_is_reported():
+    detector = BlockingDetector(threshold_seconds=0.05, log_interval_seconds=0)
+
+    def sync_sdk_call():
+        time.sleep(0.3)
+
+    async def scenario():
+        monitor = asyncio.ensure_future(detector.run())
+        await asyncio.sleep(0.05)
+        sync_sdk_call()
+        await asyncio.sleep(0.05)
+        monitor.cancel()
+
+    asyncio.run(scenario())
+    site = detector.sites()[0]
+    assert "sync_sdk_call" in site["site"]
+    assert site["count"] == 1
+    assert 0.2 <= site["max_seconds"] <= 0.4
+    assert detector.snapshot()["stalls"] == 1
+
+
+def test_non_blocking_loop_reports_nothing():
+    detector = BlockingDetector(threshold_seconds=0.05)
+
+    async def scenario():
+        monitor = asyncio.ensure_future(detector.run())
+        for _ in range(10):
+            await asyncio.sleep(0.02)
+        monitor.cancel()
+
+    asyncio.run(scenario())
+    assert detector.sites() == []
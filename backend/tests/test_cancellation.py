@@ -0,0 +1,100 @@
+"""
+Tests for cancelling in-flight work on disconnect or supersession
+Run with: pytest tests/
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.cancellation import cancellation_stats, run_cancellable, survive_disconnect, track_model_call
+
+
+class FakeRequest:
+    """Minimal stand-in exposing what run_cancellable uses"""
+
+    def __init__(self, disconnected: bool = False):
+        self.disconnected = disconnected
+        self.url = type("URL", (), {"path": "/test"})()
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+async def slow_model_work(cancelled: list):
+    try:
+        with track_model_call(max_tokens=1000):
+            await asyncio.sleep(5)
+    except asyncio.CancelledError:
+        cancelled.append(True)
+        raise
+
+
+def test_disconnect_cancels_work_and_counts_savings():
+    cancelled = []
+    before = cancellation_stats.snapshot()
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run_cancellable(FakeRequest(disconnected=True), slow_model_work(cancelled)))
+
+    after = cancellation_stats.snapshot()
+    assert exc.value.status_code == 499
+    assert cancelled == [True]
+    assert after["model_calls_cancelled"] - before["model_calls_cancelled"] == 1
+    assert after["output_tokens_saved"] - before["output_tokens_saved"] == 1000
+
+
+def test_newer_request_supersedes_older_one():
+    async def scenario():
+        cancelled = []
+        older = asyncio.ensure_future(
+            run_cancellable(None, slow_model_work(cancelled), supersede_key="slot")
+        )
+        await asyncio.sleep(0.01)
+
+        async def quick():
+            return "new"
+
+        newer = await run_cancellable(None, quick(), supersede_key="slot")
+        with pytest.raises(HTTPException) as exc:
+            await older
+        return newer, exc.value.status_code, cancelled
+
+    assert asyncio.run(scenario()) == ("new", 409, [True])
+
+
+def test_work_marked_to_survive_disconnect_runs_to_completion():
+    async def quick_work():
+        await asyncio.sleep(0.6)  # Past the first disconnect poll
+        return "done"
+
+    async def scenario():
+        survive_disconnect()
+        return await run_cancellable(FakeRequest(disconnected=True), quick_work())
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_slot_keys_are_per_user_behind_a_shared_address(monkeypatch):
+    from app.api import generate
+    from app.core import rate_limit
+    from app.models.schemas import ComponentType, RegenerateComponentRequest
+
+    class Verifier:
+        async def verify(self, token):
+            return {"sub": token}
+
+    monkeypatch.setattr(rate_limit.settings, "clerk_secret_key", "sk_test")
+    monkeypatch.setattr(rate_limit, "get_token_verifier", lambda: Verifier())
+
+    def office_request(token):
+        request = FakeRequest()
+        request.client = type("Client", (), {"host": "10.0.0.1"})()
+        request.headers = {"authorization": f"Bearer {token}"}
+        return request
+
+    req = RegenerateComponentRequest(text="Brief", component=ComponentType.CTA, slot_key="section_1.cta_1")
+    alice = asyncio.run(generate.component_slot_key(request=office_request("alice"), req=req))
+    bob = asyncio.run(generate.component_slot_key(request=office_request("bob"), req=req))
+    assert alice == "component:user:alice:section_1.cta_1"
+    assert alice != bob
@@ -0,0 +1,116 @@
+"""
+Tests for end-to-end request deadlines
+Run with: pytest tests/
+"""
+import asyncio
+
+import pytest
+
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+
+
+def test_header_overrides_endpoint_default_and_is_capped():
+    assert deadline.deadline_from_header(None, "/api/v1/generate/component") == 20.0
+    assert deadline.deadline_from_header(None, "/api/v1/generate") == 60.0
+    assert deadline.deadline_from_header("5000", "/api/v1/generate") == 5.0
+    assert deadline.deadline_from_header("99999999", "/api/v1/generate") == deadline.settings.deadline_max_seconds
+
+
+def test_project_batch_endpoints_have_no_default_deadline():
+    assert deadline.deadline_from_header(None, "/api/v1/projects/12/translate") is None
+    assert deadline.deadline_from_header(None, "/api/v1/projects/12/generate") is None
+    assert deadline.deadline_from_header("5000", "/api/v1/projects/12/translate") == 5.0
+    assert deadline.deadline_from_header(None, "/api/v1/projects/12") == deadline.settings.deadline_default_seconds
+
+
+def test_non_positive_header_is_rejected():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    with pytest.raises(deadline.InvalidDeadline):
+        deadline.deadline_from_header("0", "/api/v1/generate")
+
+    api = FastAPI()
+    api.add_middleware(deadline.DeadlineMiddleware)
+
+    @api.get("/ping")
+    async def ping():
+        return {"remaining": deadline.remaining()}
+
+    client = TestClient(api)
+    assert client.get("/ping", headers={"X-Request-Timeout-Ms": "-5"}).status_code == 400
+    assert client.get("/ping", headers={"X-Request-Timeout-Ms": "2000"}).json()["remaining"] <= 2.0
+
+
+def test_writes_are_not_blocked_past_the_deadline():
+    token = deadline.set_deadline(-1)
+    try:
+        deadline.before_cursor_execute(None, None, "INSERT INTO translations VALUES (1)", (), None, False)
+        with pytest.raises(DeadlineExceeded):
+            deadline.before_cursor_execute(None, None, "SELECT 1", (), None, False)
+    finally:
+        deadline.reset_deadline(token)
+
+
+def test_no_deadline_means_unbounded():
+    assert deadline.remaining() is None
+    assert deadline.can_afford(10_000)
+    assert deadline.timeout_for(3.0) == 3.0
+
+
+def test_sleep_and_bounded_fail_fast_past_the_deadline():
+    async def scenario():
+        token = deadline.set_deadline(0.05)
+        try:
+            assert not deadline.can_afford(1.0)
+            with pytest.raises(DeadlineExceeded):
+                await deadline.sleep(1.0)
+            with pytest.raises(DeadlineExceeded):
+                await deadline.bounded(asyncio.sleep(1.0), what="slow call")
+            with pytest.raises(DeadlineExceeded):
+                deadline.check("database query")
+        finally:
+            deadline.reset_deadline(token)
+
+    asyncio.run(scenario())
+
+
+def test_handlers_pass_deadline_exceeded_through_as_504():
+    from app.api.generate import regenerate_component
+    from app.models.schemas import ComponentType, RegenerateComponentRequest
+
+    class SlowClient:
+        async def refine_text(self, **kwargs):
+            raise DeadlineExceeded("Request deadline exceeded during model call")
+
+    req = RegenerateComponentRequest(text="Spring sale", component=ComponentType.CTA)
+    with pytest.raises(DeadlineExceeded) as exc:
+        asyncio.run(regenerate_component(request=None, req=req, client=SlowClient()))
+    assert exc.value.status_code == 504
+
+
+def test_batch_translate_reports_cells_past_the_deadline_as_partial(monkeypatch):
+    from app.api import translate
+
+    async def fake_translate(text, **kwargs):
+        if text == "Slow":
+            raise DeadlineExceeded("Request deadline exceeded during model call")
+        return f"it:{text}", "en"
+
+    monkeypatch.setattr(translate, "translate_with_protection", fake_translate)
+    monkeypatch.setattr(translate, "notify_translation_completed", lambda **kwargs: asyncio.sleep(0))
+
+    def batch(*texts):
+        req = translate.BatchTranslateRequest(
+            texts=[{"key": f"cta_{i}", "content": text} for i, text in enumerate(texts)],
+            target_languages=["it"],
+        )
+        return asyncio.run(translate.batch_translate(request=None, req=req))
+
+    response = batch("Fast", "Slow")
+    assert response.partial
+    assert response.translations == {"cta_0": {"it": "it:Fast"}, "cta_1": {}}
+
+    with pytest.raises(DeadlineExceeded):
+        batch("Slow")
@@ -0,0 +1,80 @@
+"""
+Tests for the bounded executors
+Run with: pytest tests/
+"""
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app.core.executors import BoundedExecutor, ExecutorSaturated
+
+request_name = contextvars.ContextVar("request_name", default=None)
+
+
+def test_call_runs_in_a_named_thread_with_the_callers_context():
+    executor = BoundedExecutor("gcs", max_workers=2, max_queue=10, timeout_seconds=5)
+
+    def blocking_call(x):
+        return x * 2, threading.current_thread().name, request_name.get()
+
+    async def scenario():
+        request_name.set("upload")
+        return await executor.run(blocking_call, 21)
+
+    result, thread_name, context_value = asyncio.run(scenario())
+    assert result == 42
+    assert thread_name.startswith("gcs-io")
+    assert context_value == "upload"
+    assert executor.snapshot()["completed"] == 1
+
+
+def test_full_queue_rejects_instead_of_growing():
+    executor = BoundedExecutor("sheets", max_workers=1, max_queue=1, timeout_seconds=5)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert executor.snapshot()["active"] == 1 and executor.snapshot()["queued"] == 1
+        assert executor.saturation == 2.0
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(scenario())
+    assert executor.snapshot()["rejected"] == 1
+    assert executor.snapshot()["queued"] == 0
+
+
+def test_timeout_releases_the_caller_and_a_queued_slot():
+    executor = BoundedExecutor("clerk", max_workers=1, max_queue=5, timeout_seconds=0.05)
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+        with pytest.raises(TimeoutError):
+            await executor.run(time.sleep, 0.2)  # Queued behind the slow call, cancelled before it starts
+        with pytest.raises(TimeoutError):
+            await slow
+
+    asyncio.run(scenario())
+    assert executor.snapshot()["timeouts"] == 2
+    assert executor.snapshot()["queued"] == 0
+
+
+def test_writes_run_to_completion_past_the_timeout():
+    executor = BoundedExecutor("database", max_workers=1, max_queue=5, timeout_seconds=0.01)
+    committed = []
+
+    def slow_write():
+        time.sleep(0.1)
+        committed.append(True)
+        return "ok"
+
+    assert asyncio.run(executor.run_to_completion(slow_write)) == "ok"
+    assert committed == [True]
+    assert executor.snapshot()["timeouts"] == 0
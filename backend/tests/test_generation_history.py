@@ -0,0 +1,26 @@
+"""
+Tests for generation history helpers
+Run with: pytest tests/
+"""
+from app.db.models import GeneratedText, GenerationRun, GenerationRunText
+from app.services.generation_history import GenerationHistoryService, prompt_fingerprint
+
+
+def test_prompt_fingerprint_is_order_independent():
+    a = prompt_fingerprint(text="Brief", tone="casual", structure=[{"component": "cta", "count": 1}])
+    b = prompt_fingerprint(structure=[{"component": "cta", "count": 1}], tone="casual", text="Brief")
+    assert a == b
+    assert a != prompt_fingerprint(text="Brief", tone="formal", structure=[{"component": "cta", "count": 1}])
+
+
+def test_assemble_variations_restores_order_and_shares_texts():
+    shared = GeneratedText(content_hash="h1", content="SHOP NOW")
+    run = GenerationRun(variations=[
+        GenerationRunText(variation_index=1, position=0, component_key="cta", text=shared),
+        GenerationRunText(variation_index=0, position=0, component_key="subject", text=GeneratedText(content="Hi")),
+        GenerationRunText(variation_index=0, position=1, component_key="cta", text=shared),
+    ])
+    assert GenerationHistoryService.assemble_variations(run) == [
+        {"subject": "Hi", "cta": "SHOP NOW"},
+        {"cta": "SHOP NOW"},
+    ]
@@ -0,0 +1,99 @@
+"""
+Tests for single-call vs fan-out generation strategy
+Run with: pytest tests/
+"""
+import asyncio
+import json
+
+from app.core.vertex_ai import GenerationStats
+from app.services.generation_strategy import split_counts, choose_call_count, dedup_variations, generate_fan_out
+
+
+class FakeClient:
+    """Returns the same variation from every call, like a deterministic model"""
+
+    def __init__(self):
+        self.downloads = 0
+        self.calls = []
+
+    async def load_image_parts(self, image_url):
+        self.downloads += 1
+        return ["image-part"]
+
+    async def generate_with_fixing(self, prompt, expected_variations, **kwargs):
+        self.calls.append((prompt, kwargs))
+        return json.dumps({"variations": [{"subject": "Spring sale"}] * expected_variations})
+
+
+def test_split_counts_is_even_and_bounded():
+    assert split_counts(5, 3) == [2, 2, 1]
+    assert split_counts(2, 5) == [1, 1]
+    assert split_counts(1, 1) == [1]
+
+
+def test_choose_call_count_respects_explicit_strategy():
+    assert choose_call_count("single", 5, 10, "model-x") == 1
+    assert choose_call_count("fan_out", 1, 10, "model-x") == 1
+    assert choose_call_count("fan_out", 5, 1, "model-x") > 1
+
+
+def test_auto_fans_out_only_for_large_outputs():
+    assert choose_call_count("auto", 2, 2, "model-without-history") == 1
+    assert choose_call_count("auto", 5, 6, "model-without-history") > 1
+
+
+def test_dedup_drops_exact_and_near_duplicates():
+    variations = [
+        {"subject": "Spring sale starts now", "cta": "SHOP NOW"},
+        {"subject": "Spring sale starts now!", "cta": "SHOP NOW"},
+        {"subject": "New arrivals are here", "cta": "DISCOVER"},
+    ]
+    assert dedup_variations(variations) == [variations[0], variations[2]]
+
+
+def test_fan_out_downloads_the_image_once_and_tops_up_without_repeats():
+    client = FakeClient()
+    variations = asyncio.run(generate_fan_out(
+        client,
+        prompt_builder=lambda n: f"Write {n} variations",
+        count=3,
+        calls=3,
+        temperature=0.7,
+        token_budget=lambda n: 512,
+        image_url="https://example.com/hero.png",
+        model="model-x",
+        validation=None,
+        stats=GenerationStats(),
+    ))
+
+    assert client.downloads == 1
+    assert all(kwargs["image_parts"] == ["image-part"] for _, kwargs in client.calls)
+    top_up_prompt, top_up_kwargs = client.calls[-1]
+    assert top_up_prompt.startswith("Write 2 variations")
+    assert "Spring sale" in top_up_prompt  # Told what was already written
+    assert "seed" not in top_up_kwargs
+    assert variations == [{"subject": "Spring sale"}]
+
+
+def test_fan_out_skips_cancelled_calls():
+    class PartlyCancelledClient(FakeClient):
+        async def generate_with_fixing(self, prompt, expected_variations, **kwargs):
+            if kwargs.get("seed") is not None and len(self.calls) == 0:
+                self.calls.append((prompt, kwargs))
+                raise asyncio.CancelledError()
+            self.calls.append((prompt, kwargs))
+            return json.dumps({"variations": [{"subject": f"Variation {len(self.calls)}"}]})
+
+    variations = asyncio.run(generate_fan_out(
+        PartlyCancelledClient(),
+        prompt_builder=lambda n: f"Write {n} variations",
+        count=2,
+        calls=2,
+        temperature=0.7,
+        token_budget=lambda n: 512,
+        image_url=None,
+        model="model-x",
+        validation=None,
+        stats=GenerationStats(),
+    ))
+    assert len(variations) == 2  # The cancelled call is topped up, not parsed as a payload
@@ -0,0 +1,61 @@
+"""
+Tests for the local post-generation validation pipeline
+Run with: pytest tests/
+"""
+from app.services.generation_validation import ValidationContext, ValidationIssue, ValidationPipeline
+
+
+def make_pipeline(**overrides) -> ValidationPipeline:
+    context = ValidationContext(
+        required_keys=["subject", "cta_1", "cta_2"],
+        brief="Spring sale",
+        char_limits={"subject": 20, "cta": 30},
+        banned_phrases=["click here"],
+    )
+    for key, value in overrides.items():
+        setattr(context, key, value)
+    return ValidationPipeline(context)
+
+
+def test_valid_variations_pass_and_ctas_are_uppercased():
+    """Clean output produces no issues; CTA casing is fixed locally"""
+    variations = [{"subject": "Spring is here", "cta_1": "shop now", "cta_2": "discover more"}]
+    assert make_pipeline().run(variations) == []
+    assert variations[0]["cta_1"] == "SHOP NOW"
+
+
+def test_only_failing_components_are_reported():
+    """Each failing (variation, key) pair is reported once"""
+    variations = [
+        {"subject": "A subject that is far too long", "cta_1": "SHOP NOW", "cta_2": "SHOP NOW!"},
+        {"subject": "Short", "cta_1": "Click here to buy", "cta_2": ""},
+    ]
+    issues = {(i.variation_index, i.key) for i in make_pipeline().run(variations)}
+    assert issues == {(0, "subject"), (0, "cta_2"), (1, "cta_1"), (1, "cta_2")}
+
+
+def test_apply_repairs_ignores_malformed_entries():
+    """Repairs are applied in place; malformed ones are skipped"""
+    variations = [{"subject": "Old"}]
+    applied = ValidationPipeline.apply_repairs(
+        variations,
+        [{"variation": 0, "key": "subject", "text": "New"}, {"variation": 5, "key": "subject", "text": "x"}, {"key": "y"}],
+        [ValidationIssue(0, "subject", "too long")],
+    )
+    assert applied == 1
+    assert variations[0]["subject"] == "New"
+
+
+def test_apply_repairs_only_touches_failing_components():
+    variations = [{"subject": "Old", "cta_1": "SHOP NOW"}]
+    applied = ValidationPipeline.apply_repairs(
+        variations,
+        [
+            {"variation": 0, "key": "subject", "text": "New"},
+            {"variation": 0, "key": "cta_1", "text": "BUY"},  # Valid already
+            {"variation": 0, "key": "extra", "text": "Invented"},
+        ],
+        [ValidationIssue(0, "subject", "too long")],
+    )
+    assert applied == 1
+    assert variations == [{"subject": "New", "cta_1": "SHOP NOW"}]
@@ -0,0 +1,52 @@
+"""
+Tests for hedged model calls
+Run with: pytest tests/
+"""
+import asyncio
+
+from app.core.hedging import HedgeBudget, hedged_call, hedge_budget
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_fast_primary_is_not_hedged():
+    async def primary():
+        return "primary"
+
+    async def backup():
+        raise AssertionError("backup should not be started")
+
+    assert run(hedged_call(primary, backup, delay=0.5)) == ("primary", False)
+
+
+def test_slow_primary_loses_to_backup_and_is_cancelled():
+    cancelled = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary"
+
+    async def backup():
+        return "backup"
+
+    for _ in range(50):
+        hedge_budget.record_call()  # Make room in the global budget
+    result = run(hedged_call(primary, backup, delay=0.01))
+    assert result == ("backup", True)
+    assert cancelled == [True]
+
+
+def test_budget_caps_hedge_share():
+    budget = HedgeBudget(ratio=0.1, window=100)
+    assert not budget.try_acquire()
+    for _ in range(20):
+        budget.record_call()
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
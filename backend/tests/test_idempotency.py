@@ -0,0 +1,108 @@
+"""
+Tests for Idempotency-Key handling
+Run with: pytest tests/
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.idempotency import IdempotencyStore, MemoryIdempotencyBackend
+
+
+def make_run(calls: list, delay: float = 0.0):
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"value": len(calls)}
+    return run
+
+
+def test_retry_replays_stored_response():
+    store = IdempotencyStore(MemoryIdempotencyBackend())
+    calls = []
+
+    async def scenario():
+        first = await store.execute("POST /x:u", "k1", "h", make_run(calls), lambda r: r)
+        replay = await store.execute("POST /x:u", "k1", "h", make_run(calls), lambda r: r)
+        return first, replay
+
+    first, replay = asyncio.run(scenario())
+    assert first == {"value": 1}
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.body == b'{"value":1}'
+    assert calls == [1]
+
+
+def test_concurrent_duplicates_wait_for_first_execution():
+    store = IdempotencyStore(MemoryIdempotencyBackend())
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(*[
+            store.execute("POST /x:u", "k2", "h", make_run(calls, delay=0.05), lambda r: r)
+            for _ in range(3)
+        ])
+
+    asyncio.run(scenario())
+    assert calls == [1]
+
+
+def test_key_reuse_with_different_request_is_rejected():
+    store = IdempotencyStore(MemoryIdempotencyBackend())
+
+    async def scenario():
+        await store.execute("POST /x:u", "k3", "h1", make_run([]), lambda r: r)
+        await store.execute("POST /x:u", "k3", "h2", make_run([]), lambda r: r)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 422
+
+
+def test_run_survives_caller_cancellation_and_duplicates_get_its_result():
+    store = IdempotencyStore(MemoryIdempotencyBackend())
+    calls = []
+
+    async def scenario():
+        first = asyncio.ensure_future(
+            store.execute("POST /x:u", "k4", "h", make_run(calls, delay=0.1), lambda r: r)
+        )
+        await asyncio.sleep(0.02)
+        first.cancel()  # Client went away mid-run
+        duplicate = await store.execute("POST /x:u", "k4", "h", make_run(calls), lambda r: r)
+        retry = await store.execute("POST /x:u", "k4", "h", make_run(calls), lambda r: r)
+        return duplicate, retry
+
+    duplicate, retry = asyncio.run(scenario())
+    assert calls == [1]
+    assert duplicate.body == retry.body == b'{"value":1}'
+
+
+def test_purge_expired():
+    backend = MemoryIdempotencyBackend()
+    backend.reserve("POST /x:u", "old", "h", ttl=-1)
+    backend.reserve("POST /x:u", "new", "h", ttl=60)
+    assert backend.purge_expired() == 1
+    assert backend.get("POST /x:u", "new") is not None
+
+
+def test_response_is_stored_even_past_the_request_deadline():
+    from app.core import deadline
+
+    store = IdempotencyStore(MemoryIdempotencyBackend())
+
+    async def slow_run():
+        await asyncio.sleep(0.1)  # Finishes after the deadline has passed
+        return {"value": 1}
+
+    async def scenario():
+        deadline.set_deadline(0.05)
+        first = await store.execute("POST /x:u", "k5", "h", slow_run, lambda r: r)
+        deadline.set_deadline(None)
+        replay = await store.execute("POST /x:u", "k5", "h", make_run([]), lambda r: r)
+        return first, replay
+
+    first, replay = asyncio.run(scenario())
+    assert first == {"value": 1}
+    assert replay.body == b'{"value":1}'
@@ -0,0 +1,80 @@
+"""
+Tests for the in-process metrics registry
+Run with: pytest tests/
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.core import metrics
+from app.core.metrics import Histogram, Registry, endpoint_label, instrument_methods
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("work_seconds", "Work", ("kind",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, kind="a")
+
+    text = registry.render()
+    assert "# TYPE work_seconds histogram" in text
+    assert 'work_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'work_seconds_bucket{kind="a",le="1"} 2' in text
+    assert 'work_seconds_bucket{kind="a",le="+Inf"} 3' in text
+    assert 'work_seconds_count{kind="a"} 3' in text
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = Registry()
+    registry.counter("things_total", "Things").inc()
+
+    def broken():
+        raise RuntimeError("no database")
+
+    registry.add_collector(broken)
+    assert "things_total 1" in registry.render()
+
+
+def test_endpoint_label_collapses_ids():
+    assert endpoint_label("/api/v1/projects/42/translate") == "/api/v1/projects/{id}/translate"
+    assert endpoint_label("/api/v1/projects/42") == "/api/v1/projects/{id}"
+
+
+def test_instrument_methods_times_public_staticmethods():
+    histogram = Histogram("service_seconds", "Service", ("method",))
+
+    @instrument_methods(histogram)
+    class Service:
+        @staticmethod
+        def load(value):
+            return value * 2
+
+    assert Service.load(3) == 6
+    assert histogram.count(method="load") == 1
+
+
+def test_model_calls_are_labelled_by_operation_and_attempt():
+    class Client:
+        @metrics.task_operation
+        async def generate(self, prompt, task="unit_test_generate"):
+            usage = SimpleNamespace(prompt_token_count=100, candidates_token_count=300)
+            for outcome in ("error", "ok"):
+                metrics.record_model_call("m", 0.2, outcome, SimpleNamespace(usage_metadata=usage))
+
+    asyncio.run(Client().generate("hi"))
+
+    labels = dict(endpoint="background", model="m", operation="unit_test_generate")
+    assert metrics.model_call_duration.count(**labels, attempt="1", outcome="error") == 1
+    assert metrics.model_call_duration.count(**labels, attempt="2", outcome="ok") == 1
+    assert metrics.model_tokens.count(**labels, kind="output") == 2
+
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/",status="200"}' in response.text
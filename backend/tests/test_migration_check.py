@@ -0,0 +1,25 @@
+"""
+Tests for the startup migration check
+Run with: pytest tests/
+"""
+from sqlalchemy import create_engine, text
+
+from app.db.migration_check import head_revisions, schema_is_current
+
+
+def test_single_migration_head():
+    assert len(head_revisions()) == 1
+
+
+def test_schema_is_current_only_at_head():
+    engine = create_engine("sqlite://")
+    assert not schema_is_current(engine)
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO alembic_version VALUES ('001')"))
+    assert not schema_is_current(engine)
+
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE alembic_version SET version_num = :head"), {"head": head_revisions().pop()})
+    assert schema_is_current(engine)
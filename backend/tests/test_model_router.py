@@ -0,0 +1,80 @@
+"""
+Tests for the latency-aware model router
+Run with: pytest tests/
+"""
+from app.core.config import settings
+from app.core.model_router import CircuitBreaker, ModelRouter, Route, FLASH, PRO
+
+
+def make_router() -> ModelRouter:
+    return ModelRouter(routes=[
+        Route(task="generate", tier=FLASH, max_components=2),
+        Route(task="generate", tier=PRO),
+        Route(task="*", tier=PRO),
+    ])
+
+
+def test_routing_table_uses_structure_size_and_overrides():
+    router = make_router()
+    assert router.select("generate", components=2) == settings.vertex_ai_model_flash
+    assert router.select("generate", components=6) == settings.vertex_ai_model
+    assert router.select("generate", components=2, use_flash=False) == settings.vertex_ai_model
+    assert router.select("anything", use_flash=True) == settings.vertex_ai_model_flash
+
+
+def test_falls_back_to_flash_when_pro_circuit_is_open():
+    router = make_router()
+    for _ in range(settings.circuit_breaker_failure_threshold):
+        router.breaker(settings.vertex_ai_model).record_failure()
+    assert router.select("generate", components=6) == settings.vertex_ai_model_flash
+
+
+def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow()  # Cooldown elapsed: one probe
+    assert breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_abandoned_probe_releases_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30.0)
+    breaker.record_failure()
+    breaker.opened_at -= 30.0
+    assert breaker.allow()
+    assert not breaker.allow()  # Probe in flight
+    breaker.release_probe()  # Probe cancelled / out of request time
+    assert breaker.allow()
+
+
+def test_fallback_recovers_once_slow_samples_age_out(monkeypatch):
+    from app.core import latency, model_router
+
+    tracker = latency.LatencyTracker(max_age_seconds=60.0)
+    monkeypatch.setattr(model_router, "latency_tracker", tracker)
+    router = make_router()
+    now = [1000.0]
+    monkeypatch.setattr(latency.time, "monotonic", lambda: now[0])
+
+    for _ in range(settings.router_min_samples):
+        tracker.record_error(settings.vertex_ai_model)
+    assert router.select("generate", components=6) == settings.vertex_ai_model_flash
+
+    now[0] += 61.0
+    assert router.select("generate", components=6) == settings.vertex_ai_model
+
+
+def test_default_routes_send_long_copy_to_pro():
+    router = ModelRouter()
+    flash, pro = settings.vertex_ai_model_flash, settings.vertex_ai_model
+    assert router.select("generate", components=2, component_types=["subject", "cta"]) == flash
+    assert router.select("generate", components=1, component_types=["body"]) == pro
+    assert router.select("generate", components=1, component_types=["full_email"]) == pro
+    assert router.select("generate", components=1) == pro  # Structure unknown (e.g. client._resolve_model)
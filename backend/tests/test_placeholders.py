@@ -0,0 +1,41 @@
+"""
+Tests for translation placeholder protection
+Run with: pytest tests/
+"""
+from app.utils.placeholders import mask_protected_spans
+
+
+def test_masks_handlebars_urls_and_prices():
+    """Protected spans are replaced with tokens and restored on unmask"""
+    text = "Hi {{first_name}}, shop at https://example.com/sale for €49.90 only"
+    masked = mask_protected_spans(text)
+
+    assert "{{first_name}}" not in masked.text
+    assert "https://example.com/sale" not in masked.text
+    assert "€49.90" not in masked.text
+    assert masked.unmask(masked.text) == text
+
+
+def test_repeated_spans_share_a_token():
+    """The same span always maps to the same stable token"""
+    masked = mask_protected_spans("Use code SS25-VIP now. Again: SS25-VIP")
+    assert len(masked.tokens) == 1
+    assert masked.text.count(masked.tokens[0]) == 2
+
+
+def test_verify_detects_dropped_or_invented_tokens():
+    """Verification fails when the model drops or adds placeholders"""
+    masked = mask_protected_spans("Ciao {{name}}, visit www.example.com")
+    first, second = masked.tokens
+
+    assert masked.verify(f"Hola {first}, visita {second}")
+    assert not masked.verify(f"Hola {first}, visita el sitio")
+    assert not masked.verify(f"Hola {first} {first}, visita {second}")
+    assert not masked.verify(f"Hola {first}, visita {second} [[PH9]]")
+
+
+def test_non_linguistic_text_is_detected():
+    """URLs, SKUs and numbers alone need no translation"""
+    assert mask_protected_spans("https://example.com/p/123").is_non_linguistic
+    assert mask_protected_spans("AB-1234 - 50%").is_non_linguistic
+    assert not mask_protected_spans("Save 50% today").is_non_linguistic
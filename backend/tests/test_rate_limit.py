@@ -0,0 +1,126 @@
+"""
+Tests for cost-weighted rate limiting
+Run with: pytest tests/
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.core.rate_limit as rate_limit
+from app.core.rate_limit import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    RateLimiter,
+    RateLimitHeadersMiddleware,
+    rate_limited,
+    take_tokens,
+)
+from app.db.models import RateLimitBucket
+
+
+def test_take_tokens_refills_up_to_capacity():
+    assert take_tokens(0.0, 100.0, 105.0, cost=5, capacity=10, refill_per_second=2) == (True, 5.0)
+    assert take_tokens(3.0, 100.0, 100.0, cost=5, capacity=10, refill_per_second=2) == (False, 3.0)
+    assert take_tokens(9.0, 0.0, 100.0, cost=1, capacity=10, refill_per_second=2) == (True, 9.0)
+
+
+def test_costly_requests_drain_the_bucket_faster():
+    limiter = RateLimiter(MemoryRateLimitBackend(), capacity=100, refill_per_second=0.001)
+
+    async def scenario():
+        batch = await limiter.check("user:a", 72)
+        second_batch = await limiter.check("user:a", 72)
+        single = await limiter.check("user:a", 1)
+        other_user = await limiter.check("user:b", 72)
+        return batch, second_batch, single, other_user
+
+    batch, second_batch, single, other_user = asyncio.run(scenario())
+    assert batch.allowed and int(batch.remaining) == 28
+    assert not second_batch.allowed
+    assert int(second_batch.headers()["Retry-After"]) > 0
+    assert single.allowed
+    assert other_user.allowed  # Buckets are per caller
+
+
+def test_oversized_request_is_charged_a_full_bucket():
+    limiter = RateLimiter(MemoryRateLimitBackend(), capacity=50, refill_per_second=1)
+    decision = asyncio.run(limiter.check("user:a", 500))
+    assert decision.allowed
+    assert decision.remaining < 1
+
+
+def test_database_backend(monkeypatch):
+    engine = create_engine("sqlite://")
+    RateLimitBucket.__table__.create(engine)
+    monkeypatch.setattr(rate_limit, "SessionLocal", sessionmaker(bind=engine))
+    backend = DatabaseRateLimitBackend()
+
+    assert backend.take("user:a", 8, capacity=10, refill_per_second=0.001) == (True, pytest.approx(2, abs=0.01))
+    allowed, _ = backend.take("user:a", 8, capacity=10, refill_per_second=0.001)
+    assert not allowed
+
+
+def test_decorator_sets_headers_and_rejects_with_429(monkeypatch):
+    limiter = RateLimiter(MemoryRateLimitBackend(), capacity=10, refill_per_second=0.001)
+    monkeypatch.setattr(rate_limit, "get_rate_limiter", lambda: limiter)
+
+    api = FastAPI()
+    api.add_middleware(RateLimitHeadersMiddleware)
+
+    @api.post("/cells/{count}")
+    @rate_limited(cost=lambda count, **_: count)
+    async def cells(count: int, request: Request):
+        return {"ok": True}
+
+    client = TestClient(api)
+    response = client.post("/cells/6")
+    assert response.status_code == 200
+    assert response.headers["RateLimit-Limit"] == "10"
+    assert response.headers["RateLimit-Remaining"] == "4"
+
+    response = client.post("/cells/6")
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_idempotent_replays_are_not_charged_again(monkeypatch):
+    from pydantic import BaseModel
+
+    import app.services.idempotency as idempotency
+
+    limiter = RateLimiter(MemoryRateLimitBackend(), capacity=10, refill_per_second=0.001)
+    store = idempotency.IdempotencyStore(idempotency.MemoryIdempotencyBackend())
+    monkeypatch.setattr(rate_limit, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(idempotency, "get_idempotency_store", lambda: store)
+
+    class Cells(BaseModel):
+        ok: bool
+
+    api = FastAPI()
+    api.add_middleware(RateLimitHeadersMiddleware)
+
+    @api.post("/cells/{count}")
+    @idempotency.idempotent(Cells)
+    @rate_limited(cost=lambda count, **_: count)
+    async def cells(count: int, request: Request):
+        return {"ok": True}
+
+    client = TestClient(api)
+    for _ in range(3):
+        assert client.post("/cells/6", headers={"Idempotency-Key": "k"}).status_code == 200
+    assert client.post("/cells/4").headers["RateLimit-Remaining"] == "0"  # Only the first run was charged
+
+
+def test_translate_is_charged_per_segment():
+    from app.api.translate import translate_cost
+    from app.core.config import settings
+    from app.models.schemas import TranslateRequest
+
+    assert translate_cost(TranslateRequest(text="Shop now", target_language="it")) == 1
+    body = " ".join(["This sentence is part of a long body copy paragraph."] * 40)
+    assert len(body) >= settings.translation_segment_min_chars
+    assert translate_cost(TranslateRequest(text=body, target_language="it")) == 40
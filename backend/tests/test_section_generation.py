@@ -0,0 +1,35 @@
+"""
+Tests for writing generated sections into a project
+Run with: pytest tests/
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import ActivityLog, Base, Component
+from app.services.project_service import ProjectService
+
+
+def test_generation_updates_components_saved_by_the_editor():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Component.__table__, ActivityLog.__table__])  # projects uses ARRAY
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        # Saved by the editor: section "default", subject indexed 1
+        Component(project_id=1, component_type="subject", component_index=1, generated_content="old"),
+        Component(project_id=1, component_type="body", component_index=1, generated_content="old"),
+    ])
+    db.commit()
+
+    ProjectService.upsert_generated_components(db, 1, "u", "User", [
+        {"section_key": "header", "section_order": 0, "component_type": "subject",
+         "component_index": 1, "generated_content": "new subject"},
+        {"section_key": "hero", "section_order": 1, "component_type": "body",
+         "component_index": 1, "generated_content": "new body"},
+        {"section_key": "hero", "section_order": 1, "component_type": "cta",
+         "component_index": 1, "generated_content": "GO"},
+    ])
+
+    components = {(c.component_type, c.component_index): c for c in db.query(Component).all()}
+    assert len(components) == 3
+    assert components[("subject", 1)].generated_content == "new subject"
+    assert components[("body", 1)].section_key == "hero"
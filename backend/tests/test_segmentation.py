@@ -0,0 +1,54 @@
+"""
+Tests for body copy segmentation and translation memory
+Run with: pytest tests/
+"""
+from app.utils.segmentation import split_segments, translatable_indexes, join_segments
+from app.services.translation_memory import TranslationMemory
+
+
+def test_split_and_join_roundtrip():
+    """Segments reassemble to the original text with separators preserved"""
+    text = "First sentence. Second one!\n\nNew paragraph? \"Quoted.\" End"
+    parts = split_segments(text)
+    indexes = translatable_indexes(parts)
+
+    assert [parts[i] for i in indexes] == [
+        "First sentence.", "Second one!", "New paragraph?", "\"Quoted.\"", "End"
+    ]
+    assert join_segments(parts, {}) == text
+
+
+def test_join_replaces_translated_segments_in_order():
+    """Translated segments are placed back at their source positions"""
+    parts = split_segments("Hello there. How are you?")
+    indexes = translatable_indexes(parts)
+    translated = join_segments(parts, dict(zip(indexes, ["Ciao.", "Come stai?"])))
+    assert translated == "Ciao. Come stai?"
+
+
+def test_translation_memory_normalizes_whitespace_and_evicts():
+    """Lookups ignore whitespace differences and the LRU stays bounded"""
+    memory = TranslationMemory(max_entries=2, ttl_seconds=60)
+    memory.put("Shop  now.", "it", "Acquista ora.")
+    assert memory.get("Shop now.", "IT") == "Acquista ora."
+
+    memory.put("One.", "it", "Uno.")
+    memory.put("Two.", "it", "Due.")
+    assert memory.get("Shop now.", "it") is None
+    assert memory.get_statistics()["hits"] == 1
+
+
+def test_translation_memory_keys_include_tone_and_content_type():
+    memory = TranslationMemory(max_entries=10, ttl_seconds=60)
+    memory.put("Shop now.", "it", "Acquista ora.", maintain_tone=True, content_type="newsletter")
+    assert memory.get("Shop now.", "it", maintain_tone=False, content_type="newsletter") is None
+    assert memory.get("Shop now.", "it", maintain_tone=True, content_type="promotional") is None
+    assert memory.get("Shop now.", "it", maintain_tone=True, content_type="newsletter") == "Acquista ora."
+
+
+def test_translation_memory_keeps_paragraph_breaks_in_the_key():
+    memory = TranslationMemory(max_entries=10, ttl_seconds=60)
+    memory.put("First.\n\nSecond.", "it", "Primo.\n\nSecondo.")
+    assert memory.get("First. Second.", "it") is None
+    assert memory.get("First.\nSecond.", "it") is None
+    assert memory.get("First.  \n\n\tSecond.", "it") == "Primo.\n\nSecondo."
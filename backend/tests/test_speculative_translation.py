@@ -0,0 +1,62 @@
+"""
+Tests for speculative background translation
+Run with: pytest tests/
+"""
+import asyncio
+
+from app.services.speculative_translation import SpeculativeTranslator
+
+
+def make_translator(delay: float) -> SpeculativeTranslator:
+    translator = SpeculativeTranslator(max_concurrency=10, ttl_seconds=60)
+
+    async def fake_translate(text, language, segmented):
+        await asyncio.sleep(delay)
+        return f"{language}:{text}"
+
+    translator._translate = fake_translate
+    return translator
+
+
+def test_claim_serves_result_and_cancels_unchosen_variations():
+    async def scenario():
+        translator = make_translator(delay=0.05)
+        variations = [{"subject": "Spring sale"}, {"subject": "New arrivals"}]
+        assert translator.schedule(variations, ["it", "fr"]) == 4
+        await asyncio.sleep(0)  # Let the jobs start
+
+        served = await translator.claim("Spring sale", "it")
+        await asyncio.sleep(0)
+        return served, translator.get_statistics()
+
+    served, stats = asyncio.run(scenario())
+    assert served == "it:Spring sale"
+    assert stats["served"] == 1
+    assert stats["cancelled"] == 2  # Both languages of the unchosen variation
+
+
+def test_unknown_text_is_not_served():
+    async def scenario():
+        translator = make_translator(delay=0)
+        translator.schedule([{"cta": "SHOP NOW"}], ["de"])
+        return await translator.claim("Something else", "de")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_claim_does_not_wait_for_queued_work():
+    async def scenario():
+        translator = make_translator(delay=0.2)
+        translator.max_concurrency = 1
+        translator.schedule([{"subject": "Spring sale", "cta": "Shop now"}], ["it"])
+        await asyncio.sleep(0.01)  # Subject is translating, CTA is queued behind it
+
+        started = asyncio.get_running_loop().time()
+        served = await translator.claim("Shop now", "it")
+        waited = asyncio.get_running_loop().time() - started
+        return served, waited, translator.get_statistics()
+
+    served, waited, stats = asyncio.run(scenario())
+    assert served is None  # The caller translates in the foreground
+    assert waited < 0.1
+    assert stats["cancelled"] == 1
@@ -0,0 +1,48 @@
+"""
+Tests for adaptive output token budgeting
+Run with: pytest tests/
+"""
+from app.core.config import settings
+from app.core.telemetry import ComponentLengthStats
+from app.models.schemas import ComponentType, StructureComponent
+from app.services.token_budget import budget_for_structure, budget_for_text, estimate_output_tokens
+
+
+def test_budget_grows_with_structure_and_variations():
+    small = [StructureComponent(component=ComponentType.SUBJECT, count=1)]
+    large = [
+        StructureComponent(component=ComponentType.SUBJECT, count=1),
+        StructureComponent(component=ComponentType.BODY, count=3),
+    ]
+    assert budget_for_structure(small, 1) <= budget_for_structure(large, 1)
+    assert budget_for_structure(large, 1) < budget_for_structure(large, 3)
+
+
+def test_budget_is_bounded():
+    assert estimate_output_tokens({"cta": 1}, 1) >= settings.token_budget_min
+    assert estimate_output_tokens({"body": 50}, 10) == settings.token_budget_max
+    assert budget_for_text("x" * 50000) == settings.token_budget_max
+
+
+def test_length_stats_percentile_needs_min_samples():
+    stats = ComponentLengthStats()
+    stats.record_variations([{"body_1": "a" * n} for n in range(1, 11)])
+    assert stats.percentile("body", 90, min_samples=20) is None
+    assert stats.percentile("body", 90) == 9
+
+
+def test_pro_gets_a_larger_reasoning_allowance():
+    from app.services.token_budget import for_model
+
+    budget = estimate_output_tokens({"subject": 1}, 1)
+    assert for_model(budget, settings.vertex_ai_model_flash) == budget
+    assert for_model(budget, settings.vertex_ai_model) == (
+        budget + settings.token_budget_reasoning_tokens_pro - settings.token_budget_reasoning_tokens
+    )
+
+
+def test_full_email_is_budgeted_as_its_components():
+    full_email = [StructureComponent(component=ComponentType.FULL_EMAIL, count=1)]
+    expanded = estimate_output_tokens({"subject": 1, "pre_header": 1, "title": 1, "body": 2, "cta": 2}, 2)
+    assert budget_for_structure(full_email, 2) == expanded
+    assert budget_for_structure(full_email, 2) > estimate_output_tokens({"unknown": 1}, 2)
@@ -0,0 +1,104 @@
+"""
+Tests for local Clerk JWT verification
+Run with: pytest tests/
+"""
+import asyncio
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from app.core.token_verifier import (
+    JWKSCache,
+    TokenVerificationError,
+    TokenVerifier,
+    VerifiedTokenCache,
+)
+
+
+def _keypair(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=kid, alg="RS256", use="sig")
+    return private_key, jwk
+
+
+PRIVATE_KEY, JWK = _keypair("key-1")
+
+
+def _token(private_key=PRIVATE_KEY, kid="key-1", **claims) -> str:
+    payload = {"sub": "user_1", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def _verifier(jwks_keys, cache_size=10):
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        return {"keys": list(jwks_keys)}
+
+    verifier = TokenVerifier(JWKSCache(fetch, refresh_seconds=3600), VerifiedTokenCache(cache_size))
+    return verifier, fetches
+
+
+def test_verifies_and_memoizes_tokens():
+    verifier, fetches = _verifier([JWK])
+    token = _token()
+
+    async def scenario():
+        first = await verifier.verify(token)
+        second = await verifier.verify(token)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["sub"] == second["sub"] == "user_1"
+    assert len(fetches) == 1  # JWKS fetched once, on the first unknown kid
+    assert verifier.cache.snapshot() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_rejects_expired_and_forged_tokens():
+    verifier, _ = _verifier([JWK])
+    other_key, _ = _keypair("key-1")
+
+    with pytest.raises(TokenVerificationError):
+        asyncio.run(verifier.verify(_token(exp=int(time.time()) - 60)))
+    with pytest.raises(TokenVerificationError):
+        asyncio.run(verifier.verify(_token(private_key=other_key)))
+    with pytest.raises(TokenVerificationError):
+        asyncio.run(verifier.verify("not-a-jwt"))
+    assert verifier.cache.snapshot()["entries"] == 0
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval():
+    rotated_key, rotated_jwk = _keypair("key-2")
+    keys = [JWK]
+    verifier, fetches = _verifier(keys)
+
+    async def scenario():
+        await verifier.verify(_token())
+        keys.append(rotated_jwk)  # Rotation: new key published after the first fetch
+        with pytest.raises(TokenVerificationError):
+            await verifier.verify(_token(private_key=rotated_key, kid="key-2"))
+        verifier.jwks._refreshed_at -= 60
+        return await verifier.verify(_token(private_key=rotated_key, kid="key-2"))
+
+    assert asyncio.run(scenario())["sub"] == "user_1"
+    assert len(fetches) == 2
+
+
+def test_cache_is_bounded_lru_and_honours_exp():
+    cache = VerifiedTokenCache(max_entries=2)
+    now = time.time()
+    cache.put("a", {"sub": "a", "exp": now + 60})
+    cache.put("b", {"sub": "b", "exp": now + 60})
+    cache.get("a")
+    cache.put("c", {"sub": "c", "exp": now + 60})
+    assert cache.get("b") is None  # Least recently used
+    assert cache.get("a")["sub"] == "a"
+
+    cache.put("d", {"sub": "d", "exp": now - 1})
+    assert cache.get("d") is None
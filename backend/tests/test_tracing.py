@@ -0,0 +1,124 @@
+"""
+Tests for request tracing
+Run with: pytest tests/
+"""
+import asyncio
+import json
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import tracing
+from app.core.tracing import FileExporter, InMemoryExporter, Tracer, parse_traceparent, trace_methods
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemoryExporter(100)
+    monkeypatch.setattr(tracing, "tracer", Tracer(exporter))
+    return exporter
+
+
+def test_nested_spans_share_the_trace(exporter):
+    async def scenario():
+        with tracing.tracer.span("request") as root:
+            with tracing.tracer.span("child", model="m"):
+                await asyncio.sleep(0)
+        return root
+
+    root = asyncio.run(scenario())
+    child, finished_root = exporter.spans()
+    assert finished_root is root and root.parent_id is None
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert child.attributes == {"model": "m"}
+
+
+def test_errors_are_recorded_on_the_span(exporter):
+    with pytest.raises(ValueError):
+        with tracing.tracer.span("failing"):
+            raise ValueError("bad")
+    assert exporter.spans()[0].status == "error"
+    assert exporter.spans()[0].error == "ValueError: bad"
+
+
+def test_traceparent():
+    trace_id, span_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert parse_traceparent(f"00-{trace_id}-{span_id}-01") == (trace_id, span_id)
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_sql_statements_become_child_spans(exporter):
+    engine = create_engine("sqlite://")
+    tracing.install_sql_tracing(engine)
+
+    @trace_methods("service")
+    class Service:
+        @staticmethod
+        def load():
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT 1")).scalar()
+
+    with tracing.tracer.span("request"):
+        assert Service.load() == 1
+
+    query, method, request = exporter.spans()
+    assert (query.name, method.name) == ("db.query", "service.load")
+    assert query.parent_id == method.span_id and method.parent_id == request.span_id
+    assert query.attributes["db.operation"] == "SELECT"
+
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(FileExporter(str(path)))
+    with tracer.span("work", items=3):
+        pass
+    tracer.exporter.flush()
+    span = json.loads(path.read_text().splitlines()[0])
+    assert span["name"] == "work" and span["attributes"] == {"items": 3}
+
+
+def test_log_records_carry_the_trace_id(exporter):
+    tracing.install_log_correlation()
+    with tracing.tracer.span("request") as span:
+        record = logging.getLogger("test").makeRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+    assert record.trace_id == span.trace_id
+    outside = logging.getLogger("test").makeRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+    assert outside.trace_id == "-"
+
+
+def test_middleware_returns_trace_id(exporter):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    api = FastAPI()
+    api.add_middleware(tracing.TracingMiddleware)
+
+    @api.get("/projects/{project_id}")
+    async def project(project_id: int):
+        with tracing.tracer.span("work"):
+            return {"ok": True}
+
+    parent = "4bf92f3577b34da6a3ce929d0e0e4736"
+    response = TestClient(api).get("/projects/7", headers={"traceparent": f"00-{parent}-00f067aa0ba902b7-01"})
+    assert response.headers["x-trace-id"] == parent
+    request_span = exporter.spans(parent)[-1]
+    assert request_span.name == "GET /projects/{id}"
+    assert request_span.attributes["http.status_code"] == 200
+
+
+def test_prompt_chars_counts_text_parts():
+    from app.core.vertex_ai import _prompt_chars
+
+    class TextPart:
+        text = "Write 3 variations"
+
+    class ImagePart:
+        @property
+        def text(self):
+            raise ValueError("Part has no text")
+
+    assert _prompt_chars([ImagePart(), TextPart()]) == len(TextPart.text)
+    assert _prompt_chars(["abc", TextPart()]) == 3 + len(TextPart.text)
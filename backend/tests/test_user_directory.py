@@ -0,0 +1,65 @@
+"""
+Tests for the user directory cache
+Run with: pytest tests/
+"""
+import asyncio
+from datetime import datetime
+
+from app.models.project_schemas import ActivityLogResponse
+from app.services.user_directory import UserDirectory
+
+
+def _directory(names, batch_size=100, fail=False):
+    calls = []
+
+    async def lookup(user_ids):
+        calls.append(sorted(user_ids))
+        await asyncio.sleep(0)
+        if fail:
+            raise ConnectionError("Clerk unavailable")
+        return {user_id: names[user_id] for user_id in user_ids if user_id in names}
+
+    directory = UserDirectory(lookup, ttl_seconds=60, miss_ttl_seconds=60, max_entries=100, batch_size=batch_size)
+    return directory, calls
+
+
+def _log(log_id, user_id):
+    return ActivityLogResponse(
+        id=log_id, project_id=1, user_id=user_id, user_name=f"User {user_id}", action="updated_project",
+        field_changed=None, old_value=None, new_value=None, created_at=datetime(2025, 1, 1)
+    )
+
+
+def test_bulk_resolution_uses_one_batched_lookup():
+    directory, calls = _directory({"u1": "Ada Lovelace", "u2": "Alan Turing"})
+    logs = [_log(1, "u1"), _log(2, "u2"), _log(3, "u1"), _log(4, "gone")]
+
+    async def scenario():
+        await directory.apply_names(logs, [("user_id", "user_name")])
+        await directory.apply_names(logs, [("user_id", "user_name")])
+
+    asyncio.run(scenario())
+    assert [log.user_name for log in logs] == ["Ada Lovelace", "Alan Turing", "Ada Lovelace", "User gone"]
+    assert calls == [["gone", "u1", "u2"]]  # Unknown users are cached too
+
+
+def test_lookups_are_batched_and_shared_between_concurrent_callers():
+    directory, calls = _directory({f"u{i}": f"Name {i}" for i in range(5)}, batch_size=2)
+
+    async def scenario():
+        return await asyncio.gather(
+            directory.resolve_many([f"u{i}" for i in range(5)]),
+            directory.resolve_many(["u0", "u1"]),
+        )
+
+    everyone, some = asyncio.run(scenario())
+    assert len(everyone) == 5
+    assert some == {"u0": "Name 0", "u1": "Name 1"}
+    assert len(calls) == 3
+
+
+def test_failed_lookup_keeps_stored_names():
+    directory, _ = _directory({}, fail=True)
+    logs = [_log(1, "u1")]
+    asyncio.run(directory.apply_names(logs, [("user_id", "user_name")]))
+    assert logs[0].user_name == "User u1"
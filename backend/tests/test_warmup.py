@@ -0,0 +1,91 @@
+"""
+Tests for startup warm-up and readiness
+Run with: pytest tests/
+"""
+import asyncio
+
+from app.core.warmup import FAILED, OK, SKIPPED, Warmup
+
+
+def _warmup(steps, required=frozenset({"database"}), timeout=1.0):
+    return Warmup(steps, set(required), timeout)
+
+
+def test_steps_run_concurrently_and_report_timings():
+    async def slow():
+        await asyncio.sleep(0.1)
+
+    async def skipped():
+        return SKIPPED
+
+    warmup = _warmup({"database": slow, "vertex_ai": slow, "clerk_jwks": skipped})
+    assert not warmup.ready
+    assert warmup.snapshot()["status"] == "warming_up"
+
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert warmup.seconds < 0.2  # Concurrent, not 0.2s in sequence
+    dependencies = warmup.snapshot()["dependencies"]
+    assert dependencies["database"]["status"] == OK
+    assert dependencies["database"]["seconds"] >= 0.1
+    assert dependencies["clerk_jwks"]["status"] == SKIPPED
+
+
+def test_optional_failure_does_not_block_readiness():
+    async def ok():
+        return None
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    warmup = _warmup({"database": ok, "vertex_ai": hang}, timeout=0.05)
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert warmup.results["vertex_ai"].status == FAILED
+    assert warmup.results["vertex_ai"].error == "timed out"
+
+
+def test_required_failure_is_retried():
+    attempts = []
+
+    async def database():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("connection refused")
+
+    warmup = _warmup({"database": database})
+
+    async def scenario():
+        await warmup.run()
+        assert not warmup.ready
+        assert warmup.snapshot()["status"] == "not_ready"
+        await warmup.retry_required()
+
+    asyncio.run(scenario())
+    assert warmup.ready
+    assert len(attempts) == 2
+
+
+def test_probes_start_a_single_background_retry():
+    attempts = []
+
+    async def database():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("connection refused")
+        await asyncio.sleep(0.05)
+
+    warmup = _warmup({"database": database})
+
+    async def scenario():
+        await warmup.run()
+        retries = {warmup.start_retry() for _ in range(5)}  # Overlapping probes
+        assert len(retries) == 1
+        assert warmup.snapshot()["retrying"]
+        await retries.pop()
+
+    asyncio.run(scenario())
+    assert warmup.ready
+    assert len(attempts) == 2